@@ -316,48 +316,35 @@ def allocate_chains(dcs, mappings, chain_index=None):
     return vnfs
 
 
-def chain_vnfs(net, vnfs, chain_index):
-    pair_src_name = vnfs['source'][chain_index].keys()[0]
-    pair_dst_name = vnfs['nat'][chain_index].keys()[0]
-    res = net.setChain(pair_src_name, pair_dst_name, 'intf1', 'input',
-                       bidirectional=True, cmd='add-flow')
-    glog.info('chain(%s, %s) output: %s',
-              pair_src_name, pair_dst_name, res)
-
-    pair_src_name = vnfs['nat'][chain_index].keys()[0]
-    pair_dst_name = vnfs['fw'][chain_index].keys()[0]
-    res = net.setChain(pair_src_name, pair_dst_name, 'output', 'input',
-                       bidirectional=True, cmd='add-flow')
-    glog.info('chain(%s, %s) output: %s',
-              pair_src_name, pair_dst_name, res)
-
-    pair_src_name = vnfs['fw'][chain_index].keys()[0]
-    pair_dst_name = vnfs['ids'][chain_index].keys()[0]
-    res = net.setChain(pair_src_name, pair_dst_name, 'output-ids', 'input',
-                       bidirectional=True, cmd='add-flow')
-    glog.info('chain(%s, %s) output: %s',
-              pair_src_name, pair_dst_name, res)
-
-    pair_src_name = vnfs['fw'][chain_index].keys()[0]
-    pair_dst_name = vnfs['vpn'][chain_index].keys()[0]
-    res = net.setChain(pair_src_name, pair_dst_name, 'output-vpn', 'input-fw',
-                       bidirectional=True, cmd='add-flow')
-    glog.info('chain(%s, %s) output: %s',
-              pair_src_name, pair_dst_name, res)
-
-    pair_src_name = vnfs['ids'][chain_index].keys()[0]
-    pair_dst_name = vnfs['vpn'][chain_index].keys()[0]
-    res = net.setChain(pair_src_name, pair_dst_name, 'output', 'input-ids',
-                       bidirectional=True, cmd='add-flow')
-    glog.info('chain(%s, %s) output: %s',
-              pair_src_name, pair_dst_name, res)
-
-    pair_src_name = vnfs['vpn'][chain_index].keys()[0]
-    pair_dst_name = vnfs['sink'][chain_index].keys()[0]
-    res = net.setChain(pair_src_name, pair_dst_name, 'output', 'intf2',
-                       bidirectional=True, cmd='add-flow')
-    glog.info('chain(%s, %s) output: %s',
-              pair_src_name, pair_dst_name, res)
+def chain_specs(vnfs, chain_index):
+    """ Returns the links of chain 'client <-> nat <-> fw <-> ids <-> vpn <-> server'. """
+    links = [('source', 'nat', 'intf1', 'input'),
+             ('nat', 'fw', 'output', 'input'),
+             ('fw', 'ids', 'output-ids', 'input'),
+             ('fw', 'vpn', 'output-vpn', 'input-fw'),
+             ('ids', 'vpn', 'output', 'input-ids'),
+             ('vpn', 'sink', 'output', 'intf2')]
+    specs = []
+    for src, dst, src_intf, dst_intf in links:
+        specs.append({'vnf_src_name': vnfs[src][chain_index].keys()[0],
+                      'vnf_dst_name': vnfs[dst][chain_index].keys()[0],
+                      'vnf_src_interface': src_intf,
+                      'vnf_dst_interface': dst_intf,
+                      'bidirectional': True,
+                      'cmd': 'add-flow'})
+    return specs
+
+
+def chain_vnfs(net, vnfs, chain_indexes):
+    specs = []
+    for chain_index in chain_indexes:
+        specs += chain_specs(vnfs, chain_index)
+    # paths and tags of all chains are set up first, the flow entries are
+    # installed concurrently afterwards
+    for res in net.setChains(specs):
+        glog.info('chain(%s, %s) output: %s error: %s (setup %.3fs, install %.3fs)',
+                  res['vnf_src_name'], res['vnf_dst_name'], res['result'],
+                  res['error'], res['setup_time'], res['install_time'])
 
 
 def ping_test(net, vnfs, chain_index):
@@ -424,10 +411,9 @@ def plumb_chains(net, vnfs, num_of_chains, chain_index=None):
 
     # chain 'client <-> nat <-> fw <-> ids <-> vpn <-> server'
     if chain_index is None:
-        for chain_index in range(num_of_chains):
-            chain_vnfs(net, vnfs, chain_index)
+        chain_vnfs(net, vnfs, range(num_of_chains))
     else:
-        chain_vnfs(net, vnfs, 0)
+        chain_vnfs(net, vnfs, [0])
 
     for vnf_name_and_obj in vnfs['sink']:
         vnf_name = vnf_name_and_obj.keys()[0]
@@ -60,7 +60,9 @@ import select
 import docker
 import docker.utils
 import json
-from subprocess import Popen, PIPE, check_output
+import threading
+from Queue import Queue
+from subprocess import Popen, PIPE, STDOUT, check_output
 from time import sleep
 
 from mininet.log import info, error, warn, debug
@@ -649,6 +651,100 @@ class Host( Node ):
     pass
 
 
+# How Docker hosts run their commands:
+# 'shell' (default): a persistent 'docker exec -it bash' per container,
+#          started when the first command is sent
+# 'exec': one Docker exec API call per command, no persistent process
+# 'nsenter': one nsenter call per command into the container's namespaces
+# With 'exec' and 'nsenter' every command runs in a fresh bash: the working
+# directory and exported variables do not carry over between commands.
+DOCKER_CMD_BACKEND = os.environ.get( 'CONTAINERNET_CMD_BACKEND', 'shell' )
+# maximum number of concurrent 'exec'/'nsenter' commands of all containers
+DOCKER_EXEC_WORKERS = int( os.environ.get( 'CONTAINERNET_EXEC_WORKERS', 32 ) )
+
+
+class ExecJob( object ):
+    "A command submitted to the ExecWorkerPool."
+
+    def __init__( self, func, cmd, background ):
+        self.func = func
+        self.cmd = cmd
+        self.background = background
+        # output that was not read yet
+        self.output = ''
+        self.done = False
+        self.cond = threading.Condition()
+
+    def run( self ):
+        try:
+            self.func( self.cmd, self.background, self.write )
+        except Exception as e:
+            self.write( 'error: %s\n' % e )
+        finally:
+            with self.cond:
+                self.done = True
+                self.cond.notify_all()
+
+    def write( self, data ):
+        "Append output of the command as it arrives."
+        if not data:
+            return
+        with self.cond:
+            self.output += data
+            self.cond.notify_all()
+
+    def read( self, timeout=None ):
+        """Wait until output is available or the command is done,
+           at most timeout seconds (None: no limit).
+           returns: output since the last read, True if the command is done"""
+        with self.cond:
+            if not self.output and not self.done:
+                if timeout is None:
+                    while not self.output and not self.done:
+                        # a timeout keeps the wait interruptible
+                        self.cond.wait( 1 )
+                else:
+                    self.cond.wait( timeout )
+            data, self.output = self.output, ''
+            return data, self.done
+
+
+class ExecWorkerPool( object ):
+    """Bounded pool of threads shared by all Docker hosts that run
+       their commands without a persistent shell.
+       Threads are started on demand up to maxWorkers."""
+
+    def __init__( self, maxWorkers ):
+        self.maxWorkers = max( 1, maxWorkers )
+        self.jobs = Queue()
+        self.workers = 0
+        # submitted jobs that are not finished yet
+        self.pending = 0
+        self.lock = threading.Lock()
+
+    def submit( self, job ):
+        with self.lock:
+            self.pending += 1
+            if self.pending > self.workers and self.workers < self.maxWorkers:
+                self.workers += 1
+                t = threading.Thread( target=self._work,
+                                      name='docker-exec-%d' % self.workers )
+                t.daemon = True
+                t.start()
+        self.jobs.put( job )
+        return job
+
+    def _work( self ):
+        while True:
+            job = self.jobs.get()
+            job.run()
+            with self.lock:
+                self.pending -= 1
+
+
+execWorkers = ExecWorkerPool( DOCKER_EXEC_WORKERS )
+
+
 class Docker ( Host ):
     """Node that represents a docker container.
     This part is inspired by:
@@ -680,6 +776,13 @@ class Docker ( Host ):
         """
         self.dimage = dimage
         self.dnameprefix = "mn"
+        self.cmdBackend = kwargs.get( 'cmd_backend', DOCKER_CMD_BACKEND )
+        if self.cmdBackend not in ( 'shell', 'exec', 'nsenter' ):
+            raise ValueError( 'unknown command backend %s' % self.cmdBackend )
+        # command submitted by sendCmd when not using a shell
+        self.execJob = None
+        # Node.__init__ calls startShell: defer the shell to the first command
+        self.shellDeferred = True
         self.dcmd = dcmd if dcmd is not None else "/bin/bash"
         self.dc = None  # pointer to the dict containing 'Id' and 'Warnings' keys of the container
         self.dcinfo = None
@@ -788,6 +891,12 @@ class Docker ( Host ):
         if self.shell:
             error( "%s: shell is already running\n" % self.name )
             return
+        if self.shellDeferred:
+            # no pty and no shell process until a command needs one
+            self.shellDeferred = False
+            self.pid = self._get_pid()
+            self.waiting = False
+            return
         # mnexec: (c)lose descriptors, (d)etach from tty,
         # (p)rint pid, and run in (n)amespace
         # opts = '-cd' if mnopts is None else mnopts
@@ -848,11 +957,85 @@ class Docker ( Host ):
     def sendCmd( self, *args, **kwargs ):
         """Send a command, followed by a command to echo a sentinel,
            and return without waiting for the command to complete."""
+        if self.cmdBackend != 'shell':
+            return self._sendExecCmd( *args )
         self._check_shell()
         if not self.shell:
             return
         Host.sendCmd( self, *args, **kwargs )
 
+    def _sendExecCmd( self, *args ):
+        """sendCmd for the 'exec' and 'nsenter' backends: the command
+           runs in the shared exec worker pool, monitor() returns its output."""
+        assert not self.waiting
+        # Allow sendCmd( [ list ] ) and sendCmd( cmd, arg1, arg2... )
+        if len( args ) == 1 and isinstance( args[ 0 ], list ):
+            cmd = args[ 0 ]
+        else:
+            cmd = args
+        if not isinstance( cmd, str ):
+            cmd = ' '.join( [ str( c ) for c in cmd ] )
+        if not re.search( r'\w', cmd ):
+            cmd = 'echo -n'
+        self.lastCmd = cmd
+        self.lastPid = None
+        background = cmd.rstrip()[ -1: ] == '&'
+        func = self._execDocker if self.cmdBackend == 'exec' else self._execNsenter
+        self.execJob = execWorkers.submit( ExecJob( func, cmd, background ) )
+        self.waiting = True
+
+    def _execDocker( self, cmd, background, write ):
+        "Run a command with the Docker exec API, streaming its output to write()."
+        if not self._is_container_running():
+            return
+        ex = self.dcli.exec_create( self.dc, [ 'bash', '-c', cmd ], tty=False )
+        if background:
+            # background processes would keep the output stream open
+            self.dcli.exec_start( ex, detach=True )
+            return
+        for chunk in self.dcli.exec_start( ex, stream=True ):
+            write( chunk )
+
+    def _execNsenter( self, cmd, background, write ):
+        "Run a command in the namespaces of the container's main process."
+        nscmd = [ 'nsenter', '-t', str( self.pid ), '-m', '-u', '-i', '-n', '-p',
+                  'bash', '-c', cmd ]
+        if background:
+            with open( os.devnull, 'w' ) as devnull:
+                Popen( nscmd, stdout=devnull, stderr=devnull, close_fds=True )
+            return
+        p = Popen( nscmd, stdout=PIPE, stderr=STDOUT, close_fds=True )
+        for line in iter( p.stdout.readline, '' ):
+            write( line )
+        p.wait()
+
+    def monitor( self, timeoutms=None, findPid=True ):
+        """Monitor and return the output of a command.
+           Set self.waiting to False if command has completed."""
+        if self.cmdBackend == 'shell':
+            return Host.monitor( self, timeoutms, findPid )
+        job = self.execJob
+        if job is None:
+            self.waiting = False
+            return ''
+        # like the shell backend: return the output available so far
+        data, done = job.read( None if timeoutms is None else timeoutms / 1000.0 )
+        if done:
+            # output that arrived after the read
+            data += job.read( 0 )[ 0 ]
+            self.execJob = None
+            self.waiting = False
+        return data
+
+    def sendInt( self, intr=chr( 3 ) ):
+        "Interrupt running command."
+        if self.cmdBackend == 'shell':
+            return Host.sendInt( self, intr )
+        # exec'd commands cannot be interrupted, stop waiting for them
+        warn( '%s: cannot interrupt %r\n' % ( self.name, self.lastCmd ) )
+        self.execJob = None
+        self.waiting = False
+
     def popen( self, *args, **kwargs ):
         """Return a Popen() object in node's namespace
            args: Popen() args, single list, or string
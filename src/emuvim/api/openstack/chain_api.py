@@ -40,6 +40,8 @@ class ChainApi(Resource):
                               resource_class_kwargs={'api': self})
         self.api.add_resource(BalanceHostDcStack, "/v1/lb/<src_dc>/<src_stack>/<vnf_src_name>/<vnf_src_interface>",
                               resource_class_kwargs={'api': self})
+        self.api.add_resource(BalanceBackend, "/v1/lb/<lb_cookie>/<dst_vnf>/<dst_intf>",
+                              resource_class_kwargs={'api': self})
         self.api.add_resource(QueryTopology, "/v1/topo",
                               resource_class_kwargs={'api': self})
         self.api.add_resource(Shutdown, "/shutdown")
@@ -557,6 +559,7 @@ class BalanceHostDcStack(Resource):
                 container_src, interface_src = real_src
 
             real_dst_dict = {}
+            real_weights = {}
             for dst_vnf in dst_vnfs:
                 dst_dc = dst_vnf.get('pop', None)
                 dst_stack = dst_vnf.get('stack', None)
@@ -568,8 +571,11 @@ class BalanceHostDcStack(Resource):
                         # something went wrong, real_dst is a Response object
                         return real_dst
                     real_dst_dict[real_dst[0]] = real_dst[1]
+                    if 'weight' in dst_vnf:
+                        real_weights[real_dst[0]] = dst_vnf['weight']
 
-            input_object = {"dst_vnf_interfaces": real_dst_dict, "path": req.get("path", None)}
+            input_object = {"dst_vnf_interfaces": real_dst_dict, "path": req.get("path", None),
+                            "weights": real_weights}
 
             if src_stack != "floating":
                 self.api.manage.add_loadbalancer(container_src, interface_src, lb_data=input_object)
@@ -768,6 +774,68 @@ class BalanceHost(Resource):
                             (__name__, vnf_src_name, vnf_src_interface), status=500, mimetype="application/json")
 
 
+class BalanceBackend(Resource):
+    """
+    Handles requests at "/v1/lb/<lb_cookie>/<dst_vnf>/<dst_intf>"
+    to add, reweight or remove a destination of an existing Load Balancer.
+    Only the buckets of the select group of the Load Balancer are changed, the other destinations are kept.
+    """
+
+    def __init__(self, api):
+        self.api = api
+
+    def put(self, lb_cookie, dst_vnf, dst_intf):
+        """
+        Adds a destination to the Load Balancer or changes its weight.
+
+        :Example:
+            {"weight": 2, "path": ["dc1.s1", "s1", "dc2.s1"]}
+            Both fields are optional, the weight defaults to 1.
+
+        :param lb_cookie: Cookie of the Load Balancer
+        :type lb_cookie: ``str``
+        :param dst_vnf: Name of the destination VNF
+        :type dst_vnf: ``str``
+        :param dst_intf: Name of the destination VNF interface
+        :type dst_intf: ``str``
+        :return: flask.Response 200 with the path data of the destination if set up correctly else 500
+        :rtype: :class:`flask.Response`
+        """
+        try:
+            req = request.json or dict()
+            path_data = self.api.manage.add_lb_backend(lb_cookie, dst_vnf, dst_intf,
+                                                       weight=req.get("weight", 1), path=req.get("path"))
+            return Response(json.dumps(path_data), status=200, mimetype="application/json")
+        except Exception as e:
+            logging.exception(u"%s: Error adding %s:%s to the loadbalancer with cookie %s.\n %s" %
+                              (__name__, dst_vnf, dst_intf, lb_cookie, e))
+            return Response(u"%s: Error adding %s:%s to the loadbalancer with cookie %s.\n %s" %
+                            (__name__, dst_vnf, dst_intf, lb_cookie, e), status=500, mimetype="application/json")
+
+    def delete(self, lb_cookie, dst_vnf, dst_intf):
+        """
+        Removes a destination from the Load Balancer.
+
+        :param lb_cookie: Cookie of the Load Balancer
+        :type lb_cookie: ``str``
+        :param dst_vnf: Name of the destination VNF
+        :type dst_vnf: ``str``
+        :param dst_intf: Name of the destination VNF interface
+        :type dst_intf: ``str``
+        :return: flask.Response 200 if removed else 500
+        :rtype: :class:`flask.Response`
+        """
+        try:
+            self.api.manage.remove_lb_backend(lb_cookie, dst_vnf, dst_intf)
+            return Response(u"Removed %s:%s from the loadbalancer with cookie %s" % (dst_vnf, dst_intf, lb_cookie),
+                            status=200, mimetype="application/json")
+        except Exception as e:
+            logging.exception(u"%s: Error removing %s:%s from the loadbalancer with cookie %s.\n %s" %
+                              (__name__, dst_vnf, dst_intf, lb_cookie, e))
+            return Response(u"%s: Error removing %s:%s from the loadbalancer with cookie %s.\n %s" %
+                            (__name__, dst_vnf, dst_intf, lb_cookie, e), status=500, mimetype="application/json")
+
+
 class QueryTopology(Resource):
     """
     Handles requests at "/v1/topo/"
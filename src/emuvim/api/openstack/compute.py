@@ -6,6 +6,7 @@ import threading
 import uuid
 import time
 import ip_handler as IP
+from emuvim.dcemulator.netconfig import NetConfigBatch
 
 
 class HeatApiStackInvalidException(Exception):
@@ -415,6 +416,8 @@ class OpenstackCompute(object):
                                  network=network, flavor_name=server.flavor)
         server.emulator_compute = c
 
+        # set the MACs of all ports in one go
+        batch = NetConfigBatch(c)
         for intf in c.intfs.values():
             for port_name in server.port_names:
                 port = self.find_port_by_name_or_id(port_name)
@@ -423,9 +426,12 @@ class OpenstackCompute(object):
                         # wait up to one second for the intf to come up
                         self.timeout_sleep(intf.isUp, 1)
                         if port.mac_address is not None:
-                            intf.setMAC(port.mac_address)
+                            batch.set_mac(intf.name, port.mac_address)
                         else:
                             port.mac_address = intf.MAC()
+        for error in batch.apply():
+            logging.error("Setting the MAC of port %s of server %s failed: %s" %
+                          (error.args[0], server.name, error.message))
 
         # Start the real emulator command now as specified in the dockerfile
         # ENV SON_EMU_CMD
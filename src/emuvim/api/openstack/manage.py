@@ -9,11 +9,10 @@
 import logging
 import threading
 import uuid
-import networkx as nx
 import chain_api
 import json
-import random
 from emuvim.api.openstack.resources import Net, Port
+from emuvim.dcemulator.netconfig import NetConfigBatch
 from mininet.node import OVSSwitch, RemoteController, Node
 
 
@@ -41,21 +40,18 @@ class OpenstackManage(object):
         self.endpoints = dict()
         self.cookies = set()
         self.cookies.add(0)
+        self._next_cookie = 1
         self.ip = ip
         self.port = port
         self._net = None
-        # to keep track which src_vnf(input port on the switch) handles a load balancer
-        self.lb_flow_cookies = dict()
         self.chain_flow_cookies = dict()
+        # cookie -> bookkeeping of a load balancer, including its select group and the paths to the destinations
+        self.lb_groups = dict()
 
         # for the visualization also store the complete chain data incl. paths
         self.full_chain_data = dict()
         self.full_lb_data = dict()
 
-        # flow groups could be handled for each switch separately, but this global group counter should be easier to
-        # debug and to maintain
-        self.flow_groups = dict()
-
         # we want one global chain api. this should not be datacenter dependent!
         self.chain = chain_api.ChainApi(ip, port, self)
         self.thread = threading.Thread(target=self.chain._start_flask, args=())
@@ -141,27 +137,21 @@ class OpenstackManage(object):
         :return: Cookie
         :rtype: ``int``
         """
-        cookie = int(max(self.cookies) + 1)
-        self.cookies.add(cookie)
+        with self.lock:
+            cookie = self._next_cookie
+            # skip cookies that were passed in by the user
+            while cookie in self.cookies:
+                cookie += 1
+            self._next_cookie = cookie + 1
+            self.cookies.add(cookie)
         return cookie
 
-    def get_flow_group(self, src_vnf_name, src_vnf_interface):
+    def _add_flow(self, switch, main_cmd, cmd, cookie):
         """
-        Gets free group that is not currently used by any other flow for the specified interface / VNF.
-
-        :param src_vnf_name: Source VNF name
-        :type src_vnf_name: ``str``
-        :param src_vnf_interface: Source VNF interface name
-        :type src_vnf_interface: ``str``
-        :return: Flow group identifier.
-        :rtype: ``int``
+        Install a flow with ovs-ofctl and register it in the flow registry of the network.
         """
-        if (src_vnf_name, src_vnf_interface) not in self.flow_groups:
-            grp = int(len(self.flow_groups) + 1)
-            self.flow_groups[(src_vnf_name, src_vnf_interface)] = grp
-        else:
-            grp = self.flow_groups[(src_vnf_name, src_vnf_interface)]
-        return grp
+        self.net[switch].dpctl(main_cmd, cmd)
+        self.net.flow_registry.add_ofctl(switch, main_cmd, cmd, cookie=cookie)
 
     def check_vnf_intf_pair(self, vnf_name, vnf_intf_name):
         """
@@ -254,7 +244,8 @@ class OpenstackManage(object):
             if not kwargs.get('no_route'):
                 # son_emu does not like concurrent commands for a container so we need to lock this if multiple chains
                 # on the same interface are created
-                src_node.setHostRoute(dst_node.intf(vnf_dst_interface).IP(), vnf_src_interface)
+                self._apply_netconfig(NetConfigBatch(src_node).add_route(dst_node.intf(vnf_dst_interface).IP(),
+                                                                         vnf_src_interface))
 
             try:
                 son_emu_data = json.loads(self.get_son_emu_chain_data(vnf_src_name))
@@ -356,19 +347,7 @@ class OpenstackManage(object):
         :return: List containing the switch, and the inport number
         :rtype: [``str``, ``int``]
         """
-        src_sw = None
-        src_sw_inport_nr = None
-        for connected_sw in self.net.DCNetwork_graph.neighbors(vnf_name):
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            for link in link_dict:
-                if (link_dict[link]['src_port_id'] == vnf_interface or
-                            link_dict[link][
-                                'src_port_name'] == vnf_interface):
-                    # found the right link and connected switch
-                    src_sw = connected_sw
-                    src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                    break
-
+        src_sw, src_sw_inport_nr, _ = self.net.find_connected_switch(vnf_name, vnf_interface)
         return src_sw, src_sw_inport_nr
 
     def _get_path(self, src_vnf, dst_vnf, src_vnf_intf, dst_vnf_intf):
@@ -388,37 +367,17 @@ class OpenstackManage(object):
         :rtype: ``list``, ``str``, ``str``
         """
         # modified version of the _chainAddFlow from emuvim.dcemulator.net._chainAddFlow
-        src_sw = None
-        dst_sw = None
         logging.debug("Find shortest path from vnf %s to %s",
                       src_vnf, dst_vnf)
 
-        for connected_sw in self.net.DCNetwork_graph.neighbors(src_vnf):
-            link_dict = self.net.DCNetwork_graph[src_vnf][connected_sw]
-            for link in link_dict:
-                if (link_dict[link]['src_port_id'] == src_vnf_intf or
-                            link_dict[link][
-                                'src_port_name'] == src_vnf_intf):
-                    # found the right link and connected switch
-                    src_sw = connected_sw
-                    break
-
-        for connected_sw in self.net.DCNetwork_graph.neighbors(dst_vnf):
-            link_dict = self.net.DCNetwork_graph[connected_sw][dst_vnf]
-            for link in link_dict:
-                if link_dict[link]['dst_port_id'] == dst_vnf_intf or \
-                                link_dict[link][
-                                    'dst_port_name'] == dst_vnf_intf:
-                    # found the right link and connected
-                    dst_sw = connected_sw
-                    break
+        src_sw = self.net.find_connected_switch(src_vnf, src_vnf_intf)[0]
+        dst_sw = self.net.find_connected_switch(dst_vnf, dst_vnf_intf)[0]
         logging.debug("From switch %s to %s " % (src_sw, dst_sw))
 
         # get shortest path
         try:
-            # returns the first found shortest path
-            # if all shortest paths are wanted, use: all_shortest_paths
-            path = nx.shortest_path(self.net.DCNetwork_graph, src_sw, dst_sw)
+            # returns the first found shortest path between the switches (cached per weight metric)
+            path = self.net.path_service.shortest_path(src_sw, dst_sw)
         except:
             logging.exception("No path could be found between {0} and {1} using src_sw={2} and dst_sw={3}".format(
                 src_vnf, dst_vnf, src_sw, dst_sw))
@@ -434,267 +393,59 @@ class OpenstackManage(object):
     def add_loadbalancer(self, src_vnf_name, src_vnf_interface, lb_data):
         """
         This function will set up a loadbalancer at the given interface.
+        The traffic is spread over the destinations by an OpenFlow select group on the switch of the source
+        interface, with one weighted bucket per destination. A loadbalancer already set up at the interface is
+        replaced.
 
         :param src_vnf_name: Name of the source VNF
         :type src_vnf_name: ``str``
         :param src_vnf_interface: Name of the destination VNF
         :type src_vnf_interface: ``str``
-        :param lb_data: A dictionary containing the destination data as well as custom path settings
+        :param lb_data: A dictionary containing the destination data as well as custom path settings and weights
         :type lb_data: ``dict``
+        :return: cookie of the loadbalancer
+        :rtype: ``int``
 
         :Example:
          lbdata = {"dst_vnf_interfaces": {"dc2_man_web0": "port-man-2",
          "dc3_man_web0": "port-man-4","dc4_man_web0": "port-man-6"}, "path": {"dc2_man_web0": {"port-man-2": [ "dc1.s1",\
-         "s1", "dc2.s1"]}}}
+         "s1", "dc2.s1"]}}, "weights": {"dc2_man_web0": 2}}
         """
         net = self.net
-        src_sw_inport_nr = 0
-        src_sw = None
-        dest_intfs_mapping = lb_data.get('dst_vnf_interfaces', dict())
-        # a custom path can be specified as a list of switches
-        custom_paths = lb_data.get('path', dict())
-        dest_vnf_outport_nrs = list()
-
         logging.debug("Call to add_loadbalancer at %s intfs:%s" % (src_vnf_name, src_vnf_interface))
 
         if not self.check_vnf_intf_pair(src_vnf_name, src_vnf_interface):
             raise Exception(u"Source VNF %s or intfs %s does not exist" % (src_vnf_name, src_vnf_interface))
 
         # find the switch belonging to the source interface, as well as the inport nr
-        for connected_sw in net.DCNetwork_graph.neighbors(src_vnf_name):
-            link_dict = net.DCNetwork_graph[src_vnf_name][connected_sw]
-            for link in link_dict:
-                if link_dict[link]['src_port_name'] == src_vnf_interface:
-                    src_sw = connected_sw
-                    src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                    break
-
-        if src_sw is None or src_sw_inport_nr == 0:
-            raise Exception(u"Source VNF or interface can not be found.")
+        src_sw, src_sw_inport_nr, _ = net.find_connected_switch(src_vnf_name, src_vnf_interface)
 
-        # get all target interface outport numbers
-        for vnf_name in dest_intfs_mapping:
-            if vnf_name not in net.DCNetwork_graph:
-                raise Exception(u"Target VNF %s is not known." % vnf_name)
-            for connected_sw in net.DCNetwork_graph.neighbors(vnf_name):
-                link_dict = net.DCNetwork_graph[vnf_name][connected_sw]
-                for link in link_dict:
-                    if link_dict[link]['src_port_name'] == dest_intfs_mapping[vnf_name]:
-                        dest_vnf_outport_nrs.append(int(link_dict[link]['dst_port_nr']))
-        # get first switch
-        if (src_vnf_name, src_vnf_interface) not in self.lb_flow_cookies:
-            self.lb_flow_cookies[(src_vnf_name, src_vnf_interface)] = list()
-
-        src_intf = None
-        src_ip = None
-        src_mac = None
-        for intf in net[src_vnf_name].intfs.values():
-            if intf.name == src_vnf_interface:
-                src_mac = intf.mac
-                src_ip = intf.ip
-                src_intf = intf
-
-        # set up paths for each destination vnf individually
-        index = 0
-        cookie = self.get_cookie()
-        main_cmd = "add-flow -OOpenFlow13"
-        self.lb_flow_cookies[(src_vnf_name, src_vnf_interface)].append(cookie)
+        if src_sw is None or not src_sw_inport_nr:
+            raise Exception(u"Source VNF or interface can not be found.")
 
-        # bookkeeping
-        data = dict()
-        data["src_vnf"] = src_vnf_name
-        data["src_intf"] = src_vnf_interface
-        data["paths"] = list()
-        data["cookie"] = cookie
+        target_pair = (src_vnf_name, src_vnf_interface)
+        if target_pair in self.full_lb_data:
+            self.delete_loadbalancer(src_vnf_name, src_vnf_interface)
 
-        # lb mac for src -> target connections
-        lb_mac = "31:33:70:%02x:%02x:%02x" % (random.randint(0, 255),random.randint(0, 255),random.randint(0, 255))
+        src_intf = net[src_vnf_name].nameToIntf[src_vnf_interface]
+        src_ip = src_intf.IP()
 
         # calculate lb ip as src_intf.ip +1
         octets = src_ip.split('.')
         octets[3] = str(int(octets[3]) + 1)
         plus_one = '.'.join(octets)
 
-        # set up arp reply as well as add the route to the interface
-        self.setup_arp_reply_at(src_sw, src_sw_inport_nr, plus_one, lb_mac, cookie=cookie)
-        net.getNodeByName(src_vnf_name).setHostRoute(plus_one, src_vnf_interface)
-
-        for dst_vnf_name, dst_vnf_interface in dest_intfs_mapping.items():
-            path, src_sw, dst_sw = self._get_path(src_vnf_name, dst_vnf_name,
-                                                  src_vnf_interface, dst_vnf_interface)
-
-            # use custom path if one is supplied
-            # json does not support hashing on tuples so we use nested dicts
-            if custom_paths is not None and dst_vnf_name in custom_paths:
-                if dst_vnf_interface in custom_paths[dst_vnf_name]:
-                    path = custom_paths[dst_vnf_name][dst_vnf_interface]
-                    logging.debug("Taking custom path from %s to %s: %s" % (src_vnf_name, dst_vnf_name, path))
-
-            if not self.check_vnf_intf_pair(dst_vnf_name, dst_vnf_interface):
-                self.delete_loadbalancer(src_vnf_name, src_vnf_interface)
-                raise Exception(u"VNF %s or intfs %s does not exist" % (dst_vnf_name, dst_vnf_interface))
-            if isinstance(path, dict):
-                self.delete_loadbalancer(src_vnf_name, src_vnf_interface)
-                raise Exception(u"Can not find a valid path. Are you specifying the right interfaces?.")
-
-            target_mac = "fa:17:00:03:13:37"
-            target_ip = "0.0.0.0"
-            for intf in net[dst_vnf_name].intfs.values():
-                if intf.name == dst_vnf_interface:
-                    target_mac = str(intf.mac)
-                    target_ip = str(intf.ip)
-            dst_sw_outport_nr = dest_vnf_outport_nrs[index]
-            current_hop = src_sw
-            switch_inport_nr = src_sw_inport_nr
-
-            #self.setup_arp_reply_at(src_sw, src_sw_inport_nr, target_ip, target_mac, cookie=cookie)
-            net.getNodeByName(dst_vnf_name).setHostRoute(src_ip, dst_vnf_interface)
-
-            # choose free vlan if path contains more than 1 switch
-            if len(path) > 1:
-                vlan = net.vlans.pop()
-                if vlan == 0:
-                    vlan = net.vlans.pop()
-            else:
-                vlan = None
-
-            single_flow_data = dict()
-            single_flow_data["dst_vnf"] = dst_vnf_name
-            single_flow_data["dst_intf"] = dst_vnf_interface
-            single_flow_data["path"] = path
-            single_flow_data["vlan"] = vlan
-            single_flow_data["cookie"] = cookie
-
-            data["paths"].append(single_flow_data)
-
-            # src to target
-            for i in range(0, len(path)):
-                if i < len(path) - 1:
-                    next_hop = path[i + 1]
-                else:
-                    # last switch reached
-                    next_hop = dst_vnf_name
-                next_node = net.getNodeByName(next_hop)
-                if next_hop == dst_vnf_name:
-                    switch_outport_nr = dst_sw_outport_nr
-                    logging.info("end node reached: {0}".format(dst_vnf_name))
-                elif not isinstance(next_node, OVSSwitch):
-                    logging.info("Next node: {0} is not a switch".format(next_hop))
-                    return "Next node: {0} is not a switch".format(next_hop)
-                else:
-                    # take first link between switches by default
-                    index_edge_out = 0
-                    switch_outport_nr = net.DCNetwork_graph[current_hop][next_hop][index_edge_out]['src_port_nr']
-
-                cmd = 'priority=1,in_port=%s,cookie=%s' % (switch_inport_nr, cookie)
-                cmd_back = 'priority=1,in_port=%s,cookie=%s' % (switch_outport_nr, cookie)
-                # if a vlan is picked, the connection is routed through multiple switches
-                if vlan is not None:
-                    if path.index(current_hop) == 0:  # first node
-                        # flow #index set up
-                        cmd = 'in_port=%s' % src_sw_inport_nr
-                        cmd += ',cookie=%s' % cookie
-                        cmd += ',table=%s' % cookie
-                        cmd += ',ip'
-                        cmd += ',reg1=%s' % index
-                        cmd += ',actions='
-                        # set vlan id
-                        cmd += ',push_vlan:0x8100'
-                        masked_vlan = vlan | 0x1000
-                        cmd += ',set_field:%s->vlan_vid' % masked_vlan
-                        cmd += ',set_field:%s->eth_dst' % target_mac
-                        cmd += ',set_field:%s->ip_dst' % target_ip
-                        cmd += ',output:%s' % switch_outport_nr
-
-                        # last switch for reverse route
-                        # remove any vlan tags
-                        cmd_back += ',dl_vlan=%s' % vlan
-                        cmd_back += ',actions=pop_vlan,output:%s' % switch_inport_nr
-                    elif next_hop == dst_vnf_name:  # last switch
-                        # remove any vlan tags
-                        cmd += ',dl_vlan=%s' % vlan
-                        cmd += ',actions=pop_vlan,output:%s' % switch_outport_nr
-                        # set up arp replys at the port so the dst nodes know the src
-                        self.setup_arp_reply_at(current_hop, switch_outport_nr, src_ip, src_mac, cookie=cookie)
-
-                        # reverse route
-                        cmd_back = 'in_port=%s' % switch_outport_nr
-                        cmd_back += ',cookie=%s' % cookie
-                        cmd_back += ',ip'
-                        cmd_back += ',actions='
-                        cmd_back += 'push_vlan:0x8100'
-                        masked_vlan = vlan | 0x1000
-                        cmd_back += ',set_field:%s->vlan_vid' % masked_vlan
-                        cmd_back += ',set_field:%s->eth_src' % lb_mac
-                        cmd_back += ',set_field:%s->ip_src' % plus_one
-                        cmd_back += ',output:%s' % switch_inport_nr
-                    else:  # middle nodes
-                        # if we have a circle in the path we need to specify this, as openflow will ignore the packet
-                        # if we just output it on the same port as it came in
-                        if switch_inport_nr == switch_outport_nr:
-                            cmd += ',dl_vlan=%s,actions=IN_PORT' % (vlan)
-                            cmd_back += ',dl_vlan=%s,actions=IN_PORT' % (vlan)
-                        else:
-                            cmd += ',dl_vlan=%s,actions=output:%s' % (vlan, switch_outport_nr)
-                            cmd_back += ',dl_vlan=%s,actions=output:%s' % (vlan, switch_inport_nr)
-                # output the packet at the correct outport
-                else:
-                    cmd = 'in_port=%s' % src_sw_inport_nr
-                    cmd += ',cookie=%s' % cookie
-                    cmd += ',table=%s' % cookie
-                    cmd += ',ip'
-                    cmd += ',reg1=%s' % index
-                    cmd += ',actions='
-                    cmd += ',set_field:%s->eth_dst' % target_mac
-                    cmd += ',set_field:%s->ip_dst' % target_ip
-                    cmd += ',output:%s' % switch_outport_nr
-
-                    # reverse route
-                    cmd_back = 'in_port=%s' % switch_outport_nr
-                    cmd_back += ',cookie=%s' % cookie
-                    cmd_back += ',ip'
-                    cmd_back += ',actions='
-                    cmd_back += ',set_field:%s->eth_src' % lb_mac
-                    cmd_back += ',set_field:%s->ip_src' % plus_one
-                    cmd_back += ',output:%s' % src_sw_inport_nr
-
-                    self.setup_arp_reply_at(current_hop, switch_outport_nr, src_ip, src_mac, cookie=cookie)
-
-                # excecute the command on the target switch
-                logging.debug(cmd)
-                cmd = "\"%s\"" % cmd
-                cmd_back = "\"%s\"" % cmd_back
-                net[current_hop].dpctl(main_cmd, cmd)
-                net[current_hop].dpctl(main_cmd, cmd_back)
-
-                # set next hop for the next iteration step
-                if isinstance(next_node, OVSSwitch):
-                    switch_inport_nr = net.DCNetwork_graph[current_hop][next_hop][0]['dst_port_nr']
-                    current_hop = next_hop
-
-            # advance to next destination
-            index += 1
-
-        # set up the actual load balancing rule as a multipath on the very first switch
-        cmd = '"in_port=%s' % src_sw_inport_nr
-        cmd += ',cookie=%s' % (cookie)
-        cmd += ',ip'
-        cmd += ',actions='
-        # push 0x01 into the first register
-        cmd += 'load:0x1->NXM_NX_REG0[]'
-        # load balance modulo n over all dest interfaces
-        # TODO: in newer openvswitch implementations this should be changed to symmetric_l3l4+udp
-        # to balance any kind of traffic
-        cmd += ',multipath(symmetric_l4,1024,modulo_n,%s,0,NXM_NX_REG1[0..12])' % len(dest_intfs_mapping)
-        # reuse the cookie as table entry as it will be unique
-        cmd += ',resubmit(, %s)"' % cookie
-
-        # actually add the flow
-        logging.debug("Switch: %s, CMD: %s" % (src_sw, cmd))
-        net[src_sw].dpctl(main_cmd, cmd)
-
-        # finally add all flow data to the internal data storage
-        self.full_lb_data[(src_vnf_name, src_vnf_interface)] = data
+        data = self._new_lb(src_vnf_name, src_vnf_interface, src_sw, src_sw_inport_nr,
+                            src_ip, src_intf.MAC(), plus_one)
+        self.full_lb_data[target_pair] = data
+        try:
+            self._add_lb_backends(data, lb_data)
+        except Exception:
+            self.delete_loadbalancer(src_vnf_name, src_vnf_interface)
+            raise
+        # the route to the lb ip is only set on the source, the destinations route back to the source ip
+        self._apply_netconfig(NetConfigBatch(net.getNodeByName(src_vnf_name)).add_route(plus_one, src_vnf_interface))
+        return data["cookie"]
 
     def add_floating_lb(self, datacenter, lb_data):
         """
@@ -703,183 +454,311 @@ class OpenstackManage(object):
 
         :param datacenter: The datacenter entrypoint
         :type datacenter: ``str``
-        :param lb_data: A dictionary containing the destination data as well as custom path settings
+        :param lb_data: A dictionary containing the destination data as well as custom path settings and weights
         :type lb_data: ``dict``
+        :return: cookie and floating ip of the loadbalancer
+        :rtype: ``int``, ``str``
 
         :Example:
          lbdata = {"dst_vnf_interfaces": {"dc2_man_web0": "port-man-2",
          "dc3_man_web0": "port-man-4","dc4_man_web0": "port-man-6"}, "path": {"dc2_man_web0": {"port-man-2": [ "dc1.s1",\
-         "s1", "dc2.s1"]}}}
+         "s1", "dc2.s1"]}}, "weights": {"dc2_man_web0": 2}}
         """
-        net = self.net
-        src_sw_inport_nr = 1
-        src_sw = self.floating_switch.name
-        dest_intfs_mapping = lb_data.get('dst_vnf_interfaces', dict())
-        # a custom path can be specified as a list of switches
-        custom_paths = lb_data.get('path', dict())
-        dest_vnf_outport_nrs = list()
-
         if datacenter not in self.net.dcs:
             raise Exception(u"Source datacenter can not be found.")
-
-        # get all target interface outport numbers
-        for vnf_name in dest_intfs_mapping:
-            if vnf_name not in net.DCNetwork_graph:
-                raise Exception(u"Target VNF %s is not known." % vnf_name)
-            for connected_sw in net.DCNetwork_graph.neighbors(vnf_name):
-                link_dict = net.DCNetwork_graph[vnf_name][connected_sw]
-                for link in link_dict:
-                    if link_dict[link]['src_port_name'] == dest_intfs_mapping[vnf_name]:
-                        dest_vnf_outport_nrs.append(int(link_dict[link]['dst_port_nr']))
-
-        if len(dest_vnf_outport_nrs) == 0:
+        if len(lb_data.get('dst_vnf_interfaces', dict())) == 0:
             raise Exception("There are no paths specified for the loadbalancer")
-        src_ip = self.floating_intf.IP()
-        src_mac = self.floating_intf.MAC()
 
-        # set up paths for each destination vnf individually
-        index = 0
+        floating_ip = self.floating_network.get_new_ip_address("floating-ip").split("/")[0]
+        data = self._new_lb(self.floating_root.name, self.floating_intf.name, self.floating_switch.name, 1,
+                            self.floating_intf.IP(), self.floating_intf.MAC(), floating_ip,
+                            match="ip_dst=%s" % floating_ip)
+        data["datacenter"] = datacenter
+        try:
+            self._add_lb_backends(data, lb_data)
+        except Exception:
+            self._delete_lb(data)
+            self.floating_network.withdraw_ip_address(floating_ip)
+            raise
+        self.floating_cookies[data["cookie"]] = floating_ip
+        return data["cookie"], floating_ip
+
+    def add_lb_backend(self, cookie, dst_vnf_name, dst_vnf_interface, weight=1, path=None):
+        """
+        Add a destination to a loadbalancer or change the weight of one of its destinations.
+        Only the paths of the new destination are set up and the buckets of the select group are modified,
+        the flows of the other destinations are kept.
+
+        :param cookie: The cookie of the loadbalancer
+        :type cookie: ``int``
+        :param dst_vnf_name: Name of the destination VNF
+        :type dst_vnf_name: ``str``
+        :param dst_vnf_interface: Name of the destination VNF interface
+        :type dst_vnf_interface: ``str``
+        :param weight: share of the flows the destination gets, relative to the weights of the other destinations
+        :type weight: ``int``
+        :param path: optional custom path as a list of switches
+        :type path: ``list``
+        :return: path data of the destination
+        :rtype: ``dict``
+        """
+        data = self._get_lb(cookie)
+        weight = self._lb_weight(weight)
+        for path_data in data["paths"]:
+            if path_data["dst_vnf"] == dst_vnf_name and path_data["dst_intf"] == dst_vnf_interface:
+                path_data["weight"] = weight
+                break
+        else:
+            custom_paths = {dst_vnf_name: {dst_vnf_interface: path}} if path is not None else None
+            path_data = self._add_lb_path(data, dst_vnf_name, dst_vnf_interface,
+                                          self._lb_path(data, dst_vnf_name, dst_vnf_interface, custom_paths), weight)
+        self._set_lb_group(data, "mod-group")
+        return path_data
+
+    def remove_lb_backend(self, cookie, dst_vnf_name, dst_vnf_interface):
+        """
+        Remove a destination from a loadbalancer.
+        Its bucket is removed from the select group before the flows of its paths are deleted.
+
+        :param cookie: The cookie of the loadbalancer
+        :type cookie: ``int``
+        :param dst_vnf_name: Name of the destination VNF
+        :type dst_vnf_name: ``str``
+        :param dst_vnf_interface: Name of the destination VNF interface
+        :type dst_vnf_interface: ``str``
+        """
+        data = self._get_lb(cookie)
+        for path_data in data["paths"]:
+            if path_data["dst_vnf"] == dst_vnf_name and path_data["dst_intf"] == dst_vnf_interface:
+                break
+        else:
+            raise Exception(u"VNF %s intfs %s is not a destination of the loadbalancer with cookie %s" %
+                            (dst_vnf_name, dst_vnf_interface, cookie))
+        data["paths"].remove(path_data)
+        self._set_lb_group(data, "mod-group")
+        self._delete_flows([path_data["cookie"]])
+        if path_data["vlan"] is not None:
+            self.net.vlans.free(path_data["vlan"])
+
+    def _get_lb(self, cookie):
+        """
+        :return: the bookkeeping data of the loadbalancer with the given cookie
+        """
+        cookie = int(cookie)
+        if cookie not in self.lb_groups:
+            raise Exception(u"Loadbalancer with cookie %s is not known" % cookie)
+        return self.lb_groups[cookie]
+
+    @staticmethod
+    def _lb_weight(weight):
+        weight = int(weight)
+        if not 0 < weight <= 0xffff:
+            raise Exception(u"Loadbalancer weights have to be between 1 and 65535, not %s" % weight)
+        return weight
+
+    def _new_lb(self, src_vnf_name, src_vnf_interface, src_sw, src_sw_inport_nr, src_ip, src_mac, lb_ip, match=None):
+        """
+        Create the bookkeeping of a loadbalancer and answer ARP requests for its ip at the source port.
+        The flows and the select group are installed by :meth:`_add_lb_backends`.
+        """
         cookie = self.get_cookie()
+        data = dict()
+        data["src_vnf"] = src_vnf_name
+        data["src_intf"] = src_vnf_interface
+        data["src_ip"] = src_ip
+        data["src_mac"] = src_mac
+        data["switch"] = src_sw
+        data["in_port"] = src_sw_inport_nr
+        data["match"] = match
+        data["lb_ip"] = lb_ip
+        # stable for the lifetime of the loadbalancer, locally administered and unicast
+        data["lb_mac"] = "32:33:70:%02x:%02x:%02x" % ((cookie >> 16) & 0xff, (cookie >> 8) & 0xff, cookie & 0xff)
+        data["cookie"] = cookie
+        data["group_id"] = self.net.group_ids.allocate()
+        data["paths"] = list()
+        # stored right away, so the flows, vlans and group are freed if the setup fails
+        self.lb_groups[cookie] = data
+
+        self.setup_arp_reply_at(src_sw, src_sw_inport_nr, lb_ip, data["lb_mac"], cookie=cookie)
+        return data
+
+    def _add_lb_backends(self, data, lb_data):
+        """
+        Set up the paths to all destinations of a new loadbalancer, then its select group and
+        the flow that hands the traffic from the source port to the group.
+        """
+        custom_paths = lb_data.get('path', dict())
+        weights = lb_data.get('weights') or dict()
+        for dst_vnf_name, dst_vnf_interface in lb_data.get('dst_vnf_interfaces', dict()).items():
+            path = self._lb_path(data, dst_vnf_name, dst_vnf_interface, custom_paths)
+            self._add_lb_path(data, dst_vnf_name, dst_vnf_interface, path,
+                              self._lb_weight(weights.get(dst_vnf_name, 1)))
+        self._set_lb_group(data, "add-group")
+
+        cmd = 'in_port=%s' % data["in_port"]
+        cmd += ',cookie=%s' % data["cookie"]
+        cmd += ',ip'
+        if data["match"]:
+            cmd += ',%s' % data["match"]
+        cmd += ',actions=group:%s' % data["group_id"]
+        logging.debug("Switch: %s, CMD: %s" % (data["switch"], cmd))
+        self._add_flow(data["switch"], "add-flow -OOpenFlow13", "\"%s\"" % cmd, data["cookie"])
+
+    def _lb_path(self, data, dst_vnf_name, dst_vnf_interface, custom_paths):
+        """
+        :return: the custom path to a destination of a loadbalancer if one is supplied, else the shortest path
+        """
+        if not self.check_vnf_intf_pair(dst_vnf_name, dst_vnf_interface):
+            raise Exception(u"VNF %s or intfs %s does not exist" % (dst_vnf_name, dst_vnf_interface))
+        # json does not support hashing on tuples so we use nested dicts
+        if custom_paths and dst_vnf_interface in custom_paths.get(dst_vnf_name, dict()):
+            path = custom_paths[dst_vnf_name][dst_vnf_interface]
+            logging.debug("Taking custom path from %s to %s: %s" % (data["src_vnf"], dst_vnf_name, path))
+            return path
+        datacenter = data.get("datacenter")
+        if datacenter is not None and datacenter not in self.floating_links:
+            self.floating_links[datacenter] = self.net.addLink(self.floating_switch, datacenter)
+        ret = self._get_path(data["src_vnf"], dst_vnf_name, data["src_intf"], dst_vnf_interface)
+        if not isinstance(ret, tuple):
+            raise Exception(u"Can not find a valid path. Are you specifying the right interfaces?.")
+        return ret[0]
+
+    def _add_lb_path(self, data, dst_vnf_name, dst_vnf_interface, path, weight):
+        """
+        Set up the flows of the path to one destination of a loadbalancer, under a cookie of its own.
+        The flow on the first switch towards the destination is a bucket of the select group instead,
+        see :meth:`_lb_bucket`.
+
+        :return: path data of the destination
+        :rtype: ``dict``
+        """
+        net = self.net
+        intf = net[dst_vnf_name].nameToIntf[dst_vnf_interface]
+        dst_sw_outport_nr = net.find_connected_switch(dst_vnf_name, dst_vnf_interface)[1]
+
+        path_data = dict()
+        path_data["dst_vnf"] = dst_vnf_name
+        path_data["dst_intf"] = dst_vnf_interface
+        path_data["path"] = path
+        path_data["weight"] = weight
+        path_data["target_mac"] = str(intf.MAC())
+        path_data["target_ip"] = str(intf.IP())
+        path_data["cookie"] = self.get_cookie()
+        # choose free vlan if path contains more than 1 switch
+        path_data["vlan"] = net.vlans.allocate() if len(path) > 1 else None
+        try:
+            self._add_lb_path_flows(data, path_data, dst_sw_outport_nr)
+        except Exception:
+            self._delete_flows([path_data["cookie"]])
+            if path_data["vlan"] is not None:
+                net.vlans.free(path_data["vlan"])
+            raise
+        data["paths"].append(path_data)
+        self._apply_netconfig(NetConfigBatch(net.getNodeByName(dst_vnf_name)).add_route(data["src_ip"],
+                                                                                         dst_vnf_interface))
+        return path_data
+
+    def _add_lb_path_flows(self, data, path_data, dst_sw_outport_nr):
+        net = self.net
+        path = path_data["path"]
+        vlan = path_data["vlan"]
+        cookie = path_data["cookie"]
+        dst_vnf_name = path_data["dst_vnf"]
         main_cmd = "add-flow -OOpenFlow13"
-        floating_ip = self.floating_network.get_new_ip_address("floating-ip").split("/")[0]
+        current_hop = data["switch"]
+        switch_inport_nr = data["in_port"]
 
-        for dst_vnf_name, dst_vnf_interface in dest_intfs_mapping.items():
-            path = None
-            # use custom path if one is supplied
-            # json does not support hashing on tuples so we use nested dicts
-            if custom_paths is not None and dst_vnf_name in custom_paths:
-                if dst_vnf_interface in custom_paths[dst_vnf_name]:
-                    path = custom_paths[dst_vnf_name][dst_vnf_interface]
-                    logging.debug("Taking custom path to %s: %s" % (dst_vnf_name, path))
+        for i in range(0, len(path)):
+            if i < len(path) - 1:
+                next_hop = path[i + 1]
             else:
-                if datacenter not in self.floating_links:
-                    self.floating_links[datacenter] = \
-                        net.addLink(self.floating_switch, datacenter)
-                path = \
-                self._get_path(self.floating_root.name, dst_vnf_name, self.floating_intf.name, dst_vnf_interface)[0]
-
-            if isinstance(path, dict):
-                self.delete_flow_by_cookie(cookie)
-                raise Exception(u"Can not find a valid path. Are you specifying the right interfaces?.")
-
-            intf = net[dst_vnf_name].nameToIntf[dst_vnf_interface]
-            target_mac = str(intf.MAC())
-            target_ip = str(intf.IP())
-            dst_sw_outport_nr = dest_vnf_outport_nrs[index]
-            current_hop = src_sw
-            switch_inport_nr = src_sw_inport_nr
-            vlan = net.vlans.pop()
-
-            # iterate all switches on the path
-            for i in range(0, len(path)):
-                if i < len(path) - 1:
-                    next_hop = path[i + 1]
-                else:
-                    # last switch reached
-                    next_hop = dst_vnf_name
-                next_node = net.getNodeByName(next_hop)
-
-                # sanity checks
-                if next_hop == dst_vnf_name:
-                    switch_outport_nr = dst_sw_outport_nr
-                    logging.info("end node reached: {0}".format(dst_vnf_name))
-                elif not isinstance(next_node, OVSSwitch):
-                    logging.info("Next node: {0} is not a switch".format(next_hop))
-                    return "Next node: {0} is not a switch".format(next_hop)
-                else:
-                    # take first link between switches by default
-                    index_edge_out = 0
-                    switch_outport_nr = net.DCNetwork_graph[current_hop][next_hop][index_edge_out]['src_port_nr']
-
-                # default filters, just overwritten on the first node and last node
-                cmd = 'priority=1,in_port=%s,cookie=%s' % (switch_inport_nr, cookie)
-                cmd_back = 'priority=1,in_port=%s,cookie=%s' % (switch_outport_nr, cookie)
-                if i == 0:  # first node
-                    cmd = 'in_port=%s' % src_sw_inport_nr
-                    cmd += ',cookie=%s' % cookie
-                    cmd += ',table=%s' % cookie
-                    cmd += ',ip'
-                    cmd += ',ip_dst=%s' % floating_ip
-                    cmd += ',reg1=%s' % index
-                    cmd += ',actions='
-                    # set vlan id
-                    cmd += ',push_vlan:0x8100'
-                    masked_vlan = vlan | 0x1000
-                    cmd += ',set_field:%s->vlan_vid' % masked_vlan
-                    cmd += ',set_field:%s->eth_dst' % target_mac
-                    cmd += ',set_field:%s->ip_dst' % target_ip
-                    cmd += ',output:%s' % switch_outport_nr
-
-                    # last switch for reverse route
-                    # remove any vlan tags
-                    cmd_back += ',dl_vlan=%s' % vlan
-                    cmd_back += ',actions=pop_vlan,output:%s' % switch_inport_nr
-                    self.setup_arp_reply_at(current_hop, src_sw_inport_nr, floating_ip, target_mac, cookie=cookie)
-                elif next_hop == dst_vnf_name:  # last switch
-                    # remove any vlan tags
-                    cmd += ',dl_vlan=%s' % vlan
-                    cmd += ',actions=pop_vlan,output:%s' % switch_outport_nr
-                    # set up arp replys at the port so the dst nodes know the src
-                    self.setup_arp_reply_at(current_hop, switch_outport_nr, src_ip, src_mac, cookie=cookie)
-
-                    # reverse route
-                    cmd_back = 'in_port=%s' % switch_outport_nr
-                    cmd_back += ',cookie=%s' % cookie
-                    cmd_back += ',ip'
-                    cmd_back += ',actions='
+                # last switch reached
+                next_hop = dst_vnf_name
+            next_node = net.getNodeByName(next_hop)
+            if next_hop == dst_vnf_name:
+                switch_outport_nr = dst_sw_outport_nr
+                logging.info("end node reached: {0}".format(dst_vnf_name))
+            elif not isinstance(next_node, OVSSwitch):
+                raise Exception(u"Next node: {0} is not a switch".format(next_hop))
+            else:
+                # take first link between switches by default
+                index_edge_out = 0
+                switch_outport_nr = net.DCNetwork_graph[current_hop][next_hop][index_edge_out]['src_port_nr']
+
+            cmds = list()
+            if i == 0:
+                # the way to the destination is a bucket of the select group
+                path_data["out_port"] = switch_outport_nr
+            if next_hop == dst_vnf_name:
+                # reverse route, the destination answers as the loadbalancer
+                cmd_back = 'in_port=%s' % switch_outport_nr
+                cmd_back += ',cookie=%s' % cookie
+                cmd_back += ',ip'
+                cmd_back += ',actions='
+                if vlan is not None:
                     cmd_back += 'push_vlan:0x8100'
-                    masked_vlan = vlan | 0x1000
-                    cmd_back += ',set_field:%s->vlan_vid' % masked_vlan
-                    cmd_back += ',set_field:%s->eth_src' % src_mac
-                    cmd_back += ',set_field:%s->ip_src' % floating_ip
-                    cmd_back += ',output:%s' % switch_inport_nr
-                    net.getNodeByName(dst_vnf_name).setHostRoute(src_ip, dst_vnf_interface)
-                else:  # middle node
-                    # if we have a circle in the path we need to specify this, as openflow will ignore the packet
-                    # if we just output it on the same port as it came in
-                    if switch_inport_nr == switch_outport_nr:
-                        cmd += ',dl_vlan=%s,actions=IN_PORT' % (vlan)
-                        cmd_back += ',dl_vlan=%s,actions=IN_PORT' % (vlan)
-                    else:
-                        cmd += ',dl_vlan=%s,actions=output:%s' % (vlan, switch_outport_nr)
-                        cmd_back += ',dl_vlan=%s,actions=output:%s' % (vlan, switch_inport_nr)
-
-                # excecute the command on the target switch
+                    cmd_back += ',set_field:%s->vlan_vid,' % (vlan | 0x1000)
+                cmd_back += 'set_field:%s->eth_src' % data["lb_mac"]
+                cmd_back += ',set_field:%s->ip_src' % data["lb_ip"]
+                cmd_back += ',output:%s' % switch_inport_nr
+                cmds.append(cmd_back)
+                if i > 0:
+                    # remove any vlan tags
+                    cmds.append('priority=1,in_port=%s,cookie=%s,dl_vlan=%s,actions=pop_vlan,output:%s' % (
+                        switch_inport_nr, cookie, vlan, switch_outport_nr))
+                # set up arp replys at the port so the dst nodes know the src
+                self.setup_arp_reply_at(current_hop, switch_outport_nr, data["src_ip"], data["src_mac"],
+                                        cookie=cookie)
+            elif i == 0:
+                # last switch for reverse route, remove any vlan tags
+                cmds.append('priority=1,in_port=%s,cookie=%s,dl_vlan=%s,actions=pop_vlan,output:%s' % (
+                    switch_outport_nr, cookie, vlan, switch_inport_nr))
+            else:
+                # if we have a circle in the path we need to specify this, as openflow will ignore the packet
+                # if we just output it on the same port as it came in
+                cmd = 'priority=1,in_port=%s,cookie=%s,dl_vlan=%s' % (switch_inport_nr, cookie, vlan)
+                cmd_back = 'priority=1,in_port=%s,cookie=%s,dl_vlan=%s' % (switch_outport_nr, cookie, vlan)
+                if switch_inport_nr == switch_outport_nr:
+                    cmds.append(cmd + ',actions=IN_PORT')
+                    cmds.append(cmd_back + ',actions=IN_PORT')
+                else:
+                    cmds.append(cmd + ',actions=output:%s' % switch_outport_nr)
+                    cmds.append(cmd_back + ',actions=output:%s' % switch_inport_nr)
+
+            # excecute the commands on the target switch
+            for cmd in cmds:
                 logging.debug(cmd)
-                cmd = "\"%s\"" % cmd
-                cmd_back = "\"%s\"" % cmd_back
-                net[current_hop].dpctl(main_cmd, cmd)
-                net[current_hop].dpctl(main_cmd, cmd_back)
-
-                # set next hop for the next iteration step
-                if isinstance(next_node, OVSSwitch):
-                    switch_inport_nr = net.DCNetwork_graph[current_hop][next_hop][0]['dst_port_nr']
-                    current_hop = next_hop
-
-            # advance to next destination
-            index += 1
-
-        # set up the actual load balancing rule as a multipath on the very first switch
-        cmd = '"in_port=%s' % src_sw_inport_nr
-        cmd += ',cookie=%s' % (cookie)
-        cmd += ',ip'
-        cmd += ',actions='
-        # push 0x01 into the first register
-        cmd += 'load:0x1->NXM_NX_REG0[]'
-        # load balance modulo n over all dest interfaces
-        # TODO: in newer openvswitch implementations this should be changed to symmetric_l3l4+udp
-        # to balance any kind of traffic
-        cmd += ',multipath(symmetric_l4,1024,modulo_n,%s,0,NXM_NX_REG1[0..12])' % len(dest_intfs_mapping)
-        # reuse the cookie as table entry as it will be unique
-        cmd += ',resubmit(, %s)"' % cookie
+                self._add_flow(current_hop, main_cmd, "\"%s\"" % cmd, cookie)
 
-        # actually add the flow
-        logging.debug("Switch: %s, CMD: %s" % (src_sw, cmd))
-        net[src_sw].dpctl(main_cmd, cmd)
+            # set next hop for the next iteration step
+            if isinstance(next_node, OVSSwitch):
+                switch_inport_nr = net.DCNetwork_graph[current_hop][next_hop][0]['dst_port_nr']
+                current_hop = next_hop
 
-        self.floating_cookies[cookie] = floating_ip
+    @staticmethod
+    def _lb_bucket(path_data):
+        """
+        :return: ovs-ofctl bucket of the select group that sends a flow on the path to a destination
+        """
+        actions = ['weight:%s' % path_data["weight"]]
+        if path_data["vlan"] is not None:
+            actions.append('push_vlan:0x8100')
+            actions.append('set_field:%s->vlan_vid' % (path_data["vlan"] | 0x1000))
+        actions.append('set_field:%s->eth_dst' % path_data["target_mac"])
+        actions.append('set_field:%s->ip_dst' % path_data["target_ip"])
+        actions.append('output:%s' % path_data["out_port"])
+        return 'bucket=%s' % ','.join(actions)
 
-        return cookie, floating_ip
+    def _set_lb_group(self, data, main_cmd):
+        """
+        Add the select group of a loadbalancer or replace its buckets (main_cmd add-group or mod-group).
+        The switch picks the bucket per flow, weighted by the bucket weights.
+        """
+        cmd = 'group_id=%s,type=select' % data["group_id"]
+        for path_data in data["paths"]:
+            cmd += ',%s' % self._lb_bucket(path_data)
+        logging.debug("Switch: %s, %s: %s" % (data["switch"], main_cmd, cmd))
+        self.net[data["switch"]].dpctl("%s -OOpenFlow13" % main_cmd, "\"%s\"" % cmd)
 
     def setup_arp_reply_at(self, switch, port_nr, target_ip, target_mac, cookie=None):
         """
@@ -926,7 +805,7 @@ class OpenstackManage(object):
         cmd += ',load:0x%s->NXM_OF_ARP_SPA[]' % dst_ip_hex
         # output to incoming port remember the closing "
         cmd += ',IN_PORT"'
-        self.net[switch].dpctl(main_cmd, cmd)
+        self._add_flow(switch, main_cmd, cmd, cookie)
         logging.debug(
             "Set up ARP reply at %s port %s." % (switch, port_nr))
 
@@ -942,24 +821,56 @@ class OpenstackManage(object):
         if not cookie:
             return False
         logging.debug("Deleting flow by cookie %d" % (cookie))
-        flows = list()
-        # we have to call delete-group for each switch
-        for node in self.net.switches:
-            flow = dict()
-            flow["dpid"] = int(node.dpid, 16)
-            flow["cookie"] = cookie
-            flow['cookie_mask'] = int('0xffffffffffffffff', 16)
-
-            flows.append(flow)
-        for flow in flows:
-            logging.debug("Deleting flowentry with cookie %d" % (
-                flow["cookie"]))
-            if self.net.controller == RemoteController:
-                self.net.ryu_REST('stats/flowentry/delete', data=flow)
-
-        self.cookies.remove(cookie)
+        self._delete_flows([cookie])
         return True
 
+    def _delete_flows(self, cookies, group=None):
+        """
+        Delete the flows with the given cookies from the switches holding them, and optionally a group.
+        With Ryu all deletes are sent in a single request.
+
+        :param cookies: list of cookies
+        :param group: (switch, group_id) of a group to delete after the flows, or None
+        """
+        flows = list()
+        dpctl_cmds = list()
+        for cookie in cookies:
+            # only the switches that hold flows with this cookie
+            for node in self._cookie_switches([cookie]):
+                flow = dict()
+                flow["cmd"] = "delete"
+                flow["dpid"] = int(node.dpid, 16)
+                flow["cookie"] = cookie
+                flow['cookie_mask'] = int('0xffffffffffffffff', 16)
+
+                flows.append(flow)
+                dpctl_cmds.append((node, "del-flows -OOpenFlow13", "\"cookie=%s/-1\"" % cookie))
+            self.cookies.discard(cookie)
+        if group is not None:
+            node = self.net.getNodeByName(group[0])
+            flows.append({"cmd": "group_delete", "dpid": int(node.dpid, 16), "group_id": group[1]})
+            dpctl_cmds.append((node, "del-groups -OOpenFlow13", "\"group_id=%s\"" % group[1]))
+        if self.net.controller == RemoteController:
+            self.net.ryu_REST_bulk(flows)
+        else:
+            for node, main_cmd, cmd in dpctl_cmds:
+                node.dpctl(main_cmd, cmd)
+
+    def _cookie_switches(self, cookies):
+        """
+        Get the switches holding flows with the given cookies and remove these flows from the flow registry.
+        Falls back to all switches if no flows with these cookies are registered.
+
+        :param cookies: list of cookies
+        :return: list of switch nodes
+        """
+        switches = set()
+        for cookie in cookies:
+            switches |= self.net.flow_registry.remove_cookie(cookie)
+        if not switches:
+            return self.net.switches
+        return [self.net.getNodeByName(sw) for sw in sorted(switches)]
+
     def delete_chain_by_intf(self, src_vnf_name, src_vnf_intf, dst_vnf_name, dst_vnf_intf):
         """
         Removes a flow identified by the vnf_name/vnf_intf pairs
@@ -999,40 +910,10 @@ class OpenstackManage(object):
         :param src_vnf_name: Name of the source VNF
         :param src_vnf_interface: Name of the destination VNF
         '''
-        flows = list()
-        # we have to call delete-group for each switch
-        delete_group = list()
-        group_id = self.get_flow_group(vnf_src_name, vnf_src_interface)
-        for node in self.net.switches:
-            for cookie in self.lb_flow_cookies[(vnf_src_name, vnf_src_interface)]:
-                flow = dict()
-                flow["dpid"] = int(node.dpid, 16)
-                flow["cookie"] = cookie
-                flow['cookie_mask'] = int('0xffffffffffffffff', 16)
-
-                flows.append(flow)
-            group_del = dict()
-            group_del["dpid"] = int(node.dpid, 16)
-            group_del["group_id"] = group_id
-            delete_group.append(group_del)
-
-        for flow in flows:
-            logging.debug("Deleting flowentry with cookie %d belonging to lb at %s:%s" % (
-                flow["cookie"], vnf_src_name, vnf_src_interface))
-            if self.net.controller == RemoteController:
-                self.net.ryu_REST('stats/flowentry/delete', data=flow)
-
-        logging.debug("Deleting group with id %s" % group_id)
-        for switch_del_group in delete_group:
-            if self.net.controller == RemoteController:
-                self.net.ryu_REST("stats/groupentry/delete", data=switch_del_group)
-
-        # unmap groupid from the interface
         target_pair = (vnf_src_name, vnf_src_interface)
-        if target_pair in self.flow_groups:
-            del self.flow_groups[target_pair]
-        if target_pair in self.full_lb_data:
-            del self.full_lb_data[target_pair]
+        if target_pair not in self.full_lb_data:
+            raise Exception(u"There is no loadbalancer at %s:%s" % target_pair)
+        self._delete_lb(self.full_lb_data.pop(target_pair))
 
     def delete_floating_lb(self, cookie):
         """
@@ -1045,10 +926,26 @@ class OpenstackManage(object):
         if cookie not in self.floating_cookies:
             raise Exception("Can not delete floating loadbalancer as the flowcookie is not known")
 
-        self.delete_flow_by_cookie(cookie)
-        floating_ip = self.floating_cookies[cookie]
+        self._delete_lb(self.lb_groups[cookie])
+        floating_ip = self.floating_cookies.pop(cookie)
         self.floating_network.withdraw_ip_address(floating_ip)
 
+    def _delete_lb(self, data):
+        """
+        Delete the flows of a loadbalancer and its paths, and its select group.
+        The deletes only go to the switches the flows were installed on and the switch holding the group.
+        """
+        self.lb_groups.pop(data["cookie"], None)
+        cookies = [data["cookie"]] + [path["cookie"] for path in data["paths"]]
+        logging.debug("Deleting flowentries with cookies %s and group %s belonging to lb at %s:%s" % (
+            cookies, data["group_id"], data["src_vnf"], data["src_intf"]))
+        self._delete_flows(cookies, group=(data["switch"], data["group_id"]))
+        # give the vlans of the paths and the group id back to the pool
+        for path in data["paths"]:
+            if path["vlan"] is not None:
+                self.net.vlans.free(path["vlan"])
+        self.net.group_ids.free(data["group_id"])
+
     def set_arp_entry(self, vnf_name, vnf_interface, ip, mac):
         """
         Sets an arp entry on the specified VNF. This is done on the node directly and not by open vswitch!
@@ -1062,4 +959,16 @@ class OpenstackManage(object):
         :type mac: ``str``
         """
         node = self.net.getNodeByName(vnf_name)
-        node.cmd("arp -i %s -s %s %s" % (vnf_interface, ip, mac))
+        self._apply_netconfig(NetConfigBatch(node).add_arp(vnf_interface, ip, mac))
+
+    def _apply_netconfig(self, batch):
+        """
+        Apply the network changes of a node and log the ones that failed.
+        :param batch: NetConfigBatch of the node
+        :return: list of NetConfigError
+        """
+        errors = batch.apply()
+        for error in errors:
+            logging.error("Network configuration of %s failed: %s%r: %s" %
+                          (batch.node.name, error.op, error.args, error.message))
+        return errors
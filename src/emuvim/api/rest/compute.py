@@ -127,7 +127,8 @@ class ComputeList(Resource):
                 all_containers = []
                 all_extSAPs = []
                 for dc in dcs.itervalues():
-                    all_containers += dc.listCompute()
+                    # only the DCs of this endpoint, the registry is shared by all DCs of the network
+                    all_containers += dc.net.container_registry.list(dc.label)
                     all_extSAPs += dc.listExtSAPs()
 
                 extSAP_list = [(sap.name, sap.getStatus()) for sap in all_extSAPs]
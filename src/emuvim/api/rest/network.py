@@ -61,6 +61,8 @@ class NetworkAction(Resource):
     :param skip_vlan_tag: boolean to indicate whether a new vlan tag should be created for this chain
     :param monitor: boolean to indicate whether a new vlan tag should be created for this chain
     :param monitor_placement: 'tx'=place the monitoring flowrule at the beginning of the chain, 'rx'=place at the end of the chain
+    :param bandwidth: bandwidth demand in Mbit/s, the chain is routed over links with enough unreserved bandwidth
+    :param multipath: boolean to spread the chain over all equal-cost paths and parallel links
     :return: message string indicating if the chain action is succesful or not
     """
 
@@ -102,6 +104,8 @@ class NetworkAction(Resource):
             skip_vlan_tag = data.get("skip_vlan_tag")
             monitor = data.get("monitor")
             monitor_placement = data.get("monitor_placement")
+            bandwidth = data.get("bandwidth")
+            multipath = data.get("multipath")
 
             c = net.setChain(
                 vnf_src_name, vnf_dst_name,
@@ -115,7 +119,9 @@ class NetworkAction(Resource):
                 priority=priority,
                 skip_vlan_tag=skip_vlan_tag,
                 monitor=monitor,
-                monitor_placement=monitor_placement)
+                monitor_placement=monitor_placement,
+                bandwidth=bandwidth,
+                multipath=multipath)
             # return setChain response
             return str(c), 200, CORS_HEADER
         except Exception as ex:
@@ -149,4 +155,44 @@ class DrawD3jsgraph(Resource):
                 links.append(edge_dict)
 
         json = {"nodes":nodes, "links":links}
-        return json, 200, CORS_HEADER
\ No newline at end of file
+        return json, 200, CORS_HEADER
+
+
+class NetworkSegments(Resource):
+    """
+    Usage of the vlan tags (and mpls labels) that isolate the chains, E-LANs and load balancers.
+    """
+
+    global net
+
+    def get(self):
+        try:
+            return net.segment_usage(), 200, CORS_HEADER
+        except Exception as ex:
+            logging.exception("API error.")
+            return ex.message, 500, CORS_HEADER
+
+
+class NetworkMultipathStats(Resource):
+    """
+    Counters of the links a multipath chain is spread over.
+    :param vnf_src_name: VNF name of the source of the chain
+    :param vnf_dst_name: VNF name of the destination of the chain
+    :param vnf_src_interface: VNF interface name of the source of the chain
+    :param vnf_dst_interface: VNF interface name of the destination of the chain
+    """
+
+    global net
+
+    def get(self):
+        try:
+            data = request.args
+            stats = net.getMultipathStats(data.get("vnf_src_name"), data.get("vnf_dst_name"),
+                                          vnf_src_interface=data.get("vnf_src_interface"),
+                                          vnf_dst_interface=data.get("vnf_dst_interface"))
+            if stats is None:
+                return "no multipath chain found", 404, CORS_HEADER
+            return stats, 200, CORS_HEADER
+        except Exception as ex:
+            logging.exception("API error.")
+            return ex.message, 500, CORS_HEADER
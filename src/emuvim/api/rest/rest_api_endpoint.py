@@ -38,7 +38,7 @@ from compute import dcs, ComputeList, Compute, ComputeResources, DatacenterList,
 
 # need to import total module to set its global variable net
 import network
-from network import NetworkAction, DrawD3jsgraph
+from network import NetworkAction, DrawD3jsgraph, NetworkSegments, NetworkMultipathStats
 
 import monitor
 from monitor import MonitorInterfaceAction, MonitorFlowAction, MonitorLinkAction, MonitorSkewAction, MonitorTerminal
@@ -90,6 +90,10 @@ class RestApiEndpoint(object):
                               "/restapi/network")
         self.api.add_resource(DrawD3jsgraph,
                               "/restapi/network/d3jsgraph")
+        self.api.add_resource(NetworkSegments,
+                              "/restapi/network/segments")
+        self.api.add_resource(NetworkMultipathStats,
+                              "/restapi/network/multipath")
 
         # monitoring related actions
         # export a network interface traffic rate counter
@@ -40,6 +40,7 @@ import zipfile
 import yaml
 import threading
 from docker import DockerClient, APIClient
+from emuvim.dcemulator.netconfig import NetConfigBatch
 from flask import Flask, request
 import flask_restful as fr
 from collections import defaultdict
@@ -75,6 +76,9 @@ DEPLOY_SAP = False
 # flag to indicate if we use bidirectional forwarding rules in the automatic chaining process
 BIDIRECTIONAL_CHAIN = False
 
+# install the forwarding entries of the E-LANs instead of relying on the learning switch
+PROACTIVE_ELAN = False
+
 # override the management interfaces in the descriptors with default docker0 interfaces in the containers
 USE_DOCKER_MGMT = False
 
@@ -236,8 +240,8 @@ class Service(object):
     def stop_service(self, instance_uuid):
         """
         This method stops a running service instance.
-        It iterates over all VNF instances, stopping them each
-        and removing them from their data center.
+        It stops all VNF instances in parallel
+        and removes them from their data centers.
 
         :param instance_uuid: the uuid of the service instance to be stopped
         """
@@ -250,8 +254,9 @@ class Service(object):
         self._trigger_emulator_stop_scripts_in_vnfis(vnf_instances)
         time.sleep(VNF_STOP_WAIT_TIME)
 
-        for v in vnf_instances:
-            self._stop_vnfi(v)
+        # remove all vnf instances of the service in parallel
+        LOG.info("Stopping %d vnf instances of service %r" % (len(vnf_instances), self.uuid))
+        GK.net.stopComputes([v.name for v in vnf_instances])
 
         for sap_name in self.saps_ext:
             ext_sap = self.saps[sap_name]
@@ -370,20 +375,6 @@ class Service(object):
 
             return vnfi
 
-    def _stop_vnfi(self, vnfi):
-        """
-        Stop a VNF instance.
-
-        :param vnfi: vnf instance to be stopped
-        """
-        # Find the correct datacenter
-        status = vnfi.getStatus()
-        dc = vnfi.datacenter
-
-        # stop the vnfi
-        LOG.info("Stopping the vnf instance contained in %r in DC %r" % (status["name"], dc))
-        dc.stopCompute(status["name"])
-
     def _get_vnf_instance(self, instance_uuid, vnf_id):
         """
         Returns the Docker object for the given VNF id (or Docker name).
@@ -392,9 +383,10 @@ class Service(object):
         :return:
         """
         dn = vnf_id
-        for vnfi in self.instances[instance_uuid]["vnf_instances"]:
-            if vnfi.name == dn:
-                return vnfi
+        # network wide lookup by name or docker id, restricted to this service instance
+        vnfi = get_dc_network().getContainer(dn)
+        if vnfi is not None and vnfi in self.instances[instance_uuid]["vnf_instances"]:
+            return vnfi
         LOG.warning("No container with name: {0} found.".format(dn))
         return None
 
@@ -409,20 +401,22 @@ class Service(object):
         :return:
         """
 
+        batch = NetConfigBatch(vnfi)
         # assign new ip address
         if net_str is not None:
             intf = vnfi.intf(intf=if_name)
             if intf is not None:
-                intf.setIP(net_str)
-                LOG.debug("Reconfigured network of %s:%s to %r" % (vnfi.name, if_name, net_str))
+                batch.set_ip(if_name, net_str)
             else:
                 LOG.warning("Interface not found: %s:%s. Network reconfiguration skipped." % (vnfi.name, if_name))
 
         if new_name is not None:
-            vnfi.cmd('ip link set', if_name, 'down')
-            vnfi.cmd('ip link set', if_name, 'name', new_name)
-            vnfi.cmd('ip link set', new_name, 'up')
-            LOG.debug("Reconfigured interface name of %s:%s to %s" % (vnfi.name, if_name, new_name))
+            batch.rename(if_name, new_name)
+
+        errors = batch.apply()
+        if not errors:
+            LOG.debug("Reconfigured network of %s:%s (ip: %r, name: %r)" % (vnfi.name, if_name, net_str, new_name))
+        return errors
 
 
 
@@ -711,8 +705,8 @@ class Service(object):
                     # add this vnf and interface to the E-LAN for tagging
                     elan_vnf_list.append({'name': src_docker_name, 'interface': intf_name})
 
-            # install the VLAN tags for this E-LAN
-            GK.net.setLAN(elan_vnf_list)
+            # install the VLAN tags (and with PROACTIVE_ELAN the forwarding entries) for this E-LAN
+            GK.net.setLAN(elan_vnf_list, proactive=PROACTIVE_ELAN)
 
 
     def _load_docker_files(self):
@@ -120,7 +120,8 @@ class MultiDatacenterApi(object):
                 # return list with all compute nodes in all DCs
                 all_containers = []
                 for dc in self.dcs.itervalues():
-                    all_containers += dc.listCompute()
+                    # only the DCs of this endpoint, the registry is shared by all DCs of the network
+                    all_containers += dc.net.container_registry.list(dc.label)
                 return [(c.name, c.getStatus())
                         for c in all_containers]
             else:
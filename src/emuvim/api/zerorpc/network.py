@@ -107,7 +107,8 @@ class DCNetworkApi(object):
                 weight=kwargs.get('weight'),
                 match=kwargs.get('match'),
                 bidirectional=kwargs.get('bidirectional'),
-                cookie=kwargs.get('cookie'))
+                cookie=kwargs.get('cookie'),
+                bandwidth=kwargs.get('bandwidth'))
             return str(c)
         except Exception as ex:
             logging.exception("RPC error.")
@@ -0,0 +1,176 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Proactive forwarding of the E-LANs of the DCNetwork.
+
+Instead of relying on a learning switch, the flow entries of an E-LAN are
+computed from the MACs and switch ports of its members. The member switches
+are connected by a tree of shortest paths. On every switch of the tree:
+
+table 0: frames from member ports are tagged with the E-LAN vlan,
+         tagged frames from the tree links are accepted, both continue in
+         ELAN_TABLE
+ELAN_TABLE: frames to a member MAC go to the member port (untagged) or the
+            tree link towards its switch, all other frames (broadcast,
+            multicast, unknown unicast) are flooded along the tree
+
+Flows are kept as (table, priority, match, actions) with the match in
+ovs-ofctl syntax and the actions as tuples, so they can be sent with
+ovs-ofctl or the Ryu REST API.
+"""
+from collections import namedtuple, OrderedDict, deque
+
+# table with the forwarding entries of the E-LANs
+ELAN_TABLE = 1
+# below the chains (DCNetwork.DEFAULT_PRIORITY), above the default entries of the learning switch
+ELAN_PRIORITY = 500
+ELAN_FLOOD_PRIORITY = 400
+# cookie of the flows of an E-LAN: prefix | vlan
+ELAN_COOKIE = 0x454c414e00000000
+
+ElanMember = namedtuple('ElanMember', ['name', 'interface', 'switch', 'port_nr', 'port_name', 'mac'])
+
+
+def elan_cookie(vlan):
+    return ELAN_COOKIE | int(vlan)
+
+
+def member_tree(paths, switches):
+    """
+    Connect the switches of the members with the shortest paths from the first one.
+    :param paths: dict switch -> shortest path (list of switches) from the first switch
+    :param switches: member switches, the first one is the root of the tree
+    :return: dict switch -> list of neighbor switches in the tree
+    :raises ValueError: if a switch cannot be reached from the root
+    """
+    tree = OrderedDict([(switches[0], [])])
+    for sw in switches[1:]:
+        path = paths.get(sw)
+        if path is None:
+            raise ValueError("no path between switches {0} and {1}".format(switches[0], sw))
+        for u, v in zip(path, path[1:]):
+            if v in tree:
+                continue
+            tree[v] = [u]
+            tree[u].append(v)
+    return tree
+
+
+def _next_hops(tree, target):
+    """
+    :return: dict switch -> neighbor on the tree path to target
+    """
+    hops = {}
+    queue = deque([target])
+    seen = set([target])
+    while queue:
+        sw = queue.popleft()
+        for nb in tree[sw]:
+            if nb not in seen:
+                seen.add(nb)
+                hops[nb] = sw
+                queue.append(nb)
+    return hops
+
+
+def elan_flows(vlan, members, tree, link_port):
+    """
+    Compute the flow entries of an E-LAN.
+    :param members: list of ElanMember, members without mac only receive flooded frames
+    :param tree: dict switch -> neighbor switches (see member_tree)
+    :param link_port: function(switch, neighbor) -> port nr of the link from switch to neighbor
+    :return: dict switch -> list of (table, priority, match, actions)
+    """
+    local = dict((sw, [m for m in members if m.switch == sw]) for sw in tree)
+    next_hop = dict((sw, _next_hops(tree, sw)) for sw in set(m.switch for m in members))
+    flows = OrderedDict()
+    for sw, neighbors in tree.items():
+        trunks = [link_port(sw, nb) for nb in neighbors]
+        entries = []
+        for m in local[sw]:
+            entries.append((0, ELAN_PRIORITY, 'in_port=%s' % m.port_nr,
+                            [('push_vlan', vlan), ('goto_table', ELAN_TABLE)]))
+        for port in trunks:
+            entries.append((0, ELAN_PRIORITY, 'in_port=%s,dl_vlan=%s' % (port, vlan),
+                            [('goto_table', ELAN_TABLE)]))
+        for m in members:
+            if m.mac is None:
+                continue
+            match = 'dl_vlan=%s,dl_dst=%s' % (vlan, m.mac)
+            if m.switch == sw:
+                actions = [('strip_vlan',), ('output', m.port_nr)]
+            else:
+                actions = [('output', link_port(sw, next_hop[m.switch][sw]))]
+            entries.append((ELAN_TABLE, ELAN_PRIORITY, match, actions))
+        # frames are never sent back to their in_port
+        flood = [('output', port) for port in trunks]
+        if local[sw]:
+            flood += [('strip_vlan',)] + [('output', m.port_nr) for m in local[sw]]
+        entries.append((ELAN_TABLE, ELAN_FLOOD_PRIORITY, 'dl_vlan=%s' % vlan, flood))
+        flows[sw] = entries
+    return flows
+
+
+def to_ofctl(cookie, flow):
+    """
+    :return: flow entry in ovs-ofctl syntax (OpenFlow 1.3)
+    """
+    table, priority, match, actions = flow
+    ofactions = []
+    for action in actions:
+        if action[0] == 'push_vlan':
+            # pushes a vlan header if the frame has none
+            ofactions.append('mod_vlan_vid:%s' % action[1])
+        elif action[0] == 'strip_vlan':
+            ofactions.append('strip_vlan')
+        elif action[0] == 'output':
+            ofactions.append('output:%s' % action[1])
+        elif action[0] == 'goto_table':
+            ofactions.append('goto_table:%s' % action[1])
+    return 'cookie=%s,table=%s,priority=%s,%s,actions=%s' % (cookie, table, priority, match, ','.join(ofactions))
+
+
+def to_ryu(dpid, cookie, flow, parse_match):
+    """
+    :param parse_match: function converting an ovs-ofctl match into a Ryu match dict
+    :return: flow entry in the format of Ryu's ofctl_rest
+    """
+    table, priority, match, actions = flow
+    ryu_actions = []
+    for action in actions:
+        if action[0] == 'push_vlan':
+            ryu_actions.append({'type': 'PUSH_VLAN', 'ethertype': 33024})
+            ryu_actions.append({'type': 'SET_FIELD', 'field': 'vlan_vid', 'value': action[1] | 0x1000})
+        elif action[0] == 'strip_vlan':
+            ryu_actions.append({'type': 'POP_VLAN'})
+        elif action[0] == 'output':
+            ryu_actions.append({'type': 'OUTPUT', 'port': action[1]})
+        elif action[0] == 'goto_table':
+            ryu_actions.append({'type': 'GOTO_TABLE', 'table_id': action[1]})
+    return {'dpid': dpid, 'cookie': cookie, 'table_id': table, 'priority': priority,
+            'match': parse_match(match), 'actions': ryu_actions}
@@ -0,0 +1,276 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+In-memory registry of the flow entries son-emu installed (the desired state
+of the switches), indexed by cookie, switch, chain and VNF interface.
+
+It tells which switches hold the flows of a chain or cookie, so deletes are
+only sent there, and which flows are missing on a switch compared to a flow
+dump, so they can be re-installed after a controller or switch restart.
+"""
+import logging
+import threading
+import json
+import re
+from collections import defaultdict, namedtuple, Counter
+
+LOG = logging.getLogger("dcemulator.flowregistry")
+LOG.setLevel(logging.DEBUG)
+
+# default priorities when a flow does not set one
+RYU_DEFAULT_PRIORITY = 0
+OFCTL_DEFAULT_PRIORITY = 32768
+
+# fmt: 'ryu' (flow is an ofctl_rest dict) or 'ofctl' (flow is an ovs-ofctl string, cmd the ovs-ofctl command)
+FlowEntry = namedtuple('FlowEntry', ['key', 'switch', 'fmt', 'cmd', 'flow', 'cookie', 'table_id', 'priority', 'chain'])
+
+_OFCTL_FIELD = r'(?:^|[\s,"]){0}=(0x[0-9a-fA-F]+|\d+)'
+
+
+def _ofctl_field(flow, name, default):
+    m = re.search(_OFCTL_FIELD.format(name), flow)
+    if m is None:
+        return default
+    return int(m.group(1), 0)
+
+
+def ofctl_strict_match(flow, cookie=0):
+    """
+    Match of a flow in ovs-ofctl syntax to delete exactly this entry (with --strict),
+    restricted to its cookie, so an entry replaced by a flow with another cookie is kept.
+    :return: (protocols, match), protocols is None if the flow does not set the OpenFlow version
+    """
+    protocols = None
+    if flow.startswith('-O '):
+        protocols, flow = flow[len('-O '):].split(' ', 1)
+    fields = ['cookie=%s/-1' % cookie]
+    for field in flow.split(','):
+        # the actions are always the last fields
+        if field.startswith('action=') or field.startswith('actions='):
+            break
+        if not field.startswith('cookie='):
+            fields.append(field)
+    return protocols, ','.join(fields)
+
+
+def parse_ofctl_dump(dump):
+    """
+    Parse the output of ovs-ofctl dump-flows.
+    :return: list of (cookie, table_id, priority) of the dumped flows
+    """
+    keys = []
+    for line in dump.splitlines():
+        if 'cookie=' not in line:
+            continue
+        keys.append((_ofctl_field(line, 'cookie', 0),
+                     _ofctl_field(line, 'table', 0),
+                     _ofctl_field(line, 'priority', OFCTL_DEFAULT_PRIORITY)))
+    return keys
+
+
+def parse_ryu_dump(dump):
+    """
+    Parse the reply of the Ryu stats/flow/<dpid> call.
+    :return: list of (cookie, table_id, priority) of the dumped flows
+    """
+    keys = []
+    for flows in (dump or {}).values():
+        for f in flows:
+            keys.append((int(f.get('cookie', 0)), int(f.get('table_id', 0)), int(f.get('priority', 0))))
+    return keys
+
+
+class FlowRegistry(object):
+    """
+    Desired-state flow entries per switch.
+    Adding a flow with the same switch, table, priority and match replaces the former entry,
+    like an OpenFlow flow add does on the switch.
+    """
+
+    def __init__(self):
+        # key -> FlowEntry
+        self._entries = {}
+        self._by_cookie = defaultdict(set)
+        self._by_switch = defaultdict(set)
+        self._by_chain = defaultdict(set)
+        # (vnf name, vnf interface) -> chains starting or ending at this interface
+        self._by_intf = defaultdict(set)
+        # chain -> list of switches the chain was installed on
+        self._chain_paths = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add_ryu(self, switch, flow, chain=None):
+        """
+        Register a flow entry in ofctl_rest format.
+        """
+        flow = dict((k, v) for k, v in flow.items() if k != 'cmd')
+        table_id = int(flow.get('table_id', 0))
+        priority = int(flow.get('priority', RYU_DEFAULT_PRIORITY))
+        key = (switch, table_id, priority, json.dumps(flow.get('match', {}), sort_keys=True))
+        return self._add(FlowEntry(key, switch, 'ryu', None, flow, int(flow.get('cookie', 0)),
+                                   table_id, priority, chain))
+
+    def add_ofctl(self, switch, cmd, flow, cookie=0, chain=None):
+        """
+        Register a flow entry installed with ovs-ofctl.
+        :param cmd: ovs-ofctl command, e.g. 'add-flow'
+        :param flow: flow in ovs-ofctl syntax
+        """
+        key = (switch, cmd, flow)
+        return self._add(FlowEntry(key, switch, 'ofctl', cmd, flow, int(cookie or 0),
+                                   _ofctl_field(flow, 'table', 0),
+                                   _ofctl_field(flow, 'priority', OFCTL_DEFAULT_PRIORITY), chain))
+
+    def _add(self, entry):
+        with self._lock:
+            if entry.key in self._entries:
+                self._remove(entry.key)
+            self._entries[entry.key] = entry
+            self._by_cookie[entry.cookie].add(entry.key)
+            self._by_switch[entry.switch].add(entry.key)
+            if entry.chain is not None:
+                self._by_chain[entry.chain].add(entry.key)
+            return entry
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        for index, value in [(self._by_cookie, entry.cookie), (self._by_switch, entry.switch),
+                             (self._by_chain, entry.chain)]:
+            keys = index.get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[value]
+        return entry
+
+    def add_chain(self, chain, path):
+        """
+        Remember the switches a chain (src name, src intf, dst name, dst intf) was installed on.
+        """
+        with self._lock:
+            self._chain_paths[chain] = list(path)
+            self._by_intf[(chain[0], chain[1])].add(chain)
+            self._by_intf[(chain[2], chain[3])].add(chain)
+
+    def chain_path(self, chain):
+        return self._chain_paths.get(chain)
+
+    def remove_chain(self, chain):
+        """
+        Forget a chain and its flow entries.
+        :return: set of switches that held flow entries of the chain
+        """
+        with self._lock:
+            entries = [self._remove(key) for key in list(self._by_chain.get(chain, ()))]
+            if self._chain_paths.pop(chain, None) is not None:
+                for intf in [(chain[0], chain[1]), (chain[2], chain[3])]:
+                    self._by_intf[intf].discard(chain)
+                    if not self._by_intf[intf]:
+                        del self._by_intf[intf]
+            return set(e.switch for e in entries)
+
+    def remove_cookie(self, cookie):
+        """
+        Forget the flow entries with a cookie.
+        :return: set of switches that held flow entries with this cookie
+        """
+        with self._lock:
+            entries = [self._remove(key) for key in list(self._by_cookie.get(cookie, ()))]
+            return set(e.switch for e in entries)
+
+    def remove_switch(self, switch):
+        with self._lock:
+            for key in list(self._by_switch.get(switch, ())):
+                self._remove(key)
+
+    def switches(self, cookie=None, chain=None):
+        """
+        :return: set of switches holding flow entries (of a cookie or chain)
+        """
+        with self._lock:
+            if cookie is not None:
+                return set(self._entries[k].switch for k in self._by_cookie.get(cookie, ()))
+            if chain is not None:
+                return set(self._entries[k].switch for k in self._by_chain.get(chain, ()))
+            return set(self._by_switch)
+
+    def entries(self, switch=None, cookie=None, chain=None):
+        with self._lock:
+            if switch is not None:
+                keys = self._by_switch.get(switch, ())
+            elif cookie is not None:
+                keys = self._by_cookie.get(cookie, ())
+            elif chain is not None:
+                keys = self._by_chain.get(chain, ())
+            else:
+                keys = self._entries.keys()
+            return [self._entries[k] for k in keys]
+
+    def cookies(self):
+        with self._lock:
+            return set(self._by_cookie)
+
+    def chains(self, vnf_name=None, vnf_interface=None):
+        """
+        :return: chains that start or end at a VNF interface (all chains if no VNF is given)
+        """
+        with self._lock:
+            if vnf_name is None:
+                return set(self._chain_paths)
+            if vnf_interface is not None:
+                return set(self._by_intf.get((vnf_name, vnf_interface), ()))
+            return set(c for (name, intf), chains in self._by_intf.items() if name == vnf_name for c in chains)
+
+    def missing(self, switch, installed):
+        """
+        Compare the desired flow entries of a switch with a flow dump.
+        Flows are compared by (cookie, table, priority): if a switch holds less flows for such a key than
+        desired, all desired flows with that key are returned, to be installed again.
+        :param installed: list of (cookie, table_id, priority) of the flows on the switch
+        :return: list of FlowEntry
+        """
+        installed = Counter(installed)
+        groups = defaultdict(list)
+        for entry in self.entries(switch=switch):
+            groups[(entry.cookie, entry.table_id, entry.priority)].append(entry)
+        missing = []
+        for key, entries in groups.items():
+            if installed.get(key, 0) < len(entries):
+                missing += entries
+        return missing
+
+    def stale(self, installed):
+        """
+        :param installed: list of (cookie, table_id, priority) of the flows on a switch
+        :return: set of the non-zero cookies on the switch that are not in the registry
+        """
+        known = self.cookies()
+        return set(c for c, t, p in installed if c and c not in known)
@@ -29,7 +29,6 @@ partner consortium (www.sonata-nfv.eu).
 import logging
 import sys
 from mininet.node import  OVSSwitch
-import ast
 import time
 from prometheus_client import start_http_server, Summary, Histogram, Gauge, Counter, REGISTRY, CollectorRegistry, \
     pushadd_to_gateway, push_to_gateway, delete_from_gateway
@@ -74,6 +73,13 @@ class DCNetworkMonitor():
         self.prom_metrics={'tx_packets':self.prom_tx_packet_count, 'rx_packets':self.prom_rx_packet_count,
                            'tx_bytes':self.prom_tx_byte_count,'rx_bytes':self.prom_rx_byte_count}
 
+        # counters of the son-emu Ryu app
+        self.prom_controller_metrics = {
+            'packet_in_per_s': Gauge('sonemu_controller_packet_in_rate', 'Packet-ins per second at the SDN controller',
+                                     registry=self.registry),
+            'flow_mod_per_s': Gauge('sonemu_controller_flow_mod_rate', 'Flow-mods per second sent by the SDN controller',
+                                    registry=self.registry)}
+
         # list of installed metrics to monitor
         # each entry can contain this data
         '''
@@ -115,22 +121,14 @@ class DCNetworkMonitor():
         # check if port is specified (vnf:port)
         if vnf_interface is None:
             # take first interface by default
-            connected_sw = self.net.DCNetwork_graph.neighbors(vnf_name)[0]
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            vnf_interface = link_dict[0]['src_port_id']
+            vnf_interface = self.net.default_interface(vnf_name)
 
         flow_metric['vnf_name'] = vnf_name
         flow_metric['vnf_interface'] = vnf_interface
 
-        vnf_switch = None
-        for connected_sw in self.net.DCNetwork_graph.neighbors(vnf_name):
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            for link in link_dict:
-                if link_dict[link]['src_port_id'] == vnf_interface:
-                    # found the right link and connected switch
-                    vnf_switch = connected_sw
-                    flow_metric['mon_port'] = link_dict[link]['dst_port_nr']
-                    break
+        vnf_switch, mon_port, _ = self.net.find_connected_switch(vnf_name, vnf_interface)
+        if vnf_switch:
+            flow_metric['mon_port'] = mon_port
 
         if not vnf_switch:
             logging.exception("vnf switch of {0}:{1} not found!".format(vnf_name, vnf_interface))
@@ -170,9 +168,7 @@ class DCNetworkMonitor():
         # check if port is specified (vnf:port)
         if vnf_interface is None and metric is not None:
             # take first interface by default
-            connected_sw = self.net.DCNetwork_graph.neighbors(vnf_name)[0]
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            vnf_interface = link_dict[0]['src_port_id']
+            vnf_interface = self.net.default_interface(vnf_name)
 
         for flow_dict in self.flow_metrics:
             if flow_dict['vnf_name'] == vnf_name and flow_dict['vnf_interface'] == vnf_interface \
@@ -205,40 +201,22 @@ class DCNetworkMonitor():
         # check if port is specified (vnf:port)
         if vnf_interface is None or vnf_interface == '':
             # take first interface by default
-            connected_sw = self.net.DCNetwork_graph.neighbors(vnf_name)[0]
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            vnf_interface = link_dict[0]['src_port_id']
+            vnf_interface = self.net.default_interface(vnf_name)
 
         network_metric['vnf_name'] = vnf_name
         network_metric['vnf_interface'] = vnf_interface
 
-        for connected_sw in self.net.DCNetwork_graph.neighbors(vnf_name):
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            for link in link_dict:
-                if link_dict[link]['src_port_id'] == vnf_interface:
-                    # found the right link and connected switch
-                    network_metric['mon_port'] = link_dict[link]['dst_port_nr']
-                    break
-
-        if 'mon_port' not in network_metric:
+        vnf_switch, mon_port, _ = self.net.find_connected_switch(vnf_name, vnf_interface)
+        if vnf_switch is None:
             logging.exception("vnf interface {0}:{1} not found!".format(vnf_name,vnf_interface))
             return "vnf interface {0}:{1} not found!".format(vnf_name,vnf_interface)
+        network_metric['mon_port'] = mon_port
 
         try:
             # default port direction to monitor
             if metric is None:
                 metric = 'tx_packets'
 
-            vnf_switch = self.net.DCNetwork_graph.neighbors(str(vnf_name))
-
-            if len(vnf_switch) > 1:
-                logging.info("vnf: {0} has multiple ports".format(vnf_name))
-                return
-            elif len(vnf_switch) == 0:
-                logging.info("vnf: {0} is not connected".format(vnf_name))
-                return
-            else:
-                vnf_switch = vnf_switch[0]
             next_node = self.net.getNodeByName(vnf_switch)
 
             if not isinstance(next_node, OVSSwitch):
@@ -269,9 +247,7 @@ class DCNetworkMonitor():
         # check if port is specified (vnf:port)
         if vnf_interface is None and metric is not None:
             # take first interface by default
-            connected_sw = self.net.DCNetwork_graph.neighbors(vnf_name)[0]
-            link_dict = self.net.DCNetwork_graph[vnf_name][connected_sw]
-            vnf_interface = link_dict[0]['src_port_id']
+            vnf_interface = self.net.default_interface(vnf_name)
 
         for metric_dict in deepcopy(self.network_metrics):
             if metric_dict['vnf_name'] == vnf_name and metric_dict['vnf_interface'] == vnf_interface \
@@ -335,15 +311,12 @@ class DCNetworkMonitor():
 
 
                 # query Ryu
-                ret = self.net.ryu_REST('stats/flow', dpid=flow_dict['switch_dpid'], data=data)
-                if isinstance(ret, dict):
-                    flow_stat_dict = ret
-                elif isinstance(ret, basestring):
-                    flow_stat_dict = ast.literal_eval(ret.rstrip())
-                else:
-                    flow_stat_dict = None
+                flow_stat_dict = self.net.ryu_monitor_client.post('stats/flow', data, dpid=flow_dict['switch_dpid'])
 
                 logging.debug('received flow stat:{0} '.format(flow_stat_dict))
+                if flow_stat_dict is None:
+                    # controller not reachable, try again at the next poll
+                    continue
 
                 self.set_flow_metric(flow_dict, flow_stat_dict)
 
@@ -369,13 +342,9 @@ class DCNetworkMonitor():
             for dpid in dpid_set:
 
                 # query Ryu
-                ret = self.net.ryu_REST('stats/port', dpid=dpid)
-                if isinstance(ret, dict):
-                    port_stat_dict = ret
-                elif isinstance(ret, basestring):
-                    port_stat_dict = ast.literal_eval(ret.rstrip())
-                else:
-                    port_stat_dict = None
+                port_stat_dict = self.net.ryu_monitor_client.get('stats/port', dpid=dpid)
+                if port_stat_dict is None:
+                    continue
 
                 metric_list = [metric_dict for metric_dict in self.network_metrics
                                if int(metric_dict['switch_dpid'])==int(dpid)]
@@ -383,6 +352,13 @@ class DCNetworkMonitor():
                 for metric_dict in metric_list:
                     self.set_network_metric(metric_dict, port_stat_dict)
 
+            # the controller rates are exported along with the network metrics, nothing is pushed without them
+            if len(self.network_metrics) > 0:
+                controller_stats = self.net.getControllerStats()
+                if isinstance(controller_stats, dict):
+                    for key, gauge in self.prom_controller_metrics.items():
+                        gauge.set(controller_stats.get(key, 0))
+
             try:
                 if len(self.network_metrics) > 0:
                     pushadd_to_gateway(self.pushgateway, job='sonemu-SDNcontroller', registry=self.registry)
@@ -0,0 +1,85 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Helpers for the multipath (ECMP) chains of the DCNetwork.
+
+A multipath chain is installed on all equal-cost paths between its switches.
+Switches with more than one link towards the destination forward the chain
+traffic to an OpenFlow select group, which hashes the flows over the links.
+The bucket counters of these groups tell how the traffic is spread.
+"""
+import re
+from collections import OrderedDict
+
+_OFCTL_GROUP = re.compile(r'group_id=(\d+)')
+_OFCTL_BUCKET = re.compile(r'bucket(\d+):packet_count=(\d+),byte_count=(\d+)')
+
+
+def equal_cost_hops(paths):
+    """
+    Merge equal-cost paths into the hops of each switch.
+    :param paths: list of paths (lists of switch names) with the same source and destination
+    :return: OrderedDict switch -> (previous switches, next switches), in the order the switches are first visited
+    """
+    hops = OrderedDict()
+    for path in paths:
+        for i, sw in enumerate(path):
+            prevs, nexts = hops.setdefault(sw, ([], []))
+            if i > 0 and path[i - 1] not in prevs:
+                prevs.append(path[i - 1])
+            if i < len(path) - 1 and path[i + 1] not in nexts:
+                nexts.append(path[i + 1])
+    return hops
+
+
+def parse_ofctl_group_stats(dump):
+    """
+    Parse the output of ovs-ofctl dump-group-stats.
+    :return: dict group id -> list of (packet_count, byte_count) per bucket
+    """
+    stats = {}
+    for line in dump.splitlines():
+        m = _OFCTL_GROUP.search(line)
+        if m is None:
+            continue
+        buckets = sorted((int(b), int(p), int(n)) for b, p, n in _OFCTL_BUCKET.findall(line))
+        stats[int(m.group(1))] = [(p, n) for b, p, n in buckets]
+    return stats
+
+
+def parse_ryu_group_stats(dump):
+    """
+    Parse the reply of the Ryu stats/groupstats/<dpid> call.
+    :return: dict group id -> list of (packet_count, byte_count) per bucket
+    """
+    stats = {}
+    for groups in (dump or {}).values():
+        for g in groups:
+            stats[int(g['group_id'])] = [(int(b.get('packet_count', 0)), int(b.get('byte_count', 0)))
+                                         for b in g.get('bucket_stats', [])]
+    return stats
@@ -31,20 +31,37 @@ import site
 import time
 from subprocess import Popen
 import re
-import requests
 import os
 import json
 import distutils
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict, Counter
 
 from mininet.net import Containernet
 from mininet.node import Controller, DefaultController, OVSSwitch, OVSKernelSwitch, Docker, RemoteController
 from mininet.cli import CLI
-from mininet.link import TCLink
+from mininet.link import TCLink, Link
 from mininet.clean import cleanup
-import networkx as nx
+from mininet.util import ipAdd, macColonHex
 from emuvim.dcemulator.monitoring import DCNetworkMonitor
 from emuvim.dcemulator.node import Datacenter, EmulatorCompute, EmulatorExtSAP
+from emuvim.dcemulator.paths import PathService
+from emuvim.dcemulator.ovsbatch import OvsCommandBatch, OvsBatchError, VSCTL_TRANSACTION
+from emuvim.dcemulator.segments import SegmentAllocator, MPLS_ARP_FLAG
+from emuvim.dcemulator.multipath import equal_cost_hops, parse_ofctl_group_stats, parse_ryu_group_stats
+from emuvim.dcemulator.elan import ElanMember, member_tree, elan_flows, elan_cookie, to_ofctl, to_ryu
+from emuvim.dcemulator.workers import run_parallel
+from emuvim.dcemulator.ryuclient import RyuClient
+from emuvim.dcemulator.flowregistry import FlowRegistry, parse_ryu_dump, parse_ofctl_dump, ofctl_strict_match
+from emuvim.dcemulator.topology import Topology
+from emuvim.dcemulator.registry import ContainerRegistry
+from emuvim.dcemulator.statuscache import ContainerStatusCache
+from emuvim.dcemulator.qos import QosManager
+from emuvim.dcemulator import snapshot
+from emuvim.dcemulator import spec
 from emuvim.dcemulator.resourcemodel import ResourceModelRegistrar
+from emuvim.dcemulator.resourcemodel.upb.simple import UpbSimpleCloudDcRM
 
 LOG = logging.getLogger("dcemulator.net")
 LOG.setLevel(logging.DEBUG)
@@ -56,6 +73,12 @@ CPU_PERIOD = 1000000
 DEFAULT_PRIORITY = 1000
 # default cookie number for new flow-rules
 DEFAULT_COOKIE = 10
+# REST endpoint of the son-emu Ryu app to apply many flow entries at once
+RYU_BULK_PREFIX = 'son-emu/flowentry/bulk'
+# the bulk endpoint waits up to 10s for the barrier replies of the switches
+RYU_BULK_TIMEOUT = 15.0
+# start of switch dpid's used for the switches of PN specs (see from_spec)
+SPECDPID_BASE = 3000
 
 
 class DCNetwork(Containernet):
@@ -68,18 +91,27 @@ class DCNetwork(Containernet):
 
     def __init__(self, controller=RemoteController, monitor=False,
                  enable_learning=False,  # learning switch behavior of the default ovs switches icw Ryu controller can be turned off/on, needed for E-LAN functionality
+                 high_rate_learning=False,  # high-rate mode of the Ryu learning switch (see son_emu_simple_switch_13)
+                 ryu_bulk_api=True,  # load the son-emu Ryu app for its bulk flow api, also without learning
                  dc_emulation_max_cpu=1.0,  # fraction of overall CPU time for emulation
                  dc_emulation_max_mem=512,  # emulation max mem in MB
+                 encapsulation='vlan',  # 'vlan' or 'mpls' to isolate the chains
                  **kwargs):
         """
         Create an extended version of a Containernet network
         :param dc_emulation_max_cpu: max. CPU time used by containers in data centers
+        :param encapsulation: 'vlan' (default) tags chains with VLAN ids (max. 4094 chains),
+                              'mpls' uses MPLS labels for the chains, E-LANs always use VLAN ids
         :param kwargs: path through for Mininet parameters
         :return:
         """
         # members
         self.dcs = {}
         self.ryu_process = None
+        # serializes the IP, MAC and CPU core allocation of hosts added in parallel (see addHost)
+        self._host_lock = threading.Lock()
+        # the son-emu Ryu app with the bulk flow api is running
+        self.ryu_bulk_api = False
         # list of deployed nsds.E_Lines and E_LANs (uploaded from the dummy gatekeeper)
         self.deployed_nsds = []
         self.deployed_elines = []
@@ -105,22 +137,76 @@ class DCNetwork(Containernet):
         # Ryu management
         if controller == RemoteController:
             # start Ryu controller
-            self.startRyu(learning_switch=enable_ryu_learning)
+            self.startRyu(learning_switch=enable_ryu_learning, high_rate=high_rate_learning, bulk_api=ryu_bulk_api)
 
         # add the specified controller
         self.addController('c0', controller=controller)
 
         # graph of the complete DC network
-        self.DCNetwork_graph = nx.MultiDiGraph()
-
-        # initialize pool of vlan tags to setup the SDN paths
-        self.vlans = range(1, 4095)[::-1]
+        self.topology = Topology()
+        # networkx compatible read-only view of the topology
+        self.DCNetwork_graph = self.topology.view()
+
+        # index of node interfaces and the switch ports they are connected to
+        # (node name, port id or port name) -> (switch name, switch port nr, switch port name)
+        self.intf_index = {}
+        # ordered (port id, port name) pairs per node, the first one is used as default interface
+        self.node_intfs = {}
+        # guards the interface index and the vlan tags of nodes while containers are removed in parallel
+        self._node_lock = threading.RLock()
+
+        # cached path computation on the switches of the DC network
+        self.path_service = PathService()
+
+        # ovs-ofctl/ovs-vsctl commands collected by the calling thread (see ovs_batch)
+        self._ovs_batches = threading.local()
+
+        # pool of vlan tags to setup the SDN paths (E-LANs, load balancers)
+        self.vlans = SegmentAllocator('vlan')
+        # pool of segment ids for the chains, the vlan pool itself in vlan mode
+        if encapsulation == 'vlan':
+            self.segments = self.vlans
+        else:
+            self.segments = SegmentAllocator(encapsulation)
+        # (src name, src intf, dst name, dst intf) -> segment id of each installed chain
+        self.chain_segments = {}
+        # segment id -> number of chains using it (chains can share pre-defined tags)
+        self.chain_segment_refs = Counter()
+        # (src name, src intf, dst name, dst intf) -> setChain arguments of each installed chain
+        self.installed_chains = OrderedDict()
+        # chain id -> ([(link id, hop src switch)], bandwidth) of the chains with a bandwidth demand
+        self.chain_reservations = {}
+        self._reservation_lock = threading.Lock()
+        # chain id -> switch entries and select group of the multipath chains
+        self.multipath_chains = {}
+        self.group_ids = SegmentAllocator('group')
+        # vlan tags owned by the E-LANs
+        self.elan_vlans = set()
+        # vlan -> members and installed flow entries of the E-LANs with proactive forwarding
+        self.proactive_elans = {}
+
+        # switch name -> {Bridge column: value} set on the switches by start() (e.g. rstp_enable)
+        self.switch_options = {}
+
+        # flow entries installed by son-emu (desired state of the switches)
+        self.flow_registry = FlowRegistry()
+
+        # all compute instances of all data centers by name, docker id and dc
+        self.container_registry = ContainerRegistry()
+        # short lived cache of container and link states for the status APIs
+        self.status_cache = ContainerStatusCache()
+
+        # rate limits of switch ports (per port, VNF interface or chain)
+        self.qos = QosManager(self)
 
         # link to Ryu REST_API
         ryu_ip = 'localhost'
         ryu_port = '8080'
         self.ryu_REST_api = 'http://{0}:{1}'.format(ryu_ip, ryu_port)
-        self.RyuSession = requests.Session()
+        # separate connection pools, so monitoring polls and flow programming do not wait for each other
+        self.ryu_client = RyuClient(self.ryu_REST_api, name='ryu')
+        self.ryu_monitor_client = RyuClient(self.ryu_REST_api, pool_size=4, timeout=2.0, retries=1,
+                                            name='ryu-monitor')
 
         # monitoring agent
         if monitor:
@@ -182,8 +268,12 @@ class DCNetwork(Containernet):
         # see Containernet issue: https://github.com/mpeuster/containernet/issues/3
         if "cls" not in params:
             params["cls"] = TCLink
+        # plain links take no tc parameters, they are only kept as attributes of the link
+        link_params = params
+        if params["cls"] is Link:
+            link_params = dict((k, v) for k, v in params.items() if k not in ['bw', 'delay', 'jitter', 'loss'])
 
-        link = Containernet.addLink(self, node1, node2, **params)
+        link = Containernet.addLink(self, node1, node2, **link_params)
 
         # try to give container interfaces a default id
         node1_port_id = node1.ports[link.intf1]
@@ -215,19 +305,20 @@ class DCNetwork(Containernet):
                 attr_number = None
             attr_dict[attr] = attr_number
 
-        attr_dict2 = {'src_port_id': node1_port_id, 'src_port_nr': node1.ports[link.intf1],
-                      'src_port_name': node1_port_name,
-                      'dst_port_id': node2_port_id, 'dst_port_nr': node2.ports[link.intf2],
-                      'dst_port_name': node2_port_name}
-        attr_dict2.update(attr_dict)
-        self.DCNetwork_graph.add_edge(node1.name, node2.name, attr_dict=attr_dict2)
+        self.topology.add_link(node1.name, node2.name, node1.ports[link.intf1], node2.ports[link.intf2],
+                               port_id1=node1_port_id, port_id2=node2_port_id,
+                               port_name1=node1_port_name, port_name2=node2_port_name, **attr_dict)
 
-        attr_dict2 = {'src_port_id': node2_port_id, 'src_port_nr': node2.ports[link.intf2],
-                      'src_port_name': node2_port_name,
-                      'dst_port_id': node1_port_id, 'dst_port_nr': node1.ports[link.intf1],
-                      'dst_port_name': node1_port_name}
-        attr_dict2.update(attr_dict)
-        self.DCNetwork_graph.add_edge(node2.name, node1.name, attr_dict=attr_dict2)
+        # links between switches are also kept in the switch-only view used for path computation
+        if isinstance(node1, OVSSwitch) and isinstance(node2, OVSSwitch):
+            self.path_service.add_link(node1.name, node2.name, **attr_dict)
+
+        # keep the interface index up to date
+        with self._node_lock:
+            self._index_intf(node1.name, node1_port_id, node1_port_name,
+                             node2.name, node2.ports[link.intf2], node2_port_name)
+            self._index_intf(node2.name, node2_port_id, node2_port_name,
+                             node1.name, node1.ports[link.intf1], node1_port_name)
 
         LOG.debug("addLink: n1={0} intf1={1} -- n2={2} intf2={3}".format(
             str(node1), node1_port_name, str(node2), node2_port_name))
@@ -236,36 +327,144 @@ class DCNetwork(Containernet):
 
     def removeLink(self, link=None, node1=None, node2=None):
         """
-        Remove the link from the Containernet and the networkx graph
+        Remove the link from the Containernet and the topology
         """
         if link is not None:
             node1 = link.intf1.node
             node2 = link.intf2.node
         assert node1 is not None
         assert node2 is not None
+        # remove the interfaces of this link from the interface index
+        with self._node_lock:
+            if link is not None:
+                self._unindex_intf(node1.name, peer_name=node2.name, port_name=link.intf1.name)
+                self._unindex_intf(node2.name, peer_name=node1.name, port_name=link.intf2.name)
+            else:
+                self._unindex_intf(node1.name, peer_name=node2.name)
+                self._unindex_intf(node2.name, peer_name=node1.name)
+        if isinstance(node1, OVSSwitch) and isinstance(node2, OVSSwitch):
+            self.path_service.remove_link(node1.name, node2.name)
         Containernet.removeLink(self, link=link, node1=node1, node2=node2)
         # TODO we might decrease the loglevel to debug:
-        try:
-            self.DCNetwork_graph.remove_edge(node2.name, node1.name)
-        except:
-            LOG.warning("%s, %s not found in DCNetwork_graph." % ((node2.name, node1.name)))
-        try:
-            self.DCNetwork_graph.remove_edge(node1.name, node2.name)
-        except:
+        port_name = link.intf1.name if link is not None else None
+        if not self.topology.remove_link(node1.name, node2.name, port_name=port_name):
             LOG.warning("%s, %s not found in DCNetwork_graph." % ((node1.name, node2.name)))
 
+    def _index_intf(self, node_name, port_id, port_name, sw_name, sw_port_nr, sw_port_name):
+        """
+        Add a node interface and the switch port it is connected to to the interface index.
+        The interface can be looked up by port id and by port name.
+        """
+        entry = (sw_name, sw_port_nr, sw_port_name)
+        self.intf_index[(node_name, port_id)] = entry
+        self.intf_index[(node_name, port_name)] = entry
+        self.node_intfs.setdefault(node_name, []).append((port_id, port_name))
+
+    def _unindex_intf(self, node_name, peer_name=None, port_name=None):
+        """
+        Remove interfaces of a node from the interface index.
+        :param peer_name: only remove interfaces connected to this node
+        :param port_name: only remove the interface with this name
+        """
+        remaining = []
+        for port_id, name in self.node_intfs.get(node_name, []):
+            entry = self.intf_index.get((node_name, name))
+            if ((peer_name is None or (entry is not None and entry[0] == peer_name)) and
+                    (port_name is None or name == port_name)):
+                self.intf_index.pop((node_name, port_id), None)
+                self.intf_index.pop((node_name, name), None)
+            else:
+                remaining.append((port_id, name))
+        if remaining:
+            self.node_intfs[node_name] = remaining
+        else:
+            self.node_intfs.pop(node_name, None)
+
+    def _unindex_node(self, node_name):
+        """
+        Remove a node and all interfaces pointing to it from the interface index.
+        """
+        for port_id, port_name in self.node_intfs.get(node_name, []):
+            entry = self.intf_index.get((node_name, port_name))
+            if entry is not None:
+                self._unindex_intf(entry[0], peer_name=node_name)
+        self._unindex_intf(node_name)
+
+    def default_interface(self, vnf_name):
+        """
+        Returns the port id of the first interface of a node (None if not connected).
+        """
+        intfs = self.node_intfs.get(vnf_name)
+        if not intfs:
+            return None
+        return intfs[0][0]
+
+    def find_connected_switch(self, vnf_name, vnf_interface=None):
+        """
+        Look up the switch port to which a node interface is connected.
+        :param vnf_name: name of the node (string)
+        :param vnf_interface: port id or port name, the first interface of the node is used if None
+        :return: tuple (switch name, switch port nr, switch port name), (None, None, None) if not found
+        """
+        if vnf_interface is None:
+            vnf_interface = self.default_interface(vnf_name)
+        return self.intf_index.get((vnf_name, vnf_interface), (None, None, None))
+
+    def addHost(self, name, cls=None, **params):
+        """
+        Replaces Mininet's addHost, which is not thread-safe: the IP, MAC and CPU core of the host
+        are allocated under a lock, the host (e.g. a Docker container) is then created without
+        holding it, so startComputeBatch can start containers in parallel.
+        """
+        with self._host_lock:
+            defaults = {'ip': ipAdd(self.nextIP, ipBaseNum=self.ipBaseNum, prefixLen=self.prefixLen) +
+                        '/%s' % self.prefixLen}
+            if self.autoSetMacs:
+                defaults['mac'] = macColonHex(self.nextIP)
+            if self.autoPinCpus:
+                defaults['cores'] = self.nextCore
+                self.nextCore = (self.nextCore + 1) % self.numCores
+            self.nextIP += 1
+        defaults.update(params)
+        h = (cls or self.host)(name, **defaults)
+        with self._host_lock:
+            self.hosts.append(h)
+            self.nameToNode[name] = h
+        return h
+
     def addDocker(self, label, **params):
         """
         Wrapper for addDocker method to use custom container class.
         """
-        self.DCNetwork_graph.add_node(label, type=params.get('type', 'docker'))
+        self.topology.add_node(label, type=params.get('type', 'docker'))
         return Containernet.addDocker(self, label, cls=EmulatorCompute, **params)
 
+    def renameDocker(self, label, new_label):
+        """
+        Rename a container that is not connected to any switch yet
+        (used to claim containers from warm pools).
+        """
+        # containers can be claimed from pools in parallel (startComputeBatch)
+        with self._node_lock:
+            if new_label in self.nameToNode:
+                raise Exception("Node with name %s already exists." % new_label)
+            d = self.nameToNode[label]
+            d.dcli.rename(d.dc, "%s.%s" % (d.dnameprefix, new_label))
+            del self.nameToNode[label]
+            d.name = new_label
+            self.nameToNode[new_label] = d
+            self.topology.remove_node(label)
+            self.topology.add_node(new_label, type='docker')
+        return d
+
     def removeDocker(self, label, **params):
         """
         Wrapper for removeDocker method to update graph.
         """
-        self.DCNetwork_graph.remove_node(label)
+        self.topology.remove_node(label)
+        with self._node_lock:
+            self._unindex_node(label)
+            self._release_node_segments(label)
         return Containernet.removeDocker(self, label, **params)
 
     def addExtSAP(self, sap_name, sap_ip, **params):
@@ -274,14 +473,17 @@ class DCNetwork(Containernet):
         """
         # make sure that 'type' is set
         params['type'] = params.get('type', 'sap_ext')
-        self.DCNetwork_graph.add_node(sap_name, type=params['type'])
+        self.topology.add_node(sap_name, type=params['type'])
         return Containernet.addExtSAP(self, sap_name, sap_ip, **params)
 
     def removeExtSAP(self, sap_name, **params):
         """
         Wrapper for removeExtSAP method to remove SAP  also from graph.
         """
-        self.DCNetwork_graph.remove_node(sap_name)
+        self.topology.remove_node(sap_name)
+        with self._node_lock:
+            self._unindex_node(sap_name)
+            self._release_node_segments(sap_name)
         return Containernet.removeExtSAP(self, sap_name)
 
     def addSwitch(self, name, add_to_graph=True, **params):
@@ -291,7 +493,8 @@ class DCNetwork(Containernet):
 
         # add this switch to the global topology overview
         if add_to_graph:
-            self.DCNetwork_graph.add_node(name, type=params.get('type', 'switch'))
+            self.topology.add_node(name, type=params.get('type', 'switch'))
+            self.path_service.add_switch(name)
 
         # set the learning switch behavior
         if 'failMode' in params:
@@ -307,10 +510,93 @@ class DCNetwork(Containernet):
         """
         Returns a list with all containers within all data centers.
         """
-        all_containers = []
-        for dc in self.dcs.itervalues():
-            all_containers += dc.listCompute()
-        return all_containers
+        return self.container_registry.list()
+
+    def getContainer(self, key):
+        """
+        Returns the container with the given name or (short) Docker id, or None.
+        """
+        return self.container_registry.lookup(key)
+
+    def stopComputes(self, names=None, max_workers=8):
+        """
+        Stop and remove many containers of all data centers in parallel.
+        Failures are reported per container and do not abort the removal of the others.
+        :param names: list of container names or (short) Docker ids, all containers if None
+        :param max_workers: maximum number of containers removed at the same time
+        :return: list of dicts (name, error, time) in the order of names
+        """
+        if names is None:
+            names = [c.name for c in self.getAllContainers()]
+        results = [{"name": n, "error": None, "time": 0.0} for n in names]
+        todo = []
+        for r in results:
+            d = self.getContainer(r["name"])
+            if d is None or d.datacenter is None:
+                r["error"] = "Container with name %s not found." % r["name"]
+            else:
+                r["name"] = d.name
+                todo.append((r, d.datacenter))
+        outcome = run_parallel(lambda job: job[1]._stop_compute(job[0]["name"]), todo,
+                               max_workers=max_workers)
+        for (r, dc), (t, ex) in zip(todo, outcome):
+            r["time"] = t or 0.0
+            if ex is not None:
+                r["error"] = str(ex) or ex.__class__.__name__
+        failed = [r for r in results if r["error"] is not None]
+        LOG.info("Removed %d of %d containers." % (len(results) - len(failed), len(results)))
+        for r in failed:
+            LOG.warning("Removing container %r failed: %s" % (r["name"], r["error"]))
+        return results
+
+    @classmethod
+    def from_spec(cls, pn, vn=None, cpu_factor=1, ram_factor=512, shape_links=False, rstp=False, **kwargs):
+        """
+        Create a network from a physical network spec (see scenarios/topologies).
+        Each server becomes a data center with a resource model of its cores and RAM, all
+        other nodes of the PN links become switches. The spec is validated completely before
+        anything is created. The switches are started in batches by start(), their options
+        are set in a single ovs-vsctl transaction.
+
+        :param pn: PN spec (dict, JSON string or file path)
+        :param vn: VN spec, only validated against the PN and kept as vn_spec
+        :param cpu_factor: compute units per core of a server
+        :param ram_factor: memory units per GB of RAM of a server
+        :param shape_links: limit the links to their PN bandwidth with tc, otherwise the bandwidth
+                            is only used for the bandwidth reservations of chains
+        :param rstp: enable RSTP on all switches
+        :param kwargs: passed to DCNetwork
+        :return: DCNetwork, data centers are labeled with the server names
+        """
+        pn = spec.parse_pn(spec.load(pn))
+        vn_spec = spec.parse_vn(spec.load(vn), pn) if vn is not None else None
+
+        net = cls(**kwargs)
+        net.vn_spec = vn_spec
+        for name, (cores, ram, bw) in pn['servers'].items():
+            dc = net.addDatacenter(name)
+            dc.assignResourceModel(UpbSimpleCloudDcRM(cores * cpu_factor, ram * ram_factor))
+        for i, name in enumerate(pn['switches']):
+            # explicit dpid, switch names like 'gsw' contain no number to derive one from
+            net.addSwitch(name, dpid=hex(SPECDPID_BASE + i)[2:])
+
+        def node(name):
+            if name in net.dcs:
+                return net.dcs[name]
+            return net.getNodeByName(name)
+
+        for node1, node2, bw in pn['links']:
+            # plain links avoid the tc setup of each interface
+            params = {'bw': bw * 1000} if bw > 0 else {}
+            net.addLink(node(node1), node(node2), cls=TCLink if shape_links else Link, **params)
+
+        if rstp:
+            switches = [dc.switch.name for dc in net.dcs.itervalues()] + pn['switches']
+            for name in switches:
+                net.switch_options.setdefault(name, {})['rstp_enable'] = 'true'
+        LOG.info("created {0} data centers, {1} switches and {2} links from spec".format(
+            len(pn['servers']), len(pn['switches']), len(pn['links'])))
+        return net
 
     def start(self):
         # start
@@ -318,12 +604,243 @@ class DCNetwork(Containernet):
             dc.start()
         Containernet.start(self)
 
+        # switch options of all switches in a single transaction, the bridges exist now
+        if self.switch_options:
+            with self.ovs_batch():
+                for name, options in sorted(self.switch_options.items()):
+                    self._vsctl(self.getNodeByName(name), 'set', 'Bridge', name,
+                                *['{0}={1}'.format(k, v) for k, v in sorted(options.items())])
+
+    def migrateCompute(self, name, target_dc, new_name=None, drain_time=1.0, max_workers=8):
+        """
+        Move a container to another data center without tearing down its chains first (make-before-break):
+        1. start a replacement with the same image, flavor, interfaces, IPs and MACs in target_dc
+        2. pre-install the chains and E-LANs starting at the replacement under a new cookie
+        3. switch over: install the chains towards the replacement, their first flow entry replaces the
+           one of the old chain in place, which is atomic per switch
+        4. wait drain_time for packets on the old paths, then delete the old flow entries one by one
+           and remove the old container
+        Chains with a custom path are set up on a new shortest path, multipath chains are not supported.
+        If the replacement can not be started or a chain fails in step 2 or 3, the migration is aborted:
+        the old chains are installed again, the flow entries of the replacement are deleted and the
+        replacement is removed, the old container is kept.
+
+        :param name: name of the container
+        :param target_dc: Datacenter or its label
+        :param new_name: name of the replacement (default: <name>-m)
+        :param drain_time: seconds the old paths are kept after the switch over
+        :param max_workers: number of switches that are programmed concurrently
+        :return: report dict with 'new_name', 'start_time', 'preinstall_time', 'switchover_time',
+                 'interruption' (seconds until all switches applied the switch over, an upper bound of
+                 the traffic interruption), 'remove_time', 'chains', a list of 'errors' and 'aborted'
+        """
+        old = self.getContainer(name)
+        if old is None:
+            raise Exception("Container with name %s not found." % name)
+        name = old.name
+        if isinstance(target_dc, basestring):
+            target_dc = self.dcs[target_dc]
+        new_name = new_name or "%s-m" % name
+        if self.getContainer(new_name) is not None:
+            raise Exception("Container with name %s already exists." % new_name)
+        old_chains = [(chain_id, chain_spec) for chain_id, chain_spec in self.installed_chains.items()
+                      if name in (chain_spec['vnf_src_name'], chain_spec['vnf_dst_name'])]
+        for chain_id, chain_spec in old_chains:
+            if chain_id in self.multipath_chains or \
+                    (chain_id[2], chain_id[3], chain_id[0], chain_id[1]) in self.multipath_chains:
+                raise Exception("Multipath chain {0} can not be migrated.".format(chain_id))
+        report = {'name': name, 'new_name': new_name, 'datacenter': target_dc.label, 'chains': len(old_chains),
+                  'errors': [], 'aborted': False}
+
+        # 1. replacement with the network configuration of the old container
+        t = time.time()
+        compute = snapshot.container_spec(self, old)
+        old_intfs = self.node_intfs.get(name, [])
+        for nw, (port_id, port_name) in zip(compute['network'], old_intfs):
+            nw['mac'] = old.intf(port_name).MAC()
+        if target_dc.startCompute(new_name, image=compute['image'], command=compute['command'],
+                                  network=compute['network'], flavor_name=compute['flavor_name']) is None:
+            report['errors'].append("replacement {0} was not admitted by the resource model of {1}".format(
+                new_name, target_dc.label))
+            report['aborted'] = True
+            LOG.error("migration of {0} aborted: {1}".format(name, report['errors'][0]))
+            return report
+        # interfaces of the replacement by port id and name of the old one
+        new_intfs = {}
+        for (port_id, port_name), (new_id, new_port_name) in zip(old_intfs, self.node_intfs.get(new_name, [])):
+            new_intfs[port_id] = new_intfs[port_name] = new_id
+        report['start_time'] = time.time() - t
+
+        # chains of the replacement, one per direction: (old chain id, new chain spec)
+        cookie = max(self.flow_registry.cookies() | set([DEFAULT_COOKIE])) + 1
+        outgoing, incoming = [], []
+        for chain_id, chain_spec in old_chains:
+            kwargs = dict((k, v) for k, v in chain_spec.items() if k not in ('bidirectional', 'path', 'tag'))
+            kwargs['cookie'] = cookie
+            directions = [chain_id]
+            if chain_spec.get('bidirectional') in ['true', 'True', True, 1]:
+                directions.append((chain_id[2], chain_id[3], chain_id[0], chain_id[1]))
+            for src, src_intf, dst, dst_intf in directions:
+                chain = dict(kwargs, cmd='add-flow', vnf_src_name=src, vnf_src_interface=src_intf,
+                             vnf_dst_name=dst, vnf_dst_interface=dst_intf)
+                if src == name:
+                    chain.update(vnf_src_name=new_name, vnf_src_interface=new_intfs.get(src_intf, src_intf))
+                if dst == name:
+                    chain.update(vnf_dst_name=new_name, vnf_dst_interface=new_intfs.get(dst_intf, dst_intf))
+                (incoming if dst == name else outgoing).append(chain)
+        elans = [(id.split(':', 1)[1], tag) for id, tag in self.vlan_dict.items()
+                 if id.startswith("{0}:".format(name)) and tag in self.elan_vlans]
+
+        # 2. pre-install everything that does not change the forwarding of existing traffic
+        t = time.time()
+        for intf, tag in elans:
+            self.setLAN([{'name': new_name, 'interface': new_intfs.get(intf, intf)}], vlan=tag,
+                        proactive=tag in self.proactive_elans)
+        for res in self.setChains(outgoing, max_workers=max_workers):
+            if res['error'] is not None:
+                report['errors'].append("chain {0} -> {1}: {2}".format(res['vnf_src_name'], res['vnf_dst_name'],
+                                                                      res['error']))
+        report['preinstall_time'] = time.time() - t
+        if report['errors']:
+            return self._abort_migration(report, [], outgoing, elans, new_intfs)
+
+        # 3. switch over, the flow entries of the old chains are kept to undo it
+        old_entries = dict((entry.key, entry) for chain_id, chain_spec in old_chains
+                           for direction in [chain_id, (chain_id[2], chain_id[3], chain_id[0], chain_id[1])]
+                           for entry in self.flow_registry.entries(chain=direction)).values()
+        t = time.time()
+        results = self.setChains(incoming, max_workers=max_workers)
+        report['switchover_time'] = time.time() - t
+        report['interruption'] = max([res['install_time'] for res in results] + [0.0])
+        for res in results:
+            if res['error'] is not None:
+                report['errors'].append("chain {0} -> {1}: {2}".format(res['vnf_src_name'], res['vnf_dst_name'],
+                                                                      res['error']))
+        if report['errors']:
+            return self._abort_migration(report, old_entries, outgoing + incoming, elans, new_intfs)
+        LOG.info("switched over {0} chains from {1} to {2} in {3:.3f}s".format(
+            len(incoming), name, new_name, report['interruption']))
+
+        # 4. drain and remove the old container
+        time.sleep(drain_time)
+        t = time.time()
+        for chain_id, chain_spec in old_chains:
+            self._remove_replaced_chain(chain_id, chain_spec)
+        for intf, tag in elans:
+            if tag in self.proactive_elans:
+                self.setLAN([{'name': name, 'interface': intf}], vlan=tag, action='delete')
+        old.datacenter.stopCompute(name)
+        report['remove_time'] = time.time() - t
+        return report
+
+    def _abort_migration(self, report, old_entries, new_chains, elans, new_intfs):
+        """
+        Undo a failed migration (see migrateCompute): the flow entries of the old chains are installed again,
+        as the switch over replaced some of them in place, then the chains, E-LAN memberships and the
+        container of the replacement are removed.
+        :param old_entries: registry entries of the old chains before the switch over
+        """
+        name, new_name = report['name'], report['new_name']
+        LOG.error("migration of {0} to {1} aborted: {2}".format(name, new_name, report['errors']))
+        report['aborted'] = True
+        ryu_flows = []
+        try:
+            with self.ovs_batch():
+                for entry in old_entries:
+                    if entry.fmt == 'ryu':
+                        self.flow_registry.add_ryu(entry.switch, entry.flow, chain=entry.chain)
+                        ryu_flows.append(dict(entry.flow, cmd='add'))
+                    else:
+                        self.flow_registry.add_ofctl(entry.switch, entry.cmd, entry.flow, cookie=entry.cookie,
+                                                     chain=entry.chain)
+                        self._dpctl(self.getNodeByName(entry.switch), entry.cmd, entry.flow)
+        except OvsBatchError as ex:
+            report['errors'].append("restoring the old chains: {0}".format(ex))
+        ret = self.ryu_REST_bulk(ryu_flows)
+        if isinstance(ret, dict) and (ret.get('errors') or ret.get('timeouts')):
+            report['errors'].append("restoring the old chains: {0}".format(
+                (ret.get('errors') or []) + (ret.get('timeouts') or [])))
+        for chain in new_chains:
+            chain_id = (chain['vnf_src_name'], chain['vnf_src_interface'],
+                        chain['vnf_dst_name'], chain['vnf_dst_interface'])
+            chain_spec = self.installed_chains.get(chain_id)
+            if chain_spec is not None:
+                # strictly by the new cookie, the restored entries of the old chains are kept
+                self._remove_replaced_chain(chain_id, chain_spec)
+        for intf, tag in elans:
+            if tag in self.proactive_elans:
+                self.setLAN([{'name': new_name, 'interface': new_intfs.get(intf, intf)}], vlan=tag, action='delete')
+        self.getContainer(new_name).datacenter.stopCompute(new_name)
+        return report
+
+    def _remove_replaced_chain(self, chain_id, chain_spec):
+        """
+        Delete the flow entries of a chain that were not replaced by another chain (see migrateCompute)
+        and free its segment and bandwidth. Each entry is deleted strictly by its match, priority and
+        cookie, a chain deletion by match would also hit the entries that replaced them.
+        """
+        directions = [chain_id]
+        if chain_spec.get('bidirectional') in ['true', 'True', True, 1]:
+            directions.append((chain_id[2], chain_id[3], chain_id[0], chain_id[1]))
+        ryu_flows = []
+        with self.ovs_batch() as batch:
+            for direction in directions:
+                for entry in self.flow_registry.entries(chain=direction):
+                    if entry.fmt == 'ryu':
+                        flow = dict((k, v) for k, v in entry.flow.items()
+                                    if k in ('dpid', 'table_id', 'priority', 'match'))
+                        flow.update(cmd='delete_strict', priority=entry.priority, cookie=entry.cookie,
+                                    cookie_mask=int('0xffffffffffffffff', 16))
+                        ryu_flows.append(flow)
+                    else:
+                        protocols, match = ofctl_strict_match(entry.flow, entry.cookie)
+                        batch.del_flows(entry.switch, match, protocols=protocols, strict=True)
+        self.ryu_REST_bulk(ryu_flows)
+        for direction in directions:
+            self.flow_registry.remove_chain(direction)
+            self._release_chain_bandwidth(direction)
+            src_sw, _, src_sw_port_name = self.find_connected_switch(direction[0], direction[1])
+            dst_sw, _, dst_sw_port_name = self.find_connected_switch(direction[2], direction[3])
+            self._release_chain_segment(direction, src_sw, src_sw_port_name, dst_sw, dst_sw_port_name)
+        self.installed_chains.pop(chain_id, None)
+
+    def snapshot(self, path=None):
+        """
+        Take a snapshot of the data centers, switches, links, containers, chains and E-LANs.
+        :param path: file the snapshot is written to (JSON), optional
+        :return: snapshot dict
+        """
+        snap = snapshot.capture(self)
+        if path is not None:
+            snapshot.save(snap, path)
+        return snap
+
+    def restore(self, snap, max_workers=8):
+        """
+        Bring the network into the state of a snapshot, only the parts that differ are changed.
+        Missing data centers, switches and links are added, which is only possible before the
+        network is started. Resource models are not restored, assign them before.
+        :param snap: snapshot dict or path of a snapshot file
+        :param max_workers: number of containers (and switches) handled concurrently
+        :return: report of the changes, see snapshot.restore
+        """
+        if isinstance(snap, basestring):
+            snap = snapshot.load(snap)
+        return snapshot.restore(self, snap, max_workers=max_workers)
+
     def stop(self):
 
         # stop the monitor agent
         if self.monitor_agent is not None:
             self.monitor_agent.stop()
 
+        # stop refilling warm pools
+        for dc in self.dcs.itervalues():
+            dc.stop()
+
+        # remove all containers in parallel, Containernet would remove them one by one
+        self.stopComputes()
+
         # stop emulator net
         Containernet.stop(self)
 
@@ -333,62 +850,157 @@ class DCNetwork(Containernet):
     def CLI(self):
         CLI(self)
 
-    def setLAN(self, vnf_list, vlan=None, action='add'):
+    def setLAN(self, vnf_list, vlan=None, action='add', proactive=False):
         """
         setup an E-LAN network by assigning the same VLAN tag to each DC interface of the VNFs in the E-LAN
 
-        :param vnf_list: names of the VNFs in this E-LAN  [{name:,interface:},...]
-        :param vlan: vlan tag to be used
+        :param vnf_list: names of the VNFs in this E-LAN  [{name:,interface:},...], an optional 'mac' overrides
+                         the MAC read from the interface
+        :param vlan: vlan tag to be used (a free one is allocated, or looked up for 'delete', if None)
         :param action: 'add' or 'delete' the vlan tags for the intefaces
+        :param proactive: install the forwarding entries of the E-LAN on the switches instead of relying on
+                          a learning switch. Members of a proactive E-LAN can be added and deleted by further
+                          calls with its vlan, the E-LAN is removed with its last member.
 
         :return:
         """
-        src_sw = None
-        src_sw_inport_nr = 0
-        src_sw_inport_name = None
-
-        if vlan is None:
+        if vlan is None and action == 'add':
             # get a vlan tag for this E-LAN
-            vlan = self.vlans.pop()
+            vlan = self.vlans.allocate()
+            self.elan_vlans.add(vlan)
+        elif vlan is None and action == 'delete':
+            # use the tag that is set on the interfaces of the E-LAN
+            for vnf in vnf_list:
+                vnf_interface = vnf['interface'] or self.default_interface(vnf['name'])
+                vlan = self.vlan_dict.get("{0}:{1}".format(vnf['name'], vnf_interface))
+                if vlan is not None:
+                    break
+            if vlan is None:
+                return "\nERROR: no vlan tag found for E-LAN {0}".format(vnf_list)
+        elif action == 'add' and self.vlans.reserve(vlan):
+            # user defined tag, not handed out to other chains or E-LANs anymore
+            self.elan_vlans.add(vlan)
 
         ret = ''
-        for vnf in vnf_list:
-            vnf_src_name = vnf['name']
-            vnf_src_interface = vnf['interface']
-
-            # check if port is specified (vnf:port)
-            if vnf_src_interface is None:
-                # take first interface by default
-                connected_sw = self.DCNetwork_graph.neighbors(vnf_src_name)[0]
-                link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-                vnf_src_interface = link_dict[0]['src_port_id']
-
-            for connected_sw in self.DCNetwork_graph.neighbors(vnf_src_name):
-                link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-                for link in link_dict:
-                    if (link_dict[link]['src_port_id'] == vnf_src_interface or
-                            link_dict[link]['src_port_name'] == vnf_src_interface):  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                        # found the right link and connected switch
-                        src_sw = connected_sw
-                        src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                        src_sw_inport_name = link_dict[link]['dst_port_name']
-                        break
-
-            # set the tag on the dc switch interface
-            LOG.debug('set E-LAN: vnf name: {0} interface: {1} tag: {2}'.format(vnf_src_name, vnf_src_interface, vlan))
-            switch_node = self.getNodeByName(src_sw)
-            if action == 'add':
-                self._set_vlan_tag(switch_node, src_sw_inport_name, vlan, vnf_src_name, vnf_src_interface)
-            elif action == 'delete':
-                self._remove_vlan_tag(switch_node, src_sw_inport_name, vlan, vnf_src_name, vnf_src_interface)
-            else:
-                ret += "\nERROR: undefined action: {0}".format(action)
-                continue
+        # all tags of the E-LAN are set in a single ovs-vsctl transaction
+        with self.ovs_batch():
+            for vnf in vnf_list:
+                vnf_src_name = vnf['name']
+                vnf_src_interface = vnf['interface']
+
+                # check if port is specified (vnf:port)
+                if vnf_src_interface is None:
+                    # take first interface by default
+                    vnf_src_interface = self.default_interface(vnf_src_name)
+
+                # we might also get interface names, e.g, from a son-emu-cli call
+                src_sw, src_sw_inport_nr, src_sw_inport_name = self.find_connected_switch(vnf_src_name, vnf_src_interface)
+
+                # set the tag on the dc switch interface
+                LOG.debug('set E-LAN: vnf name: {0} interface: {1} tag: {2}'.format(vnf_src_name, vnf_src_interface, vlan))
+                switch_node = self.getNodeByName(src_sw)
+                if action == 'add':
+                    self._set_vlan_tag(switch_node, src_sw_inport_name, vlan, vnf_src_name, vnf_src_interface)
+                elif action == 'delete':
+                    self._remove_vlan_tag(switch_node, src_sw_inport_name, vlan, vnf_src_name, vnf_src_interface)
+                else:
+                    ret += "\nERROR: undefined action: {0}".format(action)
+                    continue
 
-            ret += "\n{0} vlan tag: {1} on {2}:{3}".format(action, vlan, vnf_src_name, vnf_src_interface)
+                ret += "\n{0} vlan tag: {1} on {2}:{3}".format(action, vlan, vnf_src_name, vnf_src_interface)
+
+            if proactive or vlan in self.proactive_elans:
+                try:
+                    self._update_elan_flows(vlan, vnf_list, action)
+                except Exception as ex:
+                    LOG.exception("installing the flows of E-LAN {0} failed".format(vlan))
+                    ret += "\nERROR: E-LAN flows not installed: {0}".format(ex)
+                if vlan in self.proactive_elans:
+                    # the E-LAN keeps its tag until its last member is deleted
+                    return ret
+
+        if action == 'delete' and vlan in self.elan_vlans:
+            self.elan_vlans.discard(vlan)
+            self._release_segment(vlan, self.vlans)
 
         return ret
 
+    def _update_elan_flows(self, vlan, vnf_list, action):
+        """
+        Add or delete members of a proactive E-LAN and update its flow entries on the switches whose
+        entries changed.
+        """
+        elan = self.proactive_elans.setdefault(vlan, {'members': OrderedDict(), 'flows': {}})
+        for vnf in vnf_list:
+            vnf_interface = vnf['interface'] or self.default_interface(vnf['name'])
+            key = (vnf['name'], vnf_interface)
+            if action == 'add':
+                elan['members'][key] = self._elan_member(vnf['name'], vnf_interface, vnf.get('mac'))
+            elif action == 'delete':
+                elan['members'].pop(key, None)
+        members = list(elan['members'].values())
+
+        flows = {}
+        if members:
+            switches = list(OrderedDict((m.switch, None) for m in members))
+            tree = member_tree(self.path_service.shortest_path_tree(switches[0]), switches)
+            flows = elan_flows(vlan, members, tree,
+                               lambda sw, nb: self.topology.links(sw, nb)[0]['src_port_nr'])
+
+        cookie = elan_cookie(vlan)
+        self.flow_registry.remove_cookie(cookie)
+        for sw in set(flows) | set(elan['flows']):
+            entries = flows.get(sw, [])
+            if entries != elan['flows'].get(sw):
+                self._set_elan_switch_flows(self.getNodeByName(sw), cookie, entries,
+                                            replace=sw in elan['flows'])
+            for flow in entries:
+                self.flow_registry.add_ofctl(sw, 'add-flow', to_ofctl(cookie, flow), cookie=cookie)
+        elan['flows'] = flows
+        if not members:
+            del self.proactive_elans[vlan]
+        LOG.debug("E-LAN {0}: {1} members, flows on switches {2}".format(vlan, len(members), sorted(flows)))
+
+    def _elan_member(self, vnf_name, vnf_interface, mac=None):
+        sw, port_nr, port_name = self.find_connected_switch(vnf_name, vnf_interface)
+        if sw is None:
+            raise ValueError("{0}:{1} is not connected to a switch".format(vnf_name, vnf_interface))
+        if mac is None:
+            mac = self._intf_mac(vnf_name, vnf_interface)
+        return ElanMember(vnf_name, vnf_interface, sw, port_nr, port_name, mac)
+
+    def _intf_mac(self, vnf_name, vnf_interface):
+        """
+        :return: MAC of a node interface (port id or port name), None if it cannot be read
+        """
+        for port_id, port_name in self.node_intfs.get(vnf_name, []):
+            if vnf_interface in (port_id, port_name):
+                try:
+                    intf = self.getNodeByName(vnf_name).intf(port_name)
+                    return intf.mac or intf.MAC()
+                except Exception:
+                    LOG.exception("reading the MAC of {0}:{1} failed".format(vnf_name, vnf_interface))
+        LOG.warning("no MAC for {0}:{1}, frames to it are flooded in its E-LAN".format(vnf_name, vnf_interface))
+        return None
+
+    def _set_elan_switch_flows(self, node, cookie, flows, replace=False):
+        """
+        Install the flow entries of an E-LAN on a switch, replacing the former entries of the E-LAN.
+        """
+        if self.controller == RemoteController:
+            dpid = int(node.dpid, 16)
+            entries = []
+            if replace:
+                entries.append({'dpid': dpid, 'cookie': cookie, 'cookie_mask': int('0xffffffffffffffff', 16),
+                                'table_id': 255, 'cmd': 'delete'})
+            entries += [dict(to_ryu(dpid, cookie, flow, self._parse_match), cmd='add') for flow in flows]
+            self.ryu_REST_bulk(entries)
+            return
+        if replace:
+            self._dpctl(node, 'del-flows', '-O OpenFlow13 cookie=%s/-1' % cookie)
+        for flow in flows:
+            self._dpctl(node, 'add-flow', '-O OpenFlow13 ' + to_ofctl(cookie, flow))
+
     def _addMonitorFlow(self, vnf_src_name, vnf_dst_name, vnf_src_interface=None, vnf_dst_interface=None,
                         tag=None, **kwargs):
         """
@@ -403,60 +1015,31 @@ class DCNetwork(Containernet):
         :return:
         """
 
-        src_sw = None
-        src_sw_inport_nr = 0
-        src_sw_inport_name = None
-        dst_sw = None
-        dst_sw_outport_nr = 0
-        dst_sw_outport_name = None
-
         LOG.debug("call AddMonitorFlow vnf_src_name=%r, vnf_src_interface=%r, vnf_dst_name=%r, vnf_dst_interface=%r",
                   vnf_src_name, vnf_src_interface, vnf_dst_name, vnf_dst_interface)
 
         # check if port is specified (vnf:port)
         if vnf_src_interface is None:
             # take first interface by default
-            connected_sw = self.DCNetwork_graph.neighbors(vnf_src_name)[0]
-            link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-            vnf_src_interface = link_dict[0]['src_port_id']
-
-        for connected_sw in self.DCNetwork_graph.neighbors(vnf_src_name):
-            link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-            for link in link_dict:
-                if (link_dict[link]['src_port_id'] == vnf_src_interface or
-                        link_dict[link]['src_port_name'] == vnf_src_interface):  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                    # found the right link and connected switch
-                    src_sw = connected_sw
-                    src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                    src_sw_inport_name = link_dict[link]['dst_port_name']
-                    break
+            vnf_src_interface = self.default_interface(vnf_src_name)
+
+        # we might also get interface names, e.g, from a son-emu-cli call
+        src_sw, src_sw_inport_nr, src_sw_inport_name = self.find_connected_switch(vnf_src_name, vnf_src_interface)
 
         if vnf_dst_interface is None:
             # take first interface by default
-            connected_sw = self.DCNetwork_graph.neighbors(vnf_dst_name)[0]
-            link_dict = self.DCNetwork_graph[connected_sw][vnf_dst_name]
-            vnf_dst_interface = link_dict[0]['dst_port_id']
+            vnf_dst_interface = self.default_interface(vnf_dst_name)
 
         vnf_dst_name = vnf_dst_name.split(':')[0]
-        for connected_sw in self.DCNetwork_graph.neighbors(vnf_dst_name):
-            link_dict = self.DCNetwork_graph[connected_sw][vnf_dst_name]
-            for link in link_dict:
-                if link_dict[link]['dst_port_id'] == vnf_dst_interface or \
-                        link_dict[link]['dst_port_name'] == vnf_dst_interface:  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                    # found the right link and connected switch
-                    dst_sw = connected_sw
-                    dst_sw_outport_nr = link_dict[link]['src_port_nr']
-                    dst_sw_outport_name = link_dict[link]['src_port_name']
-                    break
+        dst_sw, dst_sw_outport_nr, dst_sw_outport_name = self.find_connected_switch(vnf_dst_name, vnf_dst_interface)
 
         if not tag >= 0:
             LOG.exception('tag not valid: {0}'.format(tag))
 
         # get shortest path
         try:
-            # returns the first found shortest path
-            # if all shortest paths are wanted, use: all_shortest_paths
-            path = nx.shortest_path(self.DCNetwork_graph, src_sw, dst_sw, weight=kwargs.get('weight'))
+            # returns the first found shortest path between the switches (cached per weight metric)
+            path = self.path_service.shortest_path(src_sw, dst_sw, weight=kwargs.get('weight'))
         except:
             LOG.exception("No path could be found between {0} and {1} using src_sw={2} and dst_sw={3}".format(
                 vnf_src_name, vnf_dst_name, src_sw, dst_sw))
@@ -494,7 +1077,7 @@ class DCNetwork(Containernet):
             else:
                 # take first link between switches by default
                 index_edge_out = 0
-                switch_outport_nr = self.DCNetwork_graph[current_hop][next_hop][index_edge_out]['src_port_nr']
+                switch_outport_nr = self.topology.links(current_hop, next_hop)[index_edge_out]['src_port_nr']
 
            # set of entry via ovs-ofctl
             if isinstance(current_node, OVSSwitch):
@@ -529,7 +1112,7 @@ class DCNetwork(Containernet):
 
             # take first link between switches by default
             if isinstance(next_node, OVSSwitch):
-                switch_inport_nr = self.DCNetwork_graph[current_hop][next_hop][0]['dst_port_nr']
+                switch_inport_nr = self.topology.links(current_hop, next_hop)[0]['dst_port_nr']
                 current_hop = next_hop
 
         return "path {2} between {0} and {1}".format(vnf_src_name, vnf_dst_name, cmd)
@@ -552,16 +1135,123 @@ class DCNetwork(Containernet):
         :param tag: vlan tag to be used for this chain (pre-defined or new one if none is specified)
         :param skip_vlan_tag: boolean to indicate if a vlan tag should be appointed to this flow or not
         :param path: custom path between the two VNFs (list of switches)
+        :param bandwidth: bandwidth demand of the chain in Mbit/s, reserved on the inter-switch links.
+                          Without a custom path, the shortest path with enough unreserved bandwidth is used.
+        :param multipath: install the chain on all equal-cost paths and parallel links between its switches,
+                          flows are hashed over the links by OpenFlow select groups (vlan encapsulation only)
         :param bidirectional: setup the chain in two directions or only one-way (src <-> dst)
+        :param flow_batch: list to collect the Ryu flow entries of this chain in, they are not sent if given
         :return: output log string
+        :raises OvsBatchError: if the ovs-ofctl/ovs-vsctl calls of the chain failed
+        """
+        # ovs-ofctl/ovs-vsctl calls of the chain are applied at once per switch
+        with self.ovs_batch():
+            if self.controller == RemoteController and kwargs.get('flow_batch') is None:
+                # collect the flow entries of the complete chain and send them in a single request
+                kwargs['flow_batch'] = []
+                ret = self._setChain(vnf_src_name, vnf_dst_name, vnf_src_interface, vnf_dst_interface, **kwargs)
+                self.ryu_REST_bulk(kwargs['flow_batch'])
+                return ret
+
+            return self._setChain(vnf_src_name, vnf_dst_name, vnf_src_interface, vnf_dst_interface, **kwargs)
+
+    def setChains(self, chains, max_workers=8):
         """
+        Install (or delete) a list of chains at once.
+        The paths and tags of all chains are set up first, without sending anything to the switches.
+        The flow entries are then sent concurrently, at most max_workers switches at a time.
+        All entries of a switch are sent by the same worker, in the order of the chains.
+
+        :param chains: list of dicts with vnf_src_name, vnf_dst_name, vnf_src_interface, vnf_dst_interface
+                       and any other argument of setChain (cmd, bidirectional, cookie, ...)
+        :param max_workers: number of switches that are programmed concurrently
+        :return: list with a dict per chain: the chain endpoints, 'result' (output of setChain), 'error'
+                 (also set if setChain reported that the chain was not set up),
+                 'setup_time' and 'install_time' (seconds until the entries of all its switches were sent)
+        """
+        results = []
+        # switches (names or dpids) with flow entries of each chain
+        chain_switches = []
+        # dpid -> Ryu flow entries of all chains
+        ryu_flows = OrderedDict()
+        start = time.time()
+
+        with self.ovs_batch() as batch:
+            for chain_spec in chains:
+                kwargs = dict(chain_spec)
+                result = {'vnf_src_name': kwargs.pop('vnf_src_name'),
+                          'vnf_dst_name': kwargs.pop('vnf_dst_name'),
+                          'vnf_src_interface': kwargs.pop('vnf_src_interface', None),
+                          'vnf_dst_interface': kwargs.pop('vnf_dst_interface', None),
+                          'result': None,
+                          'error': None}
+                if self.controller == RemoteController:
+                    kwargs['flow_batch'] = []
+                counts = batch.switch_counts()
+                t = time.time()
+                try:
+                    result['result'] = self._setChain(result['vnf_src_name'], result['vnf_dst_name'],
+                                                      result['vnf_src_interface'], result['vnf_dst_interface'],
+                                                      **kwargs)
+                except Exception as ex:
+                    LOG.exception("setting up chain {0} failed".format(chain_spec))
+                    result['error'] = str(ex)
+                if result['error'] is None and kwargs.get('cmd', 'add-flow') == 'add-flow' and \
+                        not kwargs.get('monitor') and not self._chain_succeeded(result['result']):
+                    # e.g. no path or unknown interface, reported as text
+                    result['error'] = result['result']
+                result['setup_time'] = time.time() - t
+
+                switches = set(sw for sw, n in batch.switch_counts().items() if n != counts.get(sw, 0))
+                for flow in kwargs.get('flow_batch') or []:
+                    ryu_flows.setdefault(flow['dpid'], []).append(flow)
+                    switches.add(flow['dpid'])
+                chain_switches.append(switches)
+                results.append(result)
+            LOG.info("set up {0} chains in {1:.3f}s".format(len(chains), time.time() - start))
+
+            # switch -> (time its entries were sent, errors)
+            finished = {}
+            install_start = time.time()
+
+            def switch_done(switch, errors):
+                finished[switch] = (time.time(), errors)
+
+            # vlan tags and ovs-ofctl flow entries
+            batch.flush(max_workers=max_workers, callback=switch_done)
+
+            def send_ryu_flows(dpid):
+                ret = self.ryu_REST_bulk(ryu_flows[dpid])
+                errors = []
+                if isinstance(ret, dict):
+                    errors = (ret.get('errors') or []) + (ret.get('timeouts') or [])
+                switch_done(dpid, errors)
+
+            run_parallel(send_ryu_flows, ryu_flows.keys(), max_workers)
+
+        for result, switches in zip(results, chain_switches):
+            done = [finished.get(sw, (install_start, ['no response'])) for sw in switches]
+            result['install_time'] = max([t for t, errors in done] + [install_start]) - install_start
+            failed = [sw for sw in switches if finished.get(sw, (None, ['no response']))[1]]
+            if failed and result['error'] is None:
+                result['error'] = "installing flow entries failed on switches: {0}".format(sorted(failed))
+                if VSCTL_TRANSACTION in failed:
+                    # the vlan tags of all chains are set in one transaction, which is aborted by a single bad port
+                    result['error'] += ", the vlan tags of all chains were not set"
+        LOG.info("installed {0} chains in {1:.3f}s".format(len(chains), time.time() - start))
+        return results
+
+    def _setChain(self, vnf_src_name, vnf_dst_name, vnf_src_interface=None, vnf_dst_interface=None, **kwargs):
+
+        # arguments of the chain as given, kept for snapshots
+        chain_spec = dict((k, v) for k, v in kwargs.items() if k not in ('cmd', 'flow_batch'))
 
         # check if chain already exists (by checking if a vlan tag has already been assigned for this interface)
         id_src = "{0}:{1}".format(vnf_src_name, vnf_src_interface)
         tag_src = self.vlan_dict.get(id_src)
         id_dst = "{0}:{1}".format(vnf_dst_name, vnf_dst_interface)
         tag_dst = self.vlan_dict.get(id_dst)
-        if (tag_src == tag_dst) and (tag_src is not None) and (tag_dst is not None):
+        if (tag_src == tag_dst) and (tag_src is not None) and (tag_dst is not None) and self.segments is self.vlans:
             kwargs['tag'] = tag_src
 
         # special procedure for monitoring flows
@@ -585,27 +1275,55 @@ class DCNetwork(Containernet):
         cmd = kwargs.get('cmd', 'add-flow')
         if cmd == 'add-flow' or cmd == 'del-flows':
             ret = self._chainAddFlow(vnf_src_name, vnf_dst_name, vnf_src_interface, vnf_dst_interface, **kwargs)
+            if cmd == 'add-flow' and not self._chain_succeeded(ret):
+                # nothing was installed, the reverse direction is not set up either
+                return ret
             # this can be a boolean or a string value, as returned by the rest api
             bidirectional = kwargs.get('bidirectional')
             true_list = ['true', 'True', True, 1]
             if bidirectional in true_list:
                 if kwargs.get('path') is not None:
                     kwargs['path'] = list(reversed(kwargs.get('path')))
-                ret = ret + '\n' + self._chainAddFlow(vnf_dst_name, vnf_src_name, vnf_dst_interface, vnf_src_interface, **kwargs)
+                ret_back = self._chainAddFlow(vnf_dst_name, vnf_src_name, vnf_dst_interface, vnf_src_interface, **kwargs)
+                ret = ret + '\n' + ret_back
+                if cmd == 'add-flow' and not self._chain_succeeded(ret_back):
+                    # remove the direction that was installed, with its segment and bandwidth
+                    rollback = dict(kwargs, cmd='del-flows', path=None)
+                    self._chainAddFlow(vnf_src_name, vnf_dst_name, vnf_src_interface, vnf_dst_interface, **rollback)
+                    return ret
+            self._record_chain(vnf_src_name, vnf_dst_name, vnf_src_interface, vnf_dst_interface, cmd, chain_spec)
 
         else:
             ret = "Command unknown"
 
         return ret
 
-    def _chainAddFlow(self, vnf_src_name, vnf_dst_name, vnf_src_interface=None, vnf_dst_interface=None, **kwargs):
+    @staticmethod
+    def _chain_succeeded(ret):
+        """
+        Check the output of _chainAddFlow, failures are reported as text (e.g. "No path could be found ...").
+        """
+        return isinstance(ret, basestring) and ret.startswith('success')
+
+    def _record_chain(self, vnf_src_name, vnf_dst_name, vnf_src_interface, vnf_dst_interface, cmd, chain_spec):
+        """
+        Remember the arguments of an installed chain, or forget them when it is deleted.
+        """
+        if vnf_src_interface is None:
+            vnf_src_interface = self.default_interface(vnf_src_name)
+        vnf_dst_name = vnf_dst_name.split(':')[0]
+        if vnf_dst_interface is None:
+            vnf_dst_interface = self.default_interface(vnf_dst_name)
+        chain_id = (vnf_src_name, vnf_src_interface, vnf_dst_name, vnf_dst_interface)
+        if cmd == 'del-flows':
+            self.installed_chains.pop(chain_id, None)
+        else:
+            self.installed_chains[chain_id] = dict(chain_spec, vnf_src_name=vnf_src_name,
+                                                   vnf_src_interface=vnf_src_interface,
+                                                   vnf_dst_name=vnf_dst_name,
+                                                   vnf_dst_interface=vnf_dst_interface)
 
-        src_sw = None
-        src_sw_inport_nr = 0
-        src_sw_inport_name = None
-        dst_sw = None
-        dst_sw_outport_nr = 0
-        dst_sw_outport_name = None
+    def _chainAddFlow(self, vnf_src_name, vnf_dst_name, vnf_src_interface=None, vnf_dst_interface=None, **kwargs):
 
         LOG.debug("call chainAddFlow vnf_src_name=%r, vnf_src_interface=%r, vnf_dst_name=%r, vnf_dst_interface=%r",
                   vnf_src_name, vnf_src_interface, vnf_dst_name, vnf_dst_interface)
@@ -613,46 +1331,48 @@ class DCNetwork(Containernet):
         # check if port is specified (vnf:port)
         if vnf_src_interface is None:
             # take first interface by default
-            connected_sw = self.DCNetwork_graph.neighbors(vnf_src_name)[0]
-            link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-            vnf_src_interface = link_dict[0]['src_port_id']
-
-        for connected_sw in self.DCNetwork_graph.neighbors(vnf_src_name):
-            link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-            for link in link_dict:
-                if (link_dict[link]['src_port_id'] == vnf_src_interface or
-                        link_dict[link]['src_port_name'] == vnf_src_interface):  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                    # found the right link and connected switch
-                    src_sw = connected_sw
-                    src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                    src_sw_inport_name = link_dict[link]['dst_port_name']
-                    break
+            vnf_src_interface = self.default_interface(vnf_src_name)
+
+        # we might also get interface names, e.g, from a son-emu-cli call
+        src_sw, src_sw_inport_nr, src_sw_inport_name = self.find_connected_switch(vnf_src_name, vnf_src_interface)
 
         if vnf_dst_interface is None:
             # take first interface by default
-            connected_sw = self.DCNetwork_graph.neighbors(vnf_dst_name)[0]
-            link_dict = self.DCNetwork_graph[connected_sw][vnf_dst_name]
-            vnf_dst_interface = link_dict[0]['dst_port_id']
+            vnf_dst_interface = self.default_interface(vnf_dst_name)
 
         vnf_dst_name = vnf_dst_name.split(':')[0]
-        for connected_sw in self.DCNetwork_graph.neighbors(vnf_dst_name):
-            link_dict = self.DCNetwork_graph[connected_sw][vnf_dst_name]
-            for link in link_dict:
-                if link_dict[link]['dst_port_id'] == vnf_dst_interface or \
-                        link_dict[link]['dst_port_name'] == vnf_dst_interface:  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                    # found the right link and connected switch
-                    dst_sw = connected_sw
-                    dst_sw_outport_nr = link_dict[link]['src_port_nr']
-                    dst_sw_outport_name = link_dict[link]['src_port_name']
-                    break
+        dst_sw, dst_sw_outport_nr, dst_sw_outport_name = self.find_connected_switch(vnf_dst_name, vnf_dst_interface)
+
+        chain_id = (vnf_src_name, vnf_src_interface, vnf_dst_name, vnf_dst_interface)
+        kwargs['chain_id'] = chain_id
+        cmd = kwargs.get('cmd')
+
+        multipath = kwargs.get('multipath') in ['true', 'True', True, 1]
+        if (cmd == 'add-flow' and multipath and src_sw != dst_sw) or chain_id in self.multipath_chains:
+            return self._setMultipathChain(src_sw, src_sw_inport_nr, src_sw_inport_name,
+                                           dst_sw, dst_sw_outport_nr, dst_sw_outport_name, **kwargs)
 
         path = kwargs.get('path')
+        # links used per hop of the path, only known for chains with a bandwidth reservation
+        hops = None
+        reservation = self.chain_reservations.get(chain_id)
+        if path is None and cmd == 'del-flows':
+            # delete the flows on the switches where the chain was installed
+            path = self.flow_registry.chain_path(chain_id)
+            if reservation is not None:
+                hops = reservation[0]
+        if cmd == 'add-flow' and (kwargs.get('bandwidth') or reservation is not None):
+            try:
+                path, hops = self._reserve_chain_path(chain_id, src_sw, dst_sw, path, **kwargs)
+            except ValueError as ex:
+                LOG.error("No path could be found between {0} and {1} using src_sw={2} and dst_sw={3}: {4}".format(
+                    vnf_src_name, vnf_dst_name, src_sw, dst_sw, ex))
+                return "No path could be found between {0} and {1}: {2}".format(vnf_src_name, vnf_dst_name, ex)
         if path is None:
             # get shortest path
             try:
-                # returns the first found shortest path
-                # if all shortest paths are wanted, use: all_shortest_paths
-                path = nx.shortest_path(self.DCNetwork_graph, src_sw, dst_sw, weight=kwargs.get('weight'))
+                # returns the first found shortest path between the switches (cached per weight metric)
+                path = self.path_service.shortest_path(src_sw, dst_sw, weight=kwargs.get('weight'))
             except:
                 LOG.exception("No path could be found between {0} and {1} using src_sw={2} and dst_sw={3}".format(
                     vnf_src_name, vnf_dst_name, src_sw, dst_sw))
@@ -667,15 +1387,15 @@ class DCNetwork(Containernet):
         current_hop = src_sw
         switch_inport_nr = src_sw_inport_nr
 
-        # choose free vlan
-        cmd = kwargs.get('cmd')
+        # choose free vlan (or mpls label)
         vlan = None
+        mpls_label = None
         if cmd == 'add-flow':
-            if kwargs.get('tag'):
-                # use pre-defined tag
-                vlan = kwargs.get('tag')
+            segment = self._chain_segment(chain_id, kwargs.get('tag'))
+            if self.segments.mode == 'mpls':
+                mpls_label = segment
             else:
-                vlan = self.vlans.pop()
+                vlan = segment
 
         # iterate through the path to install the flow-entries
         for i in range(0, len(path)):
@@ -696,9 +1416,7 @@ class DCNetwork(Containernet):
                 LOG.info("Next node: {0} is not a switch".format(next_hop))
                 return "Next node: {0} is not a switch".format(next_hop)
             else:
-                # take first link between switches by default
-                index_edge_out = 0
-                switch_outport_nr = self.DCNetwork_graph[current_hop][next_hop][index_edge_out]['src_port_nr']
+                switch_outport_nr = self._chain_hop_link(hops, i, current_hop, next_hop)['src_port_nr']
             custom_path = 0
 
             if (("nat" in vnf_dst_name and "fw" in vnf_src_name) or ("fw" in vnf_dst_name and "nat" in vnf_src_name)):
@@ -710,6 +1428,7 @@ class DCNetwork(Containernet):
            # set OpenFlow entry
             if isinstance(current_node, OVSSwitch):
                 kwargs['vlan'] = vlan
+                kwargs['mpls_label'] = mpls_label
                 kwargs['path'] = path
                 kwargs['current_hop'] = current_hop
                 kwargs['switch_inport_name'] = src_sw_inport_name
@@ -730,11 +1449,17 @@ class DCNetwork(Containernet):
                     if (custom_path != 0):
                         self._set_flow_entry_dpctl_netsolver(current_node, switch_inport_nr, switch_outport_nr, custom_path, **kwargs)
 
-            # take first link between switches by default
             if isinstance(next_node, OVSSwitch):
-                switch_inport_nr = self.DCNetwork_graph[current_hop][next_hop][0]['dst_port_nr']
+                switch_inport_nr = self._chain_hop_link(hops, i, current_hop, next_hop)['dst_port_nr']
                 current_hop = next_hop
 
+        if cmd == 'add-flow':
+            self.flow_registry.add_chain(chain_id, path)
+        elif cmd == 'del-flows':
+            self.flow_registry.remove_chain(chain_id)
+            self._release_chain_segment(chain_id, src_sw, src_sw_inport_name, dst_sw, dst_sw_outport_name)
+            self._release_chain_bandwidth(chain_id)
+
         flow_options = {
             'priority': kwargs.get('priority', DEFAULT_PRIORITY),
             'cookie': kwargs.get('cookie', DEFAULT_COOKIE),
@@ -742,11 +1467,443 @@ class DCNetwork(Containernet):
             'path': kwargs['path'],
             'match_input': kwargs.get('match')
         }
+        if mpls_label is not None:
+            flow_options['mpls_label'] = mpls_label
         flow_options_str = json.dumps(flow_options, indent=1)
         return "success: {2} between {0} and {1} with options: {3}".format(vnf_src_name, vnf_dst_name, cmd, flow_options_str)
 
+    def _reserve_chain_path(self, chain_id, src_sw, dst_sw, path=None, **kwargs):
+        """
+        Reserve the bandwidth demand of a chain on the links between its switches.
+        Without a custom path, the shortest path on which every link has enough unreserved bandwidth is
+        used (constrained shortest path). On a custom path, the least loaded link between two switches is
+        taken, even if it is oversubscribed.
+        A previous reservation of the chain is replaced.
+        :return: (path, [(link id, hop src switch)])
+        :raises ValueError: if no path has enough unreserved bandwidth, a switch is unknown or weight
+                            is no link metric
+        """
+        bandwidth = float(kwargs.get('bandwidth') or 0)
+        with self._reservation_lock:
+            previous = self.chain_reservations.pop(chain_id, None)
+            if previous is not None:
+                self.topology.release(*previous)
+            try:
+                path, hops = self._select_chain_links(chain_id, src_sw, dst_sw, path, bandwidth, kwargs.get('weight'))
+            except ValueError:
+                # the chain keeps its previous path and reservation
+                if previous is not None:
+                    self.topology.reserve(*previous)
+                    self.chain_reservations[chain_id] = previous
+                raise
+            if bandwidth > 0:
+                self.topology.reserve(hops, bandwidth)
+                self.chain_reservations[chain_id] = (hops, bandwidth)
+        LOG.info("Reserved {0} Mbit/s for chain {1} on path {2}".format(bandwidth, chain_id, path))
+        return path, hops
+
+    def _select_chain_links(self, chain_id, src_sw, dst_sw, path, bandwidth, weight=None):
+        if path is None:
+            found = self.topology.constrained_path(src_sw, dst_sw, bandwidth, weight=weight, node_types=['switch'])
+            if found is None:
+                raise ValueError("No path with {0} Mbit/s unreserved bandwidth between {1} and {2}".format(
+                    bandwidth, src_sw, dst_sw))
+            return found
+        hops = []
+        for current_hop, next_hop in zip(path, path[1:]):
+            lids = self.topology.link_ids(current_hop, next_hop)
+            if not lids:
+                raise ValueError("No link between {0} and {1}".format(current_hop, next_hop))
+            lid = max(lids, key=lambda l: self.topology.residual(l, current_hop))
+            if self.topology.residual(lid, current_hop) < bandwidth:
+                LOG.warning("Link {0} -> {1} is oversubscribed by chain {2}".format(current_hop, next_hop, chain_id))
+            hops.append((lid, current_hop))
+        return path, hops
+
+    def _release_chain_bandwidth(self, chain_id):
+        """
+        Give back the bandwidth reserved for a chain.
+        """
+        with self._reservation_lock:
+            reservation = self.chain_reservations.pop(chain_id, None)
+            if reservation is not None:
+                self.topology.release(*reservation)
+
+    def _chain_hop_link(self, hops, i, current_hop, next_hop):
+        """
+        :return: attributes of the link used for hop i of a chain path, the first link between the
+                 switches if the chain has no reserved links
+        """
+        if hops:
+            return self.topology.link(hops[i][0], current_hop)
+        # take first link between switches by default
+        return self.topology.links(current_hop, next_hop)[0]
+
+    def _setMultipathChain(self, src_sw, src_sw_inport_nr, src_sw_inport_name,
+                           dst_sw, dst_sw_outport_nr, dst_sw_outport_name, **kwargs):
+        """
+        Install or delete a chain on all equal-cost paths between its switches (ECMP).
+        Switches with more than one link towards the destination forward the chain traffic to a select group,
+        the other switches to their only next hop. All switches of the chain use the same group id.
+        An installed multipath chain is replaced by a new add-flow, with or without multipath.
+        """
+        chain_id = kwargs['chain_id']
+        vnf_src_name, vnf_src_interface, vnf_dst_name, vnf_dst_interface = chain_id
+        cmd = kwargs.get('cmd')
+        installed = self.multipath_chains.pop(chain_id, None)
+        if installed is not None:
+            self._set_multipath_entries(installed, **dict(kwargs, cmd='del-flows'))
+            self.group_ids.free(installed['group_id'])
+            self.flow_registry.remove_chain(chain_id)
+        if cmd == 'del-flows':
+            self._release_chain_segment(chain_id, src_sw, src_sw_inport_name, dst_sw, dst_sw_outport_name)
+            return "success: del-flows between {0} and {1} (multipath)".format(vnf_src_name, vnf_dst_name)
+        if kwargs.get('multipath') not in ['true', 'True', True, 1] or src_sw == dst_sw:
+            kwargs.pop('multipath', None)
+            return self._chainAddFlow(vnf_src_name, vnf_dst_name, vnf_src_interface, vnf_dst_interface, **kwargs)
+        if self.segments is not self.vlans:
+            return "Multipath chains need vlan encapsulation"
+
+        weight = kwargs.get('weight')
+        try:
+            paths = self.path_service.equal_cost_paths(src_sw, dst_sw, weight=weight)
+        except Exception:
+            LOG.exception("No path could be found between {0} and {1}".format(src_sw, dst_sw))
+            return "No path could be found between {0} and {1}".format(vnf_src_name, vnf_dst_name)
+
+        switches = OrderedDict()
+        for sw, (prevs, nexts) in equal_cost_hops(paths).items():
+            if sw == src_sw:
+                in_ports = [src_sw_inport_nr]
+            else:
+                in_ports = [l['dst_port_nr'] for prev in prevs for l in self._equal_cost_links(prev, sw, weight)]
+            if sw == dst_sw:
+                out_ports = [(vnf_dst_name, dst_sw_outport_nr)]
+            else:
+                out_ports = [(nxt, l['src_port_nr']) for nxt in nexts for l in self._equal_cost_links(sw, nxt, weight)]
+            switches[sw] = {'in_ports': in_ports, 'out_ports': out_ports}
+
+        mp = {'group_id': self.group_ids.allocate(),
+              'vlan': self._chain_segment(chain_id, kwargs.get('tag')),
+              'src_sw': src_sw, 'dst_sw': dst_sw,
+              'src_port_name': src_sw_inport_name, 'dst_port_name': dst_sw_outport_name,
+              'paths': paths, 'switches': switches}
+        self.multipath_chains[chain_id] = mp
+        self._set_multipath_entries(mp, **kwargs)
+        self.flow_registry.add_chain(chain_id, list(switches))
+        LOG.info("Multipath chain between {0} and {1} on {2} paths: {3}".format(
+            vnf_src_name, vnf_dst_name, len(paths), paths))
+        flow_options = {
+            'priority': kwargs.get('priority', DEFAULT_PRIORITY),
+            'cookie': kwargs.get('cookie', DEFAULT_COOKIE),
+            'vlan': mp['vlan'],
+            'group_id': mp['group_id'],
+            'paths': paths,
+            'match_input': kwargs.get('match')
+        }
+        return "success: add-flow between {0} and {1} with options: {2}".format(
+            vnf_src_name, vnf_dst_name, json.dumps(flow_options, indent=1))
+
+    def _equal_cost_links(self, node1, node2, weight=None):
+        """
+        :return: attribute dicts of the parallel links from node1 to node2 with the lowest weight
+        """
+        links = self.topology.links(node1, node2)
+        if weight is None:
+            return links
+        cost = min(l.get(weight, 1) for l in links)
+        return [l for l in links if l.get(weight, 1) == cost]
+
+    def _set_multipath_entries(self, mp, **kwargs):
+        """
+        Add or delete the select groups and flow entries of a multipath chain on its switches.
+        """
+        chain_id = kwargs['chain_id']
+        vnf_src_name, vnf_src_interface, vnf_dst_name, vnf_dst_interface = chain_id
+        cmd = kwargs.get('cmd')
+        vlan = mp['vlan']
+        group_id = mp['group_id']
+        cookie = kwargs.get('cookie')
+        match_input = kwargs.get('match')
+        flow_batch = kwargs.get('flow_batch')
+        ryu = self.controller == RemoteController
+        for sw, entry in mp['switches'].items():
+            node = self.getNodeByName(sw)
+            first = sw == mp['src_sw']
+            last = sw == mp['dst_sw']
+            out_ports = [port for nxt, port in entry['out_ports']]
+            use_group = len(out_ports) > 1
+
+            if ryu:
+                group = {'dpid': int(node.dpid, 16), 'type': 'SELECT', 'group_id': group_id,
+                         'buckets': [{'weight': 1, 'actions': [{'type': 'OUTPUT', 'port': p}]} for p in out_ports]}
+                flows = []
+                for in_port in entry['in_ports']:
+                    flow = {'dpid': int(node.dpid, 16), 'table_id': 0,
+                            'priority': int(kwargs.get('priority', DEFAULT_PRIORITY))}
+                    if cookie:
+                        flow['cookie'] = int(cookie)
+                    match = 'in_port=%s' % in_port
+                    if match_input:
+                        match = ','.join([match, match_input])
+                    if not first:
+                        match += ',dl_vlan=%s' % vlan
+                    flow['match'] = self._parse_match(match)
+                    actions = []
+                    if first:
+                        actions.append({'type': 'PUSH_VLAN', 'ethertype': 33024})
+                        actions.append({'type': 'SET_FIELD', 'field': 'vlan_vid', 'value': vlan | 0x1000})
+                    if last:
+                        actions.append({'type': 'POP_VLAN'})
+                    if use_group:
+                        actions.append({'type': 'GROUP', 'group_id': group_id})
+                    else:
+                        actions.append({'type': 'OUTPUT', 'port': out_ports[0]})
+                    flow['actions'] = actions
+                    flows.append(flow)
+                if cmd == 'add-flow':
+                    if not kwargs.get('skip_vlan_tag') and (first or last):
+                        port_name, vnf_name, vnf_interface = (
+                            (mp['src_port_name'], vnf_src_name, vnf_src_interface) if first else
+                            (mp['dst_port_name'], vnf_dst_name, vnf_dst_interface))
+                        self._set_vlan_tag(node, port_name, vlan, vnf_name, vnf_interface)
+                    entries = ([dict(group, cmd='group_add')] if use_group else []) + \
+                              [dict(flow, cmd='add') for flow in flows]
+                    for flow in flows:
+                        self.flow_registry.add_ryu(sw, flow, chain=chain_id)
+                else:
+                    for flow in flows:
+                        flow.pop('actions')
+                        if cookie:
+                            flow['cookie_mask'] = int('0xffffffffffffffff', 16)
+                    entries = [dict(flow, cmd='delete') for flow in flows] + \
+                              ([{'dpid': group['dpid'], 'group_id': group_id, 'cmd': 'group_delete'}]
+                               if use_group else [])
+                if flow_batch is not None:
+                    flow_batch.extend(entries)
+                else:
+                    self.ryu_REST_bulk(entries)
+                continue
+
+            if cmd == 'add-flow' and use_group:
+                buckets = ','.join('bucket=output:%s' % p for p in out_ports)
+                node.dpctl('add-group', '-O OpenFlow13 group_id=%s,type=select,%s' % (group_id, buckets))
+            for in_port in entry['in_ports']:
+                match = 'in_port=%s' % in_port
+                if match_input:
+                    match = ','.join([match, match_input])
+                if not first:
+                    match += ',dl_vlan=%s' % vlan
+                if cmd == 'del-flows':
+                    if cookie:
+                        match = 'cookie=%s/-1,%s' % (cookie, match)
+                    self._dpctl(node, cmd, '-O OpenFlow13 ' + match)
+                    continue
+                if cookie:
+                    match = 'cookie=%s,%s' % (cookie, match)
+                actions = []
+                if first:
+                    actions.append('mod_vlan_vid:%s' % vlan)
+                if last:
+                    actions.append('strip_vlan')
+                actions.append('group:%s' % group_id if use_group else 'output:%s' % out_ports[0])
+                ofcmd = '-O OpenFlow13 %s,action=%s' % (match, ','.join(actions))
+                self.flow_registry.add_ofctl(sw, cmd, ofcmd, cookie=cookie, chain=chain_id)
+                self._dpctl(node, cmd, ofcmd)
+            if cmd == 'del-flows' and use_group:
+                # also removes flows still forwarding to the group
+                node.dpctl('del-groups', '-O OpenFlow13 group_id=%s' % group_id)
+
+    def getMultipathStats(self, vnf_src_name, vnf_dst_name, vnf_src_interface=None, vnf_dst_interface=None):
+        """
+        Get the counters of the links a multipath chain is spread over, from the buckets of its select groups.
+        :return: dict with the paths of the chain and per switch with a select group a list of
+                 {'next_hop', 'port', 'packet_count', 'byte_count'}, None if the chain is no multipath chain
+        """
+        if vnf_src_interface is None:
+            vnf_src_interface = self.default_interface(vnf_src_name)
+        if vnf_dst_interface is None:
+            vnf_dst_interface = self.default_interface(vnf_dst_name)
+        mp = self.multipath_chains.get((vnf_src_name, vnf_src_interface, vnf_dst_name, vnf_dst_interface))
+        if mp is None:
+            return None
+        stats = {'paths': mp['paths'], 'group_id': mp['group_id'], 'switches': {}}
+        for sw, entry in mp['switches'].items():
+            if len(entry['out_ports']) < 2:
+                continue
+            node = self.getNodeByName(sw)
+            try:
+                if self.controller == RemoteController:
+                    groups = parse_ryu_group_stats(self.ryu_client.get('stats/groupstats', dpid=int(node.dpid, 16)))
+                else:
+                    groups = parse_ofctl_group_stats(node.dpctl('dump-group-stats', '-O', 'OpenFlow13'))
+            except Exception:
+                LOG.exception("reading the group stats of switch {0} failed".format(sw))
+                groups = {}
+            buckets = groups.get(mp['group_id'], [])
+            stats['switches'][sw] = [
+                {'next_hop': nxt, 'port': port,
+                 'packet_count': buckets[i][0] if i < len(buckets) else None,
+                 'byte_count': buckets[i][1] if i < len(buckets) else None}
+                for i, (nxt, port) in enumerate(entry['out_ports'])]
+        return stats
+
+    def _chain_segment(self, chain_id, tag=None):
+        """
+        Get the segment id (vlan tag or mpls label) of a chain, a new one is allocated if no tag is given.
+        Re-adding an installed chain reuses its segment.
+        """
+        if tag:
+            tag = int(tag)
+            # remember the tag if it is ours to free when the chain is deleted,
+            # pre-defined tags can also be shared with other chains or E-LANs
+            if self.segments.reserve(tag) or tag in self.chain_segment_refs or \
+                    (self.segments is self.vlans and tag in self.elan_vlans):
+                old = self._assign_chain_segment(chain_id, tag)
+                if old is not None and old != tag:
+                    self._release_segment(old)
+            return tag
+
+        segment = self.chain_segments.get(chain_id)
+        if segment is None:
+            segment = self.segments.allocate()
+            self._assign_chain_segment(chain_id, segment)
+        return segment
+
+    def _assign_chain_segment(self, chain_id, segment):
+        """
+        Assign a segment id to a chain.
+        :return: the former segment of the chain (not freed) or None
+        """
+        old = self._pop_chain_segment(chain_id)
+        self.chain_segments[chain_id] = segment
+        self.chain_segment_refs[segment] += 1
+        return old
+
+    def _pop_chain_segment(self, chain_id):
+        """
+        Unassign the segment of a chain.
+        :return: the segment (not freed) or None
+        """
+        segment = self.chain_segments.pop(chain_id, None)
+        if segment is not None:
+            self.chain_segment_refs[segment] -= 1
+            if self.chain_segment_refs[segment] <= 0:
+                del self.chain_segment_refs[segment]
+        return segment
+
+    def _release_chain_segment(self, chain_id, src_sw, src_sw_port_name, dst_sw, dst_sw_port_name):
+        """
+        Free the segment of a deleted chain and remove the vlan tags it set on the switch ports of its endpoints.
+        """
+        segment = self._pop_chain_segment(chain_id)
+        if segment is None:
+            return
+        vnf_src_name, vnf_src_interface, vnf_dst_name, vnf_dst_interface = chain_id
+        if self.segments is self.vlans and segment not in self.elan_vlans and \
+                segment not in self.chain_segment_refs:
+            endpoints = [(src_sw, src_sw_port_name, vnf_src_name, vnf_src_interface),
+                         (dst_sw, dst_sw_port_name, vnf_dst_name, vnf_dst_interface)]
+            for sw, port_name, vnf_name, vnf_interface in endpoints:
+                if self.vlan_dict.get("{0}:{1}".format(vnf_name, vnf_interface)) == segment:
+                    self._remove_vlan_tag(self.getNodeByName(sw), port_name, segment, vnf_name, vnf_interface)
+        self._release_segment(segment)
+
+    def _release_segment(self, segment, allocator=None):
+        """
+        Give a segment id back to its pool once no chain, E-LAN or interface uses it anymore.
+        """
+        if allocator is None:
+            allocator = self.segments
+        if allocator is self.segments and segment in self.chain_segment_refs:
+            return False
+        if allocator is self.vlans and (segment in self.elan_vlans or segment in self.vlan_dict.values()):
+            return False
+        return allocator.free(segment)
+
+    def _release_node_segments(self, node_name):
+        """
+        Forget the vlan tags of a removed node and free the E-LAN tags that are not used anymore.
+        The segments of chains are only freed when the chain is deleted, as its flow entries remain installed.
+        """
+        prefix = "{0}:".format(node_name)
+        tags = set(self.vlan_dict.pop(id) for id in list(self.vlan_dict) if id.startswith(prefix))
+        for tag in tags:
+            if tag in self.elan_vlans and tag not in self.vlan_dict.values():
+                self.elan_vlans.discard(tag)
+                self._release_segment(tag, self.vlans)
+
+    def segment_usage(self):
+        """
+        :return: usage of the vlan tags and, in mpls mode, of the chain labels
+        """
+        usage = {'vlan': self.vlans.usage(),
+                 'chains': len(self.chain_segments),
+                 'elans': len(self.elan_vlans)}
+        if self.segments is not self.vlans:
+            usage[self.segments.mode] = self.segments.usage()
+        return usage
+
+    def _mpls_labels(self, label):
+        """
+        MPLS has no next protocol field, so ARP frames of a chain get their own label to restore the ethertype
+        when the label is popped. Other than IPv4 and ARP traffic is not forwarded on mpls chains.
+        :return: list of (ethertype, label)
+        """
+        return [(0x0800, label), (0x0806, label | MPLS_ARP_FLAG)]
+
+    def _set_mpls_flow_entry_ryu_rest(self, node, switch_inport_nr, switch_outport_nr, **kwargs):
+        """
+        Add the flow entries of a chain on a path of more than 1 switch, using an mpls label instead of a vlan tag.
+        """
+        cookie = kwargs.get('cookie')
+        match_input = kwargs.get('match')
+        path = kwargs.get('path')
+        index = kwargs.get('pathindex')
+        priority = kwargs.get('priority', DEFAULT_PRIORITY)
+        table_id = kwargs.get('table_id') or 0
+
+        for eth_type, label in self._mpls_labels(kwargs.get('mpls_label')):
+            match = 'in_port=%s' % switch_inport_nr
+            if match_input:
+                match = ','.join([match, match_input])
+
+            flow = {}
+            flow['dpid'] = int(node.dpid, 16)
+            if cookie:
+                flow['cookie'] = int(cookie)
+            if priority:
+                flow['priority'] = int(priority)
+            flow['table_id'] = table_id
+            flow['actions'] = []
+
+            if index == 0:  # first node
+                match += ',dl_type=%s' % eth_type
+                flow['actions'].append({'type': 'PUSH_MPLS', 'ethertype': 34887})  # 0x8847: MPLS unicast
+                flow['actions'].append({'type': 'SET_FIELD', 'field': 'mpls_label', 'value': label})
+            elif index == len(path) - 1:  # last node
+                match += ',dl_type=34887,mpls_label=%s' % label
+                flow['actions'].append({'type': 'POP_MPLS', 'ethertype': eth_type})
+            else:  # middle nodes
+                match += ',dl_type=34887,mpls_label=%s' % label
+
+            # output action must come last
+            flow['actions'].append({'type': 'OUTPUT', 'port': switch_outport_nr})
+            flow['match'] = self._parse_match(match)
+            self.flow_registry.add_ryu(node.name, flow, chain=kwargs.get('chain_id'))
+
+            flow_batch = kwargs.get('flow_batch')
+            if flow_batch is not None:
+                flow['cmd'] = 'add'
+                flow_batch.append(flow)
+            else:
+                self.ryu_REST('stats/flowentry/add', data=flow)
+
     def _set_flow_entry_ryu_rest(self, node, switch_inport_nr, switch_outport_nr, **kwargs):
 
+        if kwargs.get('cmd') == 'add-flow' and kwargs.get('mpls_label') is not None and len(kwargs.get('path')) > 1:
+            return self._set_mpls_flow_entry_ryu_rest(node, switch_inport_nr, switch_outport_nr, **kwargs)
+
         match = 'in_port=%s' % switch_inport_nr
 
         cookie = kwargs.get('cookie')
@@ -841,22 +1998,126 @@ class DCNetwork(Containernet):
             flow['actions'].append(action)
 
         flow['match'] = self._parse_match(match)
-        self.ryu_REST(prefix, data=flow)
+        if cmd == 'add-flow':
+            self.flow_registry.add_ryu(node.name, flow, chain=kwargs.get('chain_id'))
+        flow_batch = kwargs.get('flow_batch')
+        if flow_batch is not None:
+            # sent later on together with the other flow entries of the batch
+            flow['cmd'] = prefix.split('/')[-1]
+            flow_batch.append(flow)
+        else:
+            self.ryu_REST(prefix, data=flow)
 
     def _set_vlan_tag(self, node, switch_port, tag, vnf_name, vnf_interface):
         id = "{0}:{1}".format(vnf_name, vnf_interface)
         self.vlan_dict[id] = tag
-        node.vsctl('set', 'port {0} tag={1}'.format(switch_port, tag))
+        self._vsctl(node, 'set', 'port', switch_port, 'tag={0}'.format(tag))
         LOG.debug("set vlan in switch: {0} in_port: {1} vlan tag: {2}".format(node.name, switch_port, tag))
 
     def _remove_vlan_tag(self, node, switch_port, tag, vnf_name, vnf_interface):
         id = "{0}:{1}".format(vnf_name, vnf_interface)
         self.vlan_dict.pop(id)
-        node.vsctl('remove', 'port {0} tag {1}'.format(switch_port, tag))
+        self._vsctl(node, 'remove', 'port', switch_port, 'tag', tag)
         LOG.debug("unset vlan in switch: {0} in_port: {1} vlan tag: {2}".format(node.name, switch_port, tag))
 
+    @contextmanager
+    def ovs_batch(self):
+        """
+        Collect the ovs-ofctl and ovs-vsctl calls of son-emu (chain flows, vlan tags) made by the calling
+        thread within this context. They are applied when the context is left: one ovs-ofctl call per switch
+        and a single ovs-vsctl transaction. Nested contexts share the outermost batch, e.g.:
+
+            with net.ovs_batch():
+                for chain in chains:
+                    net.setChain(...)
+
+        All ovs-vsctl commands of the batch form one transaction: a single bad command (e.g. an unknown port)
+        aborts it, none of the port settings of the batch are applied then.
+
+        :return: the OvsCommandBatch, which can also be flushed explicitly
+        :raises OvsBatchError: if applying the batch failed when leaving the context
+        """
+        batch = getattr(self._ovs_batches, 'batch', None)
+        if batch is not None:
+            yield batch
+            return
+        batch = OvsCommandBatch()
+        self._ovs_batches.batch = batch
+        try:
+            yield batch
+        except Exception:
+            # apply what was collected so far, the original exception is raised
+            self._ovs_batches.batch = None
+            batch.flush()
+            raise
+        self._ovs_batches.batch = None
+        errors = batch.flush()
+        if errors:
+            raise OvsBatchError(errors)
+
+    def _dpctl(self, node, cmd, ofcmd):
+        """
+        Run an ovs-ofctl command on a switch, or add it to the current batch.
+        """
+        batch = getattr(self._ovs_batches, 'batch', None)
+        if batch is None or cmd not in ['add-flow', 'del-flows']:
+            node.dpctl(cmd, ofcmd)
+            return
+        protocols = None
+        if ofcmd.startswith('-O '):
+            protocols, ofcmd = ofcmd[len('-O '):].split(' ', 1)
+        if cmd == 'add-flow':
+            batch.add_flow(node.name, ofcmd, protocols=protocols)
+        else:
+            batch.del_flows(node.name, ofcmd, protocols=protocols)
+
+    def _vsctl(self, node, *args):
+        """
+        Run an ovs-vsctl command, or add it to the transaction of the current batch.
+        """
+        batch = getattr(self._ovs_batches, 'batch', None)
+        if batch is None:
+            node.vsctl(*args)
+        else:
+            batch.vsctl(*args)
+
+    def _set_mpls_flow_entry_dpctl(self, node, switch_inport_nr, switch_outport_nr, **kwargs):
+        """
+        Add the flow entries of a chain on a path of more than 1 switch, using an mpls label instead of a vlan tag.
+        """
+        match = 'in_port=%s' % switch_inport_nr
+        cookie = kwargs.get('cookie')
+        match_input = kwargs.get('match')
+        path = kwargs.get('path')
+        index = kwargs.get('pathindex')
+        s = ','
+        if cookie:
+            match = s.join(['cookie=%s' % cookie, match])
+        if match_input:
+            match = s.join([match, match_input])
+
+        for eth_type, label in self._mpls_labels(kwargs.get('mpls_label')):
+            if index == 0:  # first node
+                flow_match = match + ',dl_type=0x%04x' % eth_type
+                action = 'action=push_mpls:0x8847,set_field:%s->mpls_label,output=%s' % (label, switch_outport_nr)
+            elif index == len(path) - 1:  # last node
+                flow_match = match + ',dl_type=0x8847,mpls_label=%s' % label
+                action = 'action=pop_mpls:0x%04x,output=%s' % (eth_type, switch_outport_nr)
+            else:  # middle nodes
+                flow_match = match + ',dl_type=0x8847,mpls_label=%s' % label
+                action = 'action=output=%s' % switch_outport_nr
+            ofcmd = '-O OpenFlow13 ' + s.join([flow_match, action])
+            LOG.info(ofcmd)
+            self.flow_registry.add_ofctl(node.name, 'add-flow', ofcmd, cookie=cookie, chain=kwargs.get('chain_id'))
+            self._dpctl(node, 'add-flow', ofcmd)
+        LOG.info("add-flow (mpls) in switch: {0} in_port: {1} out_port: {2}".format(node.name, switch_inport_nr,
+                                                                                   switch_outport_nr))
+
     def _set_flow_entry_dpctl(self, node, switch_inport_nr, switch_outport_nr, **kwargs):
 
+        if kwargs.get('cmd') == 'add-flow' and kwargs.get('mpls_label') is not None and len(kwargs.get('path')) > 1:
+            return self._set_mpls_flow_entry_dpctl(node, switch_inport_nr, switch_outport_nr, **kwargs)
+
         match = 'in_port=%s' % switch_inport_nr
         cookie = kwargs.get('cookie')
         match_input = kwargs.get('match')
@@ -888,7 +2149,10 @@ class DCNetwork(Containernet):
             ofcmd = ''
         LOG.info(cmd)
         LOG.info(ofcmd)
-        node.dpctl(cmd, ofcmd)
+        if cmd == 'add-flow':
+            self.flow_registry.add_ofctl(node.name, cmd, ofcmd, cookie=kwargs.get('cookie'),
+                                         chain=kwargs.get('chain_id'))
+        self._dpctl(node, cmd, ofcmd)
         LOG.info("{3} in switch: {0} in_port: {1} out_port: {2}".format(node.name, switch_inport_nr,
                                                                         switch_outport_nr, cmd))
 
@@ -930,12 +2194,23 @@ class DCNetwork(Containernet):
             ofcmd = ''
         LOG.info(cmd)
         LOG.info(ofcmd)
-        node.dpctl(cmd, ofcmd)
+        if cmd == 'add-flow':
+            self.flow_registry.add_ofctl(node.name, cmd, ofcmd, cookie=kwargs.get('cookie'),
+                                         chain=kwargs.get('chain_id'))
+        self._dpctl(node, cmd, ofcmd)
         LOG.info("{3} in switch: {0} in_port: {1} out_port: {2}".format(node.name, switch_inport_nr,
                                                                         switch_outport_nr, cmd))
 
     # start Ryu Openflow controller as Remote Controller for the DCNetwork
-    def startRyu(self, learning_switch=True):
+    def startRyu(self, learning_switch=True, high_rate=False, bulk_api=True):
+        """
+        :param learning_switch: learning switch behavior of the son-emu Ryu app
+        :param bulk_api: load the son-emu Ryu app for its bulk flow api also if learning is off,
+                         without it the flow entries of a chain are sent one by one to ofctl_rest
+        :param high_rate: rate limited packet-ins, learned flows with idle timeout and aging MAC tables,
+                          tuned with the SON_EMU_PACKET_IN_RATE, SON_EMU_LEARNED_IDLE_TIMEOUT,
+                          SON_EMU_MAC_TABLE_SIZE and SON_EMU_MAC_AGING_TIME environment variables
+        """
         # start Ryu controller with rest-API
         python_install_path = site.getsitepackages()[0]
         # ryu default learning switch
@@ -950,9 +2225,16 @@ class DCNetwork(Containernet):
         ryu_of_port = '6653'
         ryu_cmd = 'ryu-manager'
         FNULL = open("/tmp/ryu.log", 'w')
-        if learning_switch:
-            self.ryu_process = Popen([ryu_cmd, ryu_path, ryu_path2, ryu_option, ryu_of_port], stdout=FNULL, stderr=FNULL)
-            LOG.debug('starting ryu-controller with {0}'.format(ryu_path))
+        if learning_switch or bulk_api:
+            # the learning switch behavior of the son-emu app is optional, its bulk flow api is always available
+            ryu_env = dict(os.environ)
+            ryu_env['SON_EMU_LEARNING_SWITCH'] = '1' if learning_switch else '0'
+            ryu_env['SON_EMU_HIGH_RATE'] = '1' if learning_switch and high_rate else '0'
+            self.ryu_process = Popen([ryu_cmd, ryu_path, ryu_path2, ryu_option, ryu_of_port],
+                                     stdout=FNULL, stderr=FNULL, env=ryu_env)
+            self.ryu_bulk_api = True
+            LOG.debug('starting ryu-controller with {0} (learning switch: {1}, high-rate: {2})'.format(
+                ryu_path, learning_switch, high_rate))
             LOG.debug('starting ryu-controller with {0}'.format(ryu_path2))
         else:
             # no learning switch, but with rest api
@@ -972,34 +2254,133 @@ class DCNetwork(Containernet):
         # ensure its death ;-)
         Popen(['pkill', '-f', 'ryu-manager'])
 
-    def ryu_REST(self, prefix, dpid=None, data=None):
+    def ryu_REST(self, prefix, dpid=None, data=None, timeout=None):
+        """
+        Call the Ryu REST API: POST if data is given, GET otherwise.
+        :return: the decoded JSON reply, or the reply text if it is no JSON
+        """
+        ret = self.ryu_client.request(prefix, dpid=dpid, data=data if data else None, timeout=timeout)
+        if ret.data is not None:
+            return ret.data
+        return ret.text.rstrip()
 
-        if dpid:
-            url = self.ryu_REST_api + '/' + str(prefix) + '/' + str(dpid)
-        else:
-            url = self.ryu_REST_api + '/' + str(prefix)
-        if data:
-            req = self.RyuSession.post(url, json=data)
-        else:
-            req = self.RyuSession.get(url)
-
-        # do extra logging if status code is not 200 (OK)
-        if req.status_code is not requests.codes.ok:
-            logging.info(
-                'type {0}  encoding: {1} text: {2} headers: {3} history: {4}'.format(req.headers['content-type'],
-                                                                                     req.encoding, req.text,
-                                                                                     req.headers, req.history))
-            LOG.info('url: {0}'.format(str(url)))
-            if data:
-                LOG.info('POST: {0}'.format(str(data)))
-            LOG.info('status: {0} reason: {1}'.format(req.status_code, req.reason))
-
-        if 'json' in req.headers['content-type']:
-            ret = req.json()
-            return ret
-
-        ret = req.text.rstrip()
-        return ret
+    def getControllerStats(self):
+        """
+        Get the counters of the son-emu Ryu app: packet-ins and flow-mods (totals and per second)
+        and the sizes of its MAC tables.
+        :return: dict, None if the Ryu app is not reachable or not started (see startRyu)
+        """
+        if self.controller != RemoteController or not self.ryu_bulk_api:
+            return None
+        return self.ryu_monitor_client.get('son-emu/stats')
+
+    def ryu_REST_bulk(self, entries):
+        """
+        Send a list of flow/group entries to the son-emu Ryu app, which applies them as one batch.
+        The entries use the ofctl_rest format with an additional 'cmd' field (e.g. 'add', 'delete', 'group_delete').
+        Falls back to one ofctl_rest request per entry if the son-emu Ryu app is not running
+        (see startRyu, or a 404 reply).
+        Other failures are not retried, as the controller may already have applied some of the entries.
+        :param entries: list of flow/group entry dicts
+        :return: aggregated result of the batch (dict), None if the entries were sent one by one
+        """
+        if not entries:
+            return None
+        if not self.ryu_bulk_api:
+            self._ryu_REST_entries(entries)
+            return None
+        ret = self.ryu_client.request(RYU_BULK_PREFIX, data=entries, timeout=RYU_BULK_TIMEOUT)
+        if isinstance(ret.data, dict):
+            if ret.data.get('errors') or ret.data.get('timeouts'):
+                LOG.warning('bulk flow request failed for some entries: errors: {0} timeouts: {1}'.format(
+                    ret.data.get('errors'), ret.data.get('timeouts')))
+            return ret.data
+
+        if ret.status_code != 404:
+            # controller not reachable, no reply in time or an error reply
+            error = 'bulk flow request failed (status {0}): {1}'.format(ret.status_code, ret.text.strip())
+            LOG.error(error)
+            return {'flows': 0, 'groups': 0, 'datapaths': 0, 'errors': [error], 'timeouts': []}
+
+        LOG.warning('bulk flow endpoint not available, sending {0} entries one by one'.format(len(entries)))
+        self._ryu_REST_entries(entries)
+        return None
+
+    def _ryu_REST_entries(self, entries):
+        """
+        Send flow/group entries in the format of ryu_REST_bulk one by one to ofctl_rest.
+        """
+        for entry in entries:
+            entry = dict(entry)
+            cmd = entry.pop('cmd', 'add')
+            if cmd.startswith('group_'):
+                self.ryu_REST('stats/groupentry/{0}'.format(cmd[len('group_'):]), data=entry)
+            else:
+                self.ryu_REST('stats/flowentry/{0}'.format(cmd), data=entry)
+
+    def _dump_flow_keys(self, node):
+        """
+        :return: list of (cookie, table_id, priority) of the flows installed on a switch, None if the dump failed
+        """
+        try:
+            if self.controller == RemoteController:
+                dump = self.ryu_client.get('stats/flow', dpid=int(node.dpid, 16))
+                return parse_ryu_dump(dump) if isinstance(dump, dict) else None
+            return parse_ofctl_dump(node.dpctl('dump-flows', '-O', 'OpenFlow13'))
+        except Exception:
+            LOG.exception("dumping the flows of switch {0} failed".format(node.name))
+            return None
+
+    def reconcileFlows(self, switches=None, prune=False):
+        """
+        Compare the flow entries son-emu installed with the flows on the switches and only
+        install the missing ones again, e.g. after a restart of the controller or a switch.
+
+        :param switches: names of the switches to check (default: all switches with registered flows)
+        :param prune: also delete flows with a cookie that is not known to son-emu (cookie 0 is never deleted)
+        :return: dict switch name -> {'missing': nr of re-installed flows, 'stale': deleted cookies} or
+                 {'error': ...} if the flows of the switch could not be dumped, 'error' is also set if
+                 re-installing the flows failed
+        """
+        report = {}
+        ryu_flows = []
+
+        def switch_done(switch, errors):
+            if errors and switch in report:
+                report[switch]['error'] = '; '.join(e.strip() for e in errors)
+
+        with self.ovs_batch() as batch:
+            for name in sorted(switches or self.flow_registry.switches()):
+                node = self.getNodeByName(name)
+                installed = self._dump_flow_keys(node)
+                if installed is None:
+                    report[name] = {'error': 'flow dump failed'}
+                    continue
+                missing = self.flow_registry.missing(name, installed)
+                for entry in missing:
+                    if entry.fmt == 'ryu':
+                        flow = dict(entry.flow)
+                        flow['cmd'] = 'add'
+                        ryu_flows.append(flow)
+                    else:
+                        self._dpctl(node, entry.cmd, entry.flow)
+
+                stale = self.flow_registry.stale(installed) if prune else set()
+                for cookie in stale:
+                    if self.controller == RemoteController:
+                        ryu_flows.append({'cmd': 'delete', 'dpid': int(node.dpid, 16), 'cookie': cookie,
+                                          'cookie_mask': int('0xffffffffffffffff', 16)})
+                    else:
+                        self._dpctl(node, 'del-flows', 'cookie=%s/-1' % cookie)
+
+                report[name] = {'missing': len(missing), 'stale': sorted(stale)}
+                if missing or stale:
+                    LOG.info("reconcile switch {0}: {1} missing flows, stale cookies: {2}".format(
+                        name, len(missing), sorted(stale)))
+            # failures are reported per switch
+            batch.flush(callback=switch_done)
+        self.ryu_REST_bulk(ryu_flows)
+        return report
 
     # need to respect that some match fields must be integers
     # http://ryu.readthedocs.io/en/latest/app/ofctl_rest.html#description-of-match-and-actions
@@ -1019,19 +2400,5 @@ class DCNetwork(Containernet):
 
     def find_connected_dc_interface(self, vnf_src_name, vnf_src_interface=None):
 
-        if vnf_src_interface is None:
-            # take first interface by default
-            connected_sw = self.DCNetwork_graph.neighbors(vnf_src_name)[0]
-            link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-            vnf_src_interface = link_dict[0]['src_port_id']
-
-        for connected_sw in self.DCNetwork_graph.neighbors(vnf_src_name):
-            link_dict = self.DCNetwork_graph[vnf_src_name][connected_sw]
-            for link in link_dict:
-                if (link_dict[link]['src_port_id'] == vnf_src_interface or
-                        link_dict[link]['src_port_name'] == vnf_src_interface):  # Fix: we might also get interface names, e.g, from a son-emu-cli call
-                    # found the right link and connected switch
-                    src_sw = connected_sw
-                    src_sw_inport_nr = link_dict[link]['dst_port_nr']
-                    src_sw_inport_name = link_dict[link]['dst_port_name']
-                    return src_sw_inport_name
+        src_sw, src_sw_inport_nr, src_sw_inport_name = self.find_connected_switch(vnf_src_name, vnf_src_interface)
+        return src_sw_inport_name
@@ -0,0 +1,198 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Host side network configuration of containers.
+
+Instead of running one shell command per change inside the container,
+the changes of a container are collected and applied in a single
+'ip -batch' run (iproute2, i.e. netlink) that enters the network
+namespace of the container with nsenter.
+"""
+import logging
+import re
+from collections import namedtuple
+from subprocess import Popen, PIPE
+
+LOG = logging.getLogger("dcemulator.netconfig")
+LOG.setLevel(logging.DEBUG)
+
+# a failed operation of a batch
+NetConfigError = namedtuple("NetConfigError", ["op", "args", "line", "message"])
+
+# iproute2 reports failed batch lines as "Command failed <file>:<line nr>"
+_FAILED_RE = re.compile(r"^Command failed [^:]*:(\d+)\s*$")
+
+
+def parse_batch_errors(stderr, line_ops):
+    """
+    Map the stderr output of 'ip -force -batch' to the operations of a batch.
+    :param stderr: stderr of ip
+    :param line_ops: operation index of each batch line
+    :return: dict operation index -> error message
+    """
+    errors = dict()
+    messages = []
+    for l in stderr.splitlines():
+        m = _FAILED_RE.match(l.strip())
+        if m is None:
+            if l.strip():
+                messages.append(l.strip())
+            continue
+        line_nr = int(m.group(1)) - 1
+        if 0 <= line_nr < len(line_ops):
+            op = line_ops[line_nr]
+            errors.setdefault(op, "; ".join(messages) or "failed")
+        messages = []
+    if messages:
+        # ip failed before executing the batch (e.g. namespace not found)
+        errors.setdefault(None, "; ".join(messages))
+    return errors
+
+
+class NetConfigBatch(object):
+    """
+    Collects interface, route and ARP changes of a single node and
+    applies them in one go. Methods can be chained:
+
+        NetConfigBatch(vnf).rename("eth0", "input").set_ip("input", "10.0.0.1/24").apply()
+
+    The Mininet interface objects of the node are updated for all
+    operations that succeeded.
+    """
+
+    def __init__(self, node):
+        self.node = node
+        # (name, args, [ip batch lines], callback on success)
+        self._ops = []
+
+    def __len__(self):
+        return len(self._ops)
+
+    def _add(self, name, args, lines, on_success=None):
+        self._ops.append((name, args, lines, on_success))
+        return self
+
+    def set_ip(self, intf, cidr):
+        """
+        Replace the addresses of an interface, e.g. set_ip("eth0", "10.0.0.1/24"),
+        and bring it up (like Mininet's Intf.setIP).
+        """
+        def update():
+            i = self._intf(intf)
+            if i is not None:
+                ip, _, prefix = cidr.partition("/")
+                i.ip = ip
+                if prefix:
+                    i.prefixLen = int(prefix)
+        return self._add("set_ip", (intf, cidr),
+                         ["addr flush dev %s" % intf, "addr add %s dev %s" % (cidr, intf),
+                          "link set dev %s up" % intf], update)
+
+    def set_mac(self, intf, mac):
+        def update():
+            i = self._intf(intf)
+            if i is not None:
+                i.mac = mac
+        return self._add("set_mac", (intf, mac), ["link set dev %s address %s" % (intf, mac)], update)
+
+    def set_up(self, intf, up=True):
+        return self._add("set_up", (intf, up), ["link set dev %s %s" % (intf, "up" if up else "down")])
+
+    def rename(self, intf, new_name):
+        def update():
+            i = self._intf(intf)
+            if i is not None:
+                self.node.nameToIntf.pop(intf, None)
+                i.name = new_name
+                self.node.nameToIntf[new_name] = i
+        return self._add("rename", (intf, new_name),
+                         ["link set dev %s down" % intf,
+                          "link set dev %s name %s" % (intf, new_name),
+                          "link set dev %s up" % new_name], update)
+
+    def add_route(self, dst, intf=None, via=None):
+        """
+        Add (or replace) a route, e.g. a host route add_route("10.0.0.2", "eth0").
+        """
+        line = "route replace %s" % dst
+        if via is not None:
+            line += " via %s" % via
+        if intf is not None:
+            line += " dev %s" % intf
+        return self._add("add_route", (dst, intf, via), [line])
+
+    def add_arp(self, intf, ip, mac):
+        """
+        Add a permanent ARP entry (like 'arp -i intf -s ip mac').
+        """
+        return self._add("add_arp", (intf, ip, mac),
+                         ["neigh replace %s lladdr %s dev %s nud permanent" % (ip, mac, intf)])
+
+    def lines(self):
+        """
+        Return the ip batch lines and the operation index of each line.
+        """
+        lines = []
+        line_ops = []
+        for i, (_, _, op_lines, _) in enumerate(self._ops):
+            lines += op_lines
+            line_ops += [i] * len(op_lines)
+        return lines, line_ops
+
+    def apply(self):
+        """
+        Apply all collected operations in the network namespace of the node.
+        :return: list of NetConfigError, empty if everything was applied
+        """
+        if not self._ops:
+            return []
+        lines, line_ops = self.lines()
+        cmd = ["nsenter", "-t", str(self.node.pid), "-n", "ip", "-force", "-batch", "-"]
+        try:
+            p = Popen(cmd, stdin=PIPE, stdout=PIPE, stderr=PIPE, close_fds=True)
+            _, stderr = p.communicate("\n".join(lines) + "\n")
+        except OSError as ex:
+            # nsenter or ip missing: all operations failed
+            stderr = str(ex)
+            p = None
+        failed = parse_batch_errors(stderr, line_ops) if (p is None or p.returncode != 0) else {}
+        errors = []
+        for i, (name, args, op_lines, on_success) in enumerate(self._ops):
+            message = failed.get(i) or failed.get(None)
+            if message is not None:
+                errors.append(NetConfigError(name, args, " / ".join(op_lines), message))
+            elif on_success is not None:
+                on_success()
+        for e in errors:
+            LOG.warning("%s: %s%r failed: %s" % (self.node.name, e.op, e.args, e.message))
+        LOG.debug("%s: applied %d network changes (%d failed)" % (self.node.name, len(self._ops), len(errors)))
+        self._ops = []
+        return errors
+
+    def _intf(self, name):
+        return getattr(self.node, "nameToIntf", dict()).get(name)
@@ -28,7 +28,11 @@ partner consortium (www.sonata-nfv.eu).
 from mininet.node import Docker, OVSBridge
 from mininet.link import Link
 from emuvim.dcemulator.resourcemodel import NotEnoughResourcesAvailable
+from emuvim.dcemulator.workers import run_parallel
+from emuvim.dcemulator.warmpool import WarmPool
 import logging
+import threading
+import time
 
 
 LOG = logging.getLogger("dcemulator.node")
@@ -51,6 +55,7 @@ class EmulatorCompute(Docker):
             self, name, dimage, **kwargs):
         self.datacenter = kwargs.get("datacenter")  # pointer to current DC
         self.flavor_name = kwargs.get("flavor_name")
+        self.command = kwargs.get("dcmd")
         LOG.debug("Starting compute instance %r in data center %r" % (name, str(self.datacenter)))
         # call original Docker.__init__
         Docker.__init__(self, name, dimage, **kwargs)
@@ -62,12 +67,14 @@ class EmulatorCompute(Docker):
         """
         # get all links and find dc switch interface
         networkStatusList = []
+        # link states of all interfaces at once
+        links = self.datacenter.net.status_cache.links(self)
         for i in self.intfList():
             vnf_name = self.name
             vnf_interface = str(i)
             dc_port_name = self.datacenter.net.find_connected_dc_interface(vnf_name, vnf_interface)
             # format list of tuples (name, Ip, MAC, isUp, status, dc_portname)
-            intf_dict = {'intf_name': str(i), 'ip': "{0}/{1}".format(i.IP(), i.prefixLen), 'netmask': i.prefixLen, 'mac': i.MAC(), 'up': i.isUp(), 'status': i.status(), 'dc_portname': dc_port_name}
+            intf_dict = {'intf_name': str(i), 'ip': "{0}/{1}".format(i.IP(), i.prefixLen), 'netmask': i.prefixLen, 'mac': i.MAC(), 'up': links.get(i.name, False), 'status': "OK" if i.name in links else "MISSING", 'dc_portname': dc_port_name}
             networkStatusList.append(intf_dict)
 
         return networkStatusList
@@ -88,10 +95,11 @@ class EmulatorCompute(Docker):
         status["cpuset"] = self.resources.get('cpuset_cpus')
         status["mem_limit"] = self.resources.get('mem_limit')
         status["memswap_limit"] = self.resources.get('memswap_limit')
-        status["state"] = self.dcli.inspect_container(self.dc)["State"]
-        status["id"] = self.dcli.inspect_container(self.dc)["Id"]
-        status["short_id"] = self.dcli.inspect_container(self.dc)["Id"][:12]
-        status["hostname"] = self.dcli.inspect_container(self.dc)["Config"]['Hostname']
+        # id and hostname do not change, the state is cached network wide
+        status["state"] = self.datacenter.net.status_cache.state(self)
+        status["id"] = self.dcinfo["Id"]
+        status["short_id"] = self.dcinfo["Id"][:12]
+        status["hostname"] = self.dcinfo["Config"]['Hostname']
         status["datacenter"] = (None if self.datacenter is None
                                 else self.datacenter.label)
 
@@ -184,6 +192,14 @@ class Datacenter(object):
         self.extSAPs = {}
         # pointer to assigned resource model
         self._resource_model = None
+        # flavors admitted by startComputeBatch but not yet allocated
+        self._reserved_flavors = []
+        # serializes resource model bookkeeping of concurrent container starts
+        self._rm_lock = threading.Lock()
+        # serializes link setup (Mininet port and IP counters are not thread-safe)
+        self._link_lock = threading.Lock()
+        # image -> WarmPool with idle containers claimed by startCompute
+        self.warm_pools = {}
 
     def __repr__(self):
         return self.label
@@ -208,6 +224,51 @@ class Datacenter(object):
     def start(self):
         pass
 
+    def stop(self):
+        """
+        Called when the emulator is stopped. Removes the idle pooled containers.
+        """
+        for pool in self.warm_pools.itervalues():
+            pool.close()
+
+    def enableWarmPool(self, image, size=2, idle_timeout=None, pause=False, wait=False):
+        """
+        Keep idle containers of an image that startCompute claims
+        instead of creating new ones. Only requests with the default
+        command and without creation-time parameters (e.g. volumes)
+        can use the pool.
+        Claimed containers keep the hostname of their pool name and
+        VNF_NAME is only set to the compute name in the Mininet shell of
+        the container (d.cmd); images whose entrypoint reads VNF_NAME or
+        the hostname should not use a pool.
+        :param image: docker image
+        :param size: number of idle containers
+        :param idle_timeout: seconds after which idle containers are replaced (None = never)
+        :param pause: keep idle containers paused
+        :param wait: block until the pool is filled
+        :return: WarmPool
+        """
+        pool = self.warm_pools.get(image)
+        if pool is None:
+            pool = WarmPool(self, image, size=size, idle_timeout=idle_timeout, pause=pause)
+            self.warm_pools[image] = pool
+        else:
+            pool.size = size
+            pool.idle_timeout = idle_timeout
+        LOG.info("Warm pool for image %r in data center %r with %d containers" % (image, str(self), size))
+        pool.fill(wait=wait)
+        return pool
+
+    def disableWarmPool(self, image):
+        """
+        Remove the warm pool of an image and its idle containers.
+        """
+        pool = self.warm_pools.pop(image, None)
+        if pool is None:
+            return False
+        pool.close()
+        return True
+
     def startCompute(self, name, image=None, command=None, network=None, flavor_name="tiny", **params):
         """
         Create a new container as compute resource and connect it to this
@@ -221,8 +282,43 @@ class Datacenter(object):
         """
         assert name is not None
         # no duplications
-        if name in [c.name for c in self.net.getAllContainers()]:
+        if not self.net.container_registry.reserve(name):
             raise Exception("Container with name %s already exists." % name)
+        try:
+            image, network = self._compute_defaults(image, network, params)
+
+            # create the container
+            d = self._add_compute(name, image, command, flavor_name, params)
+
+            # apply resource limits to container if a resource model is defined
+            if self._resource_model is not None:
+                try:
+                    self._resource_model.allocate(d)
+                    self._resource_model.write_allocation_log(d, self.resource_log_path)
+                except NotEnoughResourcesAvailable as ex:
+                    LOG.warning("Allocation of container %r was blocked by resource model." % name)
+                    LOG.info(ex.message)
+                    # ensure that we remove the container
+                    self.net.removeDocker(name)
+                    return None
+
+            # connect all given networks
+            self._connect_compute(d, network)
+            # do bookkeeping
+            self.containers[name] = d
+            self.net.container_registry.commit(d)
+        finally:
+            # no-op if the container was committed
+            self.net.container_registry.release(name)
+
+        return d  # we might use UUIDs for naming later on
+
+    def _compute_defaults(self, image, network, params):
+        """
+        Apply the default image and network and the hard-set cpu limits
+        of a new compute instance. Updates params in place.
+        :return: (image, network list)
+        """
         # set default parameter
         if image is None:
             image = "ubuntu:trusty"
@@ -239,9 +335,19 @@ class Datacenter(object):
         if cpu_percentage:
             params['cpu_period'] = self.net.cpu_period
             params['cpu_quota'] = self.net.cpu_period * float(cpu_percentage)
+        return image, network
 
-        # create the container
-        d = self.net.addDocker(
+    def _add_compute(self, name, image, command, flavor_name, params):
+        """
+        Create and start the container of a compute instance
+        or claim an idle one from the warm pool of the image.
+        """
+        pool = self.warm_pools.get(image)
+        if pool is not None and command is None:
+            d = pool.claim(name, flavor_name, params)
+            if d is not None:
+                return d
+        return self.net.addDocker(
             "%s" % (name),
             dimage=image,
             dcmd=command,
@@ -251,21 +357,10 @@ class Datacenter(object):
             **params
         )
 
-
-
-        # apply resource limits to container if a resource model is defined
-        if self._resource_model is not None:
-            try:
-                self._resource_model.allocate(d)
-                self._resource_model.write_allocation_log(d, self.resource_log_path)
-            except NotEnoughResourcesAvailable as ex:
-                LOG.warning("Allocation of container %r was blocked by resource model." % name)
-                LOG.info(ex.message)
-                # ensure that we remove the container
-                self.net.removeDocker(name)
-                return None
-
-        # connect all given networks
+    def _connect_compute(self, d, network):
+        """
+        Connect a container to the data center switch, one link per network.
+        """
         # if no --net option is given, network = [{}], so 1 empty dict in the list
         # this results in 1 default interface with a default ip address
         for nw in network:
@@ -274,10 +369,139 @@ class Datacenter(object):
                 nw["id"] = self._clean_ifname(nw["id"])
             # TODO we cannot use TCLink here (see: https://github.com/mpeuster/containernet/issues/3)
             self.net.addLink(d, self.switch, params1=nw, cls=Link, intfName1=nw.get('id'))
-        # do bookkeeping
-        self.containers[name] = d
 
-        return d  # we might use UUIDs for naming later on
+    def startComputeBatch(self, specs, max_parallel=8):
+        """
+        Create many containers in this data center at once.
+        The resource model admits the batch as a whole before the first
+        container is created. Containers are then created, started and
+        connected in parallel. If one of them fails, all containers of the
+        batch are removed again, so a batch is either started completely
+        or not at all.
+        :param specs: list of dicts with the arguments of startCompute:
+            name, image, command, network, flavor_name and additional params
+        :param max_parallel: maximum number of containers started at the same time
+        :return: list of dicts (name, container, error, time) in the order of specs
+        """
+        specs = [dict(s) for s in specs]
+        results = [{"name": s.get("name"), "container": None, "error": None, "time": 0.0}
+                   for s in specs]
+        if not specs:
+            return results
+
+        # validate the complete batch before touching Docker
+        registry = self.net.container_registry
+        reserved = []
+        try:
+            for r in results:
+                if r["name"] is None:
+                    r["error"] = "Container name missing."
+                elif not registry.reserve(r["name"]):
+                    r["error"] = "Container with name %s already exists." % r["name"]
+                else:
+                    reserved.append(r["name"])
+            if len(reserved) < len(results):
+                return self._fail_batch(results, "Batch rejected.")
+            return self._start_batch(specs, results, max_parallel)
+        finally:
+            # no-op for committed containers
+            for name in reserved:
+                registry.release(name)
+
+    def _start_batch(self, specs, results, max_parallel):
+        """
+        Admit, create and connect a validated batch (see startComputeBatch).
+        """
+        # admission control for the whole batch
+        flavors = [s.get("flavor_name", "tiny") for s in specs]
+        if self._resource_model is not None:
+            with self._rm_lock:
+                try:
+                    self._resource_model.admit(self._reserved_flavors + flavors)
+                except NotEnoughResourcesAvailable as ex:
+                    LOG.warning("Batch of %d containers was blocked by resource model." % len(specs))
+                    LOG.info(ex.message)
+                    return self._fail_batch(results, "Not enough resources: %s" % ex.message)
+                self._reserved_flavors.extend(flavors)
+
+        created = {}
+        allocated = {}
+        pending = list(flavors)
+
+        def start(spec):
+            t_start = time.time()
+            name = spec.pop("name")
+            image = spec.pop("image", None)
+            command = spec.pop("command", None)
+            network = spec.pop("network", None)
+            flavor_name = spec.pop("flavor_name", "tiny")
+            image, network = self._compute_defaults(image, network, spec)
+            d = self._add_compute(name, image, command, flavor_name, spec)
+            created[name] = d
+            if self._resource_model is not None:
+                with self._rm_lock:
+                    self._reserved_flavors.remove(flavor_name)
+                    pending.remove(flavor_name)
+                    try:
+                        self._resource_model.allocate(d)
+                    except NotEnoughResourcesAvailable as ex:
+                        # not an Exception subclass, would be lost by the worker
+                        raise Exception("Not enough resources: %s" % ex.message)
+                    allocated[name] = d
+                    self._resource_model.write_allocation_log(d, self.resource_log_path)
+            with self._link_lock:
+                self._connect_compute(d, network)
+            return time.time() - t_start
+
+        try:
+            outcome = run_parallel(start, specs, max_workers=max_parallel)
+        finally:
+            # give back reservations of containers that were never allocated
+            if self._resource_model is not None:
+                with self._rm_lock:
+                    for fl in pending:
+                        self._reserved_flavors.remove(fl)
+
+        for r, (t, ex) in zip(results, outcome):
+            r["time"] = t or 0.0
+            if ex is not None:
+                r["error"] = str(ex) or ex.__class__.__name__
+        if any(r["error"] is not None for r in results):
+            LOG.warning("Starting batch in data center %r failed. Rolling back %d containers."
+                        % (str(self), len(created)))
+            self._rollback_batch(created, allocated)
+            return self._fail_batch(results, "Rolled back.")
+
+        for r in results:
+            r["container"] = created[r["name"]]
+            self.containers[r["name"]] = r["container"]
+            self.net.container_registry.commit(r["container"])
+        return results
+
+    def _fail_batch(self, results, reason):
+        """
+        Mark all results of a failed batch without their own error.
+        """
+        for r in results:
+            r["container"] = None
+            if r["error"] is None:
+                r["error"] = reason
+        return results
+
+    def _rollback_batch(self, created, allocated):
+        """
+        Remove all containers created by a failed startComputeBatch call.
+        """
+        for name, d in created.items():
+            try:
+                if name in allocated:
+                    with self._rm_lock:
+                        self._resource_model.free(d)
+                for link in self.net.linksBetween(d, self.switch):
+                    self.net.removeLink(link=link)
+                self.net.removeDocker(name)
+            except Exception:
+                LOG.exception("Rollback of container %r failed." % name)
 
     def stopCompute(self, name):
         """
@@ -286,6 +510,42 @@ class Datacenter(object):
         assert name is not None
         if name not in self.containers:
             raise Exception("Container with name %s not found." % name)
+        self._stop_compute(name)
+        return True
+
+    def stopComputeBatch(self, names, max_parallel=8):
+        """
+        Stop and remove many containers of this data center at once.
+        Links are detached one after the other, the resource model is
+        updated and the containers are removed in parallel. A failing
+        container does not stop the removal of the others.
+        :param names: list of container names
+        :param max_parallel: maximum number of containers removed at the same time
+        :return: list of dicts (name, error, time) in the order of names
+        """
+        results = [{"name": n, "error": None, "time": 0.0} for n in names]
+        todo = []
+        for r in results:
+            if r["name"] not in self.containers:
+                r["error"] = "Container with name %s not found." % r["name"]
+            else:
+                todo.append(r)
+        outcome = run_parallel(lambda r: self._stop_compute(r["name"]), todo,
+                               max_workers=max_parallel)
+        for r, (t, ex) in zip(todo, outcome):
+            r["time"] = t or 0.0
+            if ex is not None:
+                r["error"] = str(ex) or ex.__class__.__name__
+        return results
+
+    def _stop_compute(self, name):
+        """
+        Remove a single container (see stopCompute). Safe to be called
+        from several worker threads for different containers.
+        :return: time needed to remove the container
+        """
+        t_start = time.time()
+        d = self.containers[name]
         LOG.debug("Stopping compute instance %r in data center %r" % (name, str(self)))
 
         #  stop the monitored metrics
@@ -294,18 +554,21 @@ class Datacenter(object):
 
         # call resource model and free resources
         if self._resource_model is not None:
-            self._resource_model.free(self.containers[name])
-            self._resource_model.write_free_log(self.containers[name], self.resource_log_path)
+            with self._rm_lock:
+                self._resource_model.free(d)
+                self._resource_model.write_free_log(d, self.resource_log_path)
 
-        # remove links
-        self.net.removeLink(
-            link=None, node1=self.containers[name], node2=self.switch)
+        # remove links, the switch is shared by all containers of this data center
+        with self._link_lock:
+            for link in self.net.linksBetween(d, self.switch):
+                self.net.removeLink(link=link)
 
         # remove container
+        self.net.status_cache.invalidate(d)
         self.net.removeDocker("%s" % (name))
-        del self.containers[name]
-
-        return True
+        self.containers.pop(name, None)
+        self.net.container_registry.remove(name)
+        return time.time() - t_start
 
     def attachExternalSAP(self, sap_name, sap_net, **params):
         extSAP = EmulatorExtSAP(sap_name, sap_net, self, **params)
@@ -348,7 +611,8 @@ class Datacenter(object):
             "n_running_containers": len(self.containers),
             "metadata": self.metadata,
             "vnf_list" : container_list,
-            "ext SAP list" : ext_saplist
+            "ext SAP list" : ext_saplist,
+            "warm_pools": [pool.getStatus() for pool in self.warm_pools.itervalues()]
         }
 
     def assignResourceModel(self, rm):
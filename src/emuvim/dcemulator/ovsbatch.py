@@ -0,0 +1,175 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Batched programming of Open vSwitch instances through ovs-ofctl and ovs-vsctl.
+
+Instead of forking one ovs-ofctl process per flow entry and one ovs-vsctl
+process per port, the commands are collected and applied in one go:
+one ovs-ofctl add-flows/del-flows call per switch (reading the flows from
+stdin) and one chained ovs-vsctl transaction for all port settings.
+"""
+import logging
+from itertools import groupby
+from collections import OrderedDict
+from subprocess import Popen, PIPE
+
+from emuvim.dcemulator.workers import run_parallel
+
+LOG = logging.getLogger("dcemulator.ovsbatch")
+LOG.setLevel(logging.DEBUG)
+
+# batch command -> ovs-ofctl command reading flows from a file
+OFCTL_COMMANDS = {
+    'add': ['add-flows'],
+    'delete': ['del-flows'],
+    'delete_strict': ['--strict', 'del-flows']
+}
+
+# name the ovs-vsctl transaction is reported under by switch_counts() and the flush() callback
+VSCTL_TRANSACTION = 'ovs-vsctl'
+
+
+class OvsBatchError(Exception):
+    """
+    Commands of a batch failed, errors is the list of error messages of the failed calls.
+    """
+
+    def __init__(self, errors):
+        super(OvsBatchError, self).__init__("ovs batch failed: {0}".format(
+            "; ".join(str(e).strip() for e in errors)))
+        self.errors = errors
+
+
+class OvsCommandBatch(object):
+    """
+    Accumulates ovs-ofctl flow modifications per switch and ovs-vsctl commands.
+    Nothing is applied before flush() is called.
+    """
+
+    def __init__(self):
+        # switch name -> list of (cmd, protocols, flow)
+        self._flows = OrderedDict()
+        # list of ovs-vsctl argument lists, applied as one transaction
+        self._vsctl = []
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._flows.values()) + len(self._vsctl)
+
+    def add_flow(self, switch, flow, protocols=None):
+        """
+        Add a flow entry to a switch.
+        :param switch: switch name (string)
+        :param flow: flow in ovs-ofctl syntax, e.g. 'in_port=1,action=output:2'
+        :param protocols: OpenFlow version needed for this flow, e.g. 'OpenFlow13'
+        """
+        self._flows.setdefault(switch, []).append(('add', protocols, flow))
+
+    def del_flows(self, switch, flow, protocols=None, strict=False):
+        """
+        Delete the flow entries matching the flow from a switch.
+        :param strict: only delete the entry with exactly this match and priority
+        """
+        self._flows.setdefault(switch, []).append(('delete_strict' if strict else 'delete', protocols, flow))
+
+    def vsctl(self, *args):
+        """
+        Add a command to the ovs-vsctl transaction, e.g. vsctl('set', 'port', 'dc1.s1-eth2', 'tag=10').
+        """
+        self._vsctl.append([str(a) for a in args])
+
+    def switch_counts(self):
+        """
+        :return: dict switch name -> number of collected flow entries,
+                 VSCTL_TRANSACTION -> number of collected ovs-vsctl commands
+        """
+        counts = dict((switch, len(entries)) for switch, entries in self._flows.items())
+        if self._vsctl:
+            counts[VSCTL_TRANSACTION] = len(self._vsctl)
+        return counts
+
+    def flush(self, max_workers=1, callback=None):
+        """
+        Apply all collected commands and reset the batch.
+        Consecutive flow entries of the same kind on a switch are applied with a single
+        ovs-ofctl call, the order of adds and deletes per switch is kept.
+        :param max_workers: number of switches that are programmed concurrently
+        :param callback: called as callback(switch, errors) when the entries of a switch are applied,
+                         and as callback(VSCTL_TRANSACTION, errors) for the ovs-vsctl transaction
+        :return: list of error messages (empty on success)
+        """
+        errors = []
+        if self._vsctl:
+            args = ['ovs-vsctl']
+            for cmd in self._vsctl:
+                args += ['--'] + cmd
+            vsctl_errors = self._run(args)
+            if callback is not None:
+                callback(VSCTL_TRANSACTION, vsctl_errors)
+            errors += vsctl_errors
+
+        flows = self._flows
+        self._flows = OrderedDict()
+        self._vsctl = []
+
+        def flush_switch(switch):
+            switch_errors = self._flush_switch(switch, flows[switch])
+            if callback is not None:
+                callback(switch, switch_errors)
+            return switch_errors
+
+        if max_workers > 1 and len(flows) > 1:
+            for switch_errors, ex in run_parallel(flush_switch, flows.keys(), max_workers):
+                errors += [str(ex)] if ex is not None else switch_errors
+        else:
+            for switch in flows:
+                errors += flush_switch(switch)
+        return errors
+
+    def _flush_switch(self, switch, entries):
+        errors = []
+        for cmd, group in groupby(entries, key=lambda e: e[0]):
+            group = list(group)
+            args = ['ovs-ofctl']
+            # the flows of one call share the OpenFlow version, the newest requested one is used
+            protocols = sorted(set(p for c, p, f in group if p))
+            if protocols:
+                args += ['-O', protocols[-1]]
+            args += OFCTL_COMMANDS[cmd] + [switch, '-']
+            flows = '\n'.join(f for c, p, f in group) + '\n'
+            errors += self._run(args, flows)
+        LOG.debug("flushed {0} flow entries to switch {1}".format(len(entries), switch))
+        return errors
+
+    @staticmethod
+    def _run(args, stdin=None):
+        p = Popen(args, stdin=PIPE if stdin is not None else None, stdout=PIPE, stderr=PIPE)
+        out, err = p.communicate(stdin)
+        if p.returncode != 0:
+            LOG.error("{0} failed: {1}".format(' '.join(args), err))
+            return [err]
+        return []
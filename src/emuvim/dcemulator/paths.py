@@ -0,0 +1,221 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Path computation for the DCNetwork.
+
+Paths are computed on a switch-only view of the topology and cached
+per weight metric, so that chains between the same switches do not
+trigger a new shortest path computation.
+"""
+import logging
+import threading
+from collections import defaultdict
+
+import networkx as nx
+
+LOG = logging.getLogger("dcemulator.paths")
+LOG.setLevel(logging.DEBUG)
+
+# possible weight metrics allowed by TClink class
+WEIGHT_METRICS = ['bw', 'delay', 'jitter', 'loss']
+
+# upper bound of the paths of a multipath chain
+MAX_EQUAL_COST_PATHS = 16
+
+
+class PathService(object):
+    """
+    Computes and caches shortest paths between the switches of a DCNetwork.
+
+    The switch graph only contains switches and the links between them,
+    containers and SAPs are never part of a path. Cached paths are
+    invalidated selectively when links or switches are added or removed.
+    """
+
+    def __init__(self):
+        # switch-only view of the topology, links are stored in both directions
+        self.switch_graph = nx.MultiDiGraph()
+        # (weight, src, dst) -> (cost, path)
+        self._cache = {}
+        # (u, v) -> cache keys of paths using the hop u->v
+        self._hop_index = defaultdict(set)
+        # node name -> cache keys of paths visiting this node
+        self._node_index = defaultdict(set)
+        self._lock = threading.RLock()
+        # cache statistics
+        self.hits = 0
+        self.misses = 0
+
+    def add_switch(self, name):
+        """
+        Add a switch to the switch graph.
+        Cached paths through a former switch with the same name are dropped.
+        """
+        with self._lock:
+            self.switch_graph.add_node(name)
+            self._invalidate(set(self._node_index.get(name, ())))
+
+    def add_link(self, node1, node2, **params):
+        """
+        Add a bidirectional link between two switches.
+        :param params: link weights (bw, delay, jitter, loss), numeric values or strings
+        """
+        weights = {}
+        for attr in WEIGHT_METRICS:
+            if params.get(attr) is not None:
+                weights[attr] = float(params[attr])
+        with self._lock:
+            self.switch_graph.add_edge(node1, node2, **weights)
+            self.switch_graph.add_edge(node2, node1, **weights)
+            self._invalidate_shortcuts(node1, node2, weights)
+
+    def remove_link(self, node1, node2):
+        """
+        Remove one bidirectional link between two switches.
+        Only the cached paths using this link are dropped.
+        """
+        with self._lock:
+            for u, v in [(node1, node2), (node2, node1)]:
+                try:
+                    self.switch_graph.remove_edge(u, v)
+                except nx.NetworkXError:
+                    LOG.debug("%s, %s not found in switch graph." % (u, v))
+            self._invalidate(self._hop_index.get((node1, node2), set()) |
+                             self._hop_index.get((node2, node1), set()))
+
+    def shortest_path(self, src, dst, weight=None):
+        """
+        Get the shortest path between two switches.
+        :param src: name of the first switch
+        :param dst: name of the last switch
+        :param weight: link attribute used as weight (None = hop count)
+        :return: list of switch names
+        :raises networkx.NetworkXException: if there is no path
+        """
+        with self._lock:
+            for node in [src, dst]:
+                if node not in self.switch_graph:
+                    raise nx.NetworkXError("Switch %s not found in switch graph." % node)
+            if src == dst:
+                return [src]
+            key = (weight, src, dst)
+            entry = self._cache.get(key)
+            if entry is not None:
+                self.hits += 1
+                return list(entry[1])
+            self.misses += 1
+            cost, path = nx.bidirectional_dijkstra(self.switch_graph, src, dst, weight=weight)
+            self._store(key, cost, path)
+            # links are symmetric, so the reversed path is a shortest path as well
+            self._store((weight, dst, src), cost, list(reversed(path)))
+            return list(path)
+
+    def equal_cost_paths(self, src, dst, weight=None, max_paths=MAX_EQUAL_COST_PATHS):
+        """
+        Get the shortest paths between two switches that have the same cost (not cached).
+        Parallel links between two switches are not distinguished.
+        :param max_paths: maximum number of paths to return
+        :return: list of paths (lists of switch names)
+        :raises networkx.NetworkXException: if there is no path
+        """
+        with self._lock:
+            for node in [src, dst]:
+                if node not in self.switch_graph:
+                    raise nx.NetworkXError("Switch %s not found in switch graph." % node)
+            if src == dst:
+                return [[src]]
+            paths = []
+            for path in nx.all_shortest_paths(self.switch_graph, src, dst, weight=weight):
+                paths.append(path)
+                if len(paths) >= max_paths:
+                    break
+            return paths
+
+    def shortest_path_tree(self, root, weight=None):
+        """
+        Get the shortest paths from a switch to all switches it can reach (not cached).
+        The paths share their prefixes, so together they form a tree.
+        :return: dict switch -> path (list of switch names) from root
+        """
+        with self._lock:
+            if root not in self.switch_graph:
+                raise nx.NetworkXError("Switch %s not found in switch graph." % root)
+            return nx.single_source_dijkstra_path(self.switch_graph, root, weight=weight)
+
+    def clear(self):
+        """
+        Drop all cached paths.
+        """
+        with self._lock:
+            self._cache.clear()
+            self._hop_index.clear()
+            self._node_index.clear()
+
+    def _store(self, key, cost, path):
+        self._cache[key] = (cost, path)
+        for hop in zip(path[:-1], path[1:]):
+            self._hop_index[hop].add(key)
+        for node in path:
+            self._node_index[node].add(key)
+
+    def _invalidate(self, keys):
+        for key in list(keys):
+            entry = self._cache.pop(key, None)
+            if entry is None:
+                continue
+            path = entry[1]
+            for hop in zip(path[:-1], path[1:]):
+                self._hop_index[hop].discard(key)
+                if not self._hop_index[hop]:
+                    del self._hop_index[hop]
+            for node in path:
+                self._node_index[node].discard(key)
+                if not self._node_index[node]:
+                    del self._node_index[node]
+
+    def _invalidate_shortcuts(self, node1, node2, weights):
+        """
+        Drop the cached paths that become longer than a path using the new link node1<->node2.
+        """
+        for weight in set(key[0] for key in self._cache):
+            link_cost = weights.get(weight, 1) if weight is not None else 1
+            # links are symmetric, so the distance from a node equals the distance to it
+            dist1 = nx.single_source_dijkstra_path_length(self.switch_graph, node1, weight=weight)
+            dist2 = nx.single_source_dijkstra_path_length(self.switch_graph, node2, weight=weight)
+            stale = set()
+            for key, (cost, path) in self._cache.items():
+                if key[0] != weight:
+                    continue
+                src, dst = key[1], key[2]
+                for d_src, d_dst in [(dist1, dist2), (dist2, dist1)]:
+                    if src in d_src and dst in d_dst and d_src[src] + link_cost + d_dst[dst] < cost:
+                        stale.add(key)
+                        break
+            if stale:
+                LOG.debug("new link %s<->%s invalidates %d cached paths" % (node1, node2, len(stale)))
+            self._invalidate(stale)
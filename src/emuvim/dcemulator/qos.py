@@ -0,0 +1,274 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Rate limits on the switch ports of the DCNetwork using linux-htb QoS
+rows of Open vSwitch.
+
+All staged changes are applied in a single ovs-vsctl transaction. The
+QoS and Queue rows replaced or cleared by the transaction, and rows
+no port refers to anymore, are destroyed in the same transaction, so
+repeated bandwidth changes do not leave stale rows in the OVSDB. Only
+rows created by son-emu (tagged with external-ids:son-emu=1) are
+destroyed, rows of other tools on the host are left alone.
+"""
+import json
+import logging
+from collections import OrderedDict
+from subprocess import Popen, PIPE
+
+from emuvim.dcemulator.ovsbatch import OvsCommandBatch
+
+LOG = logging.getLogger("dcemulator.qos")
+LOG.setLevel(logging.DEBUG)
+
+# external id of the QoS and Queue rows created by son-emu
+EXTERNAL_ID = "son-emu"
+
+
+def _ovsdb_rows(doc):
+    """
+    Convert a table printed by 'ovs-vsctl --format=json list' to a list of dicts.
+    """
+    return [dict(zip(doc["headings"], row)) for row in doc["data"]]
+
+
+def _uuids(value):
+    """
+    Collect all uuids of an OVSDB json value (uuid, set or map).
+    """
+    if not isinstance(value, list):
+        return set()
+    if value[0] == "uuid":
+        return set([value[1]])
+    if value[0] in ("set", "map"):
+        found = set()
+        for v in value[1]:
+            for x in (v if value[0] == "map" else [v]):
+                found |= _uuids(x)
+        return found
+    return set()
+
+
+def _tagged(external_ids):
+    """
+    Check if an OVSDB external_ids map marks a row as created by son-emu.
+    """
+    if not isinstance(external_ids, list) or external_ids[0] != "map":
+        return False
+    return any(k == EXTERNAL_ID for k, v in external_ids[1])
+
+
+class QosManager(object):
+    """
+    Keeps the rate limits of switch ports and applies changes as one transaction.
+    Rates are given in bit/s.
+    """
+
+    def __init__(self, net=None):
+        """
+        :param net: DCNetwork used to find the ports of VNF interfaces and chains
+        """
+        self.net = net
+        # port name -> {"max_rate": , "min_rate": } of the applied settings
+        self._settings = dict()
+        # port name -> settings dict or None (clear), applied by apply()
+        self._staged = OrderedDict()
+
+    def set_port(self, port, max_rate, min_rate=None):
+        """
+        Limit the egress rate of a switch port.
+        :param port: switch port name, e.g. 'dc1.s1-eth2'
+        :param max_rate: maximum rate in bit/s
+        :param min_rate: guaranteed rate in bit/s (optional)
+        """
+        self._staged[port] = {"max_rate": int(max_rate),
+                              "min_rate": None if min_rate is None else int(min_rate)}
+        return self
+
+    def clear_port(self, port):
+        """
+        Remove the rate limit of a switch port.
+        """
+        self._staged[port] = None
+        return self
+
+    def vnf_port(self, vnf_name, vnf_interface=None):
+        """
+        Name of the switch port a VNF interface is connected to.
+        """
+        _, _, port = self.net.find_connected_switch(vnf_name, vnf_interface)
+        if port is None:
+            raise Exception("No switch port found for %s:%s" % (vnf_name, vnf_interface))
+        return port
+
+    def set_vnf(self, vnf_name, vnf_interface, max_rate, min_rate=None):
+        """
+        Limit the traffic sent to a VNF interface.
+        """
+        return self.set_port(self.vnf_port(vnf_name, vnf_interface), max_rate, min_rate)
+
+    def clear_vnf(self, vnf_name, vnf_interface=None):
+        return self.clear_port(self.vnf_port(vnf_name, vnf_interface))
+
+    def chain_ports(self, vnf_src_name, vnf_dst_name, vnf_src_interface=None, vnf_dst_interface=None):
+        """
+        Switch ports of both ends of a chain.
+        """
+        return [self.vnf_port(vnf_src_name, vnf_src_interface),
+                self.vnf_port(vnf_dst_name, vnf_dst_interface)]
+
+    def set_chain(self, vnf_src_name, vnf_dst_name, max_rate, vnf_src_interface=None, vnf_dst_interface=None,
+                  min_rate=None):
+        """
+        Limit the traffic of a chain in both directions, at the ports of the chain's end points.
+        :param max_rate: maximum rate in bit/s
+        :param min_rate: guaranteed rate in bit/s (optional)
+        """
+        for port in self.chain_ports(vnf_src_name, vnf_dst_name, vnf_src_interface, vnf_dst_interface):
+            self.set_port(port, max_rate, min_rate)
+        return self
+
+    def clear_chain(self, vnf_src_name, vnf_dst_name, vnf_src_interface=None, vnf_dst_interface=None):
+        for port in self.chain_ports(vnf_src_name, vnf_dst_name, vnf_src_interface, vnf_dst_interface):
+            self.clear_port(port)
+        return self
+
+    def settings(self):
+        """
+        :return: dict port name -> {"max_rate": , "min_rate": } of all limited ports
+        """
+        return dict((p, dict(s)) for p, s in self._settings.items())
+
+    def staged(self):
+        return list(self._staged.keys())
+
+    def commands(self, state=None):
+        """
+        Build the ovs-vsctl commands of the staged changes.
+        :param state: OVSDB state as returned by read_state(), used to destroy replaced rows
+        :return: list of ovs-vsctl argument lists
+        """
+        state = state or {"ports": {}, "qos": {}, "queues": set(), "own": set()}
+        tag = "external-ids:%s=1" % EXTERNAL_ID
+        cmds = []
+        for i, (port, s) in enumerate(self._staged.items()):
+            if s is None:
+                cmds.append(["clear", "port", port, "qos"])
+                continue
+            queue = ["other-config:max-rate=%d" % s["max_rate"]]
+            if s["min_rate"] is not None:
+                queue.append("other-config:min-rate=%d" % s["min_rate"])
+            cmds.append(["set", "port", port, "qos=@qos%d" % i])
+            cmds.append(["--id=@qos%d" % i, "create", "qos", "type=linux-htb",
+                         "other-config:max-rate=%d" % s["max_rate"], "queues:0=@queue%d" % i, tag])
+            cmds.append(["--id=@queue%d" % i, "create", "queue"] + queue + [tag])
+        # destroy the rows of son-emu no port will refer to after the transaction
+        kept_qos = set(q for p, q in state["ports"].items() if q is not None and p not in self._staged)
+        orphan_qos = (set(state["qos"].keys()) - kept_qos) & state["own"]
+        kept_queues = set()
+        for q in set(state["qos"].keys()) - orphan_qos:
+            kept_queues |= state["qos"][q]
+        orphan_queues = (state["queues"] - kept_queues) & state["own"]
+        for q in sorted(orphan_qos):
+            cmds.append(["destroy", "qos", q])
+        for q in sorted(orphan_queues):
+            cmds.append(["destroy", "queue", q])
+        return cmds
+
+    def apply(self):
+        """
+        Apply all staged changes in one ovs-vsctl transaction and collect the
+        QoS/Queue rows that are not used anymore.
+        If the transaction fails, nothing is applied and the changes stay staged, so apply can be retried.
+        :return: list of error messages (empty on success)
+        """
+        state = self.read_state()
+        if not self._staged and not self._has_garbage(state):
+            return []
+        batch = OvsCommandBatch()
+        for cmd in self.commands(state):
+            batch.vsctl(*cmd)
+        errors = batch.flush()
+        if errors:
+            LOG.warning("applying QoS changes of %d ports failed, they stay staged" % len(self._staged))
+            return errors
+        for port, s in self._staged.items():
+            if s is None:
+                self._settings.pop(port, None)
+            else:
+                self._settings[port] = s
+        LOG.debug("applied QoS changes of %d ports" % len(self._staged))
+        self._staged = OrderedDict()
+        return errors
+
+    def collect_garbage(self):
+        """
+        Destroy QoS/Queue rows that no port refers to.
+        """
+        return self.apply()
+
+    def _has_garbage(self, state):
+        used_qos = set(q for q in state["ports"].values() if q is not None)
+        orphan_qos = (set(state["qos"].keys()) - used_qos) & state["own"]
+        used_queues = set()
+        for q in set(state["qos"].keys()) - orphan_qos:
+            used_queues |= state["qos"][q]
+        return bool(orphan_qos or (state["queues"] - used_queues) & state["own"])
+
+    @staticmethod
+    def read_state():
+        """
+        Read ports, QoS and Queue rows from the OVSDB with a single ovs-vsctl call.
+        :return: dict with "ports" (port name -> qos uuid or None),
+            "qos" (qos uuid -> set of queue uuids), "queues" (set of queue uuids)
+            and "own" (uuids of the QoS and Queue rows created by son-emu)
+        """
+        args = ["ovs-vsctl", "--format=json",
+                "--", "--columns=name,qos", "list", "port",
+                "--", "--columns=_uuid,queues,external_ids", "list", "qos",
+                "--", "--columns=_uuid,external_ids", "list", "queue"]
+        p = Popen(args, stdout=PIPE, stderr=PIPE)
+        out, err = p.communicate()
+        if p.returncode != 0:
+            LOG.error("reading QoS state failed: %s" % err)
+            return {"ports": {}, "qos": {}, "queues": set(), "own": set()}
+        docs = [json.loads(l) for l in out.splitlines() if l.strip()]
+        ports, qos, queues = [_ovsdb_rows(d) for d in docs]
+        state = {"ports": {}, "qos": {}, "queues": set(), "own": set()}
+        for r in ports:
+            q = _uuids(r["qos"])
+            state["ports"][r["name"]] = q.pop() if q else None
+        for r in qos:
+            state["qos"][r["_uuid"][1]] = _uuids(r["queues"])
+            if _tagged(r["external_ids"]):
+                state["own"].add(r["_uuid"][1])
+        for r in queues:
+            state["queues"].add(r["_uuid"][1])
+            if _tagged(r["external_ids"]):
+                state["own"].add(r["_uuid"][1])
+        return state
@@ -0,0 +1,169 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Network wide index of the running compute instances (containers).
+
+Containers can be looked up by name, Docker id, short Docker id and
+data center without scanning all data centers.
+"""
+import logging
+import threading
+
+LOG = logging.getLogger("dcemulator.registry")
+LOG.setLevel(logging.DEBUG)
+
+# length of the short Docker ids shown by 'docker ps'
+SHORT_ID_LEN = 12
+
+
+class ContainerRegistry(object):
+    """
+    Index of all containers of a DCNetwork.
+
+    Names are reserved before the container is created and committed or
+    released afterwards, so concurrent starts cannot create duplicates.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # name -> container
+        self._by_name = dict()
+        # names of containers that are being created
+        self._reserved = set()
+        # docker id -> name
+        self._by_id = dict()
+        # short docker id -> name
+        self._by_short_id = dict()
+        # dc label -> {name -> container}
+        self._by_dc = dict()
+
+    def reserve(self, name):
+        """
+        Reserve a container name.
+        :return: True if reserved, False if the name is already taken
+        """
+        with self._lock:
+            if name in self._by_name or name in self._reserved:
+                return False
+            self._reserved.add(name)
+            return True
+
+    def release(self, name):
+        """
+        Drop a reservation that was not committed.
+        """
+        with self._lock:
+            self._reserved.discard(name)
+
+    def commit(self, container):
+        """
+        Register a created container under its (reserved) name.
+        """
+        with self._lock:
+            name = container.name
+            if name in self._by_name:
+                raise Exception("Container with name %s already exists." % name)
+            self._reserved.discard(name)
+            self._by_name[name] = container
+            did = self._docker_id(container)
+            if did is not None:
+                self._by_id[did] = name
+                self._by_short_id[did[:SHORT_ID_LEN]] = name
+            self._by_dc.setdefault(self._dc_label(container), dict())[name] = container
+
+    def remove(self, name):
+        """
+        Remove a container from the registry.
+        :return: removed container or None
+        """
+        with self._lock:
+            self._reserved.discard(name)
+            container = self._by_name.pop(name, None)
+            if container is None:
+                return None
+            did = self._docker_id(container)
+            if did is not None:
+                self._by_id.pop(did, None)
+                self._by_short_id.pop(did[:SHORT_ID_LEN], None)
+            label = self._dc_label(container)
+            dc_containers = self._by_dc.get(label, dict())
+            dc_containers.pop(name, None)
+            if not dc_containers:
+                self._by_dc.pop(label, None)
+            return container
+
+    def get(self, name):
+        """
+        Return the container with the given name or None.
+        """
+        return self._by_name.get(name)
+
+    def get_by_id(self, docker_id):
+        """
+        Return the container with the given (short) Docker id or None.
+        """
+        with self._lock:
+            name = self._by_id.get(docker_id) or self._by_short_id.get(docker_id)
+            return self._by_name.get(name) if name is not None else None
+
+    def lookup(self, key):
+        """
+        Find a container by name, Docker id or short Docker id.
+        """
+        return self.get(key) or self.get_by_id(key)
+
+    def list(self, dc_label=None):
+        """
+        List the containers of all data centers or of a single one.
+        """
+        with self._lock:
+            if dc_label is None:
+                return list(self._by_name.itervalues())
+            return list(self._by_dc.get(dc_label, dict()).itervalues())
+
+    def names(self):
+        with self._lock:
+            return list(self._by_name.iterkeys())
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def __len__(self):
+        return len(self._by_name)
+
+    @staticmethod
+    def _docker_id(container):
+        dcinfo = getattr(container, "dcinfo", None)
+        if not dcinfo:
+            return None
+        return dcinfo.get("Id")
+
+    @staticmethod
+    def _dc_label(container):
+        dc = getattr(container, "datacenter", None)
+        return None if dc is None else dc.label
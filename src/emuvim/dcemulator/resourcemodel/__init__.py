@@ -165,6 +165,17 @@ class BaseResourceModel(object):
         LOG.warning("Allocating in BaseResourceModel: %r with flavor: %r" % (d.name, d.flavor_name))
         self._allocated_compute_instances[d.name] = d.flavor_name
 
+    def admit(self, flavor_names):
+        """
+        Check if containers with the given flavors can be allocated
+        together, without allocating anything.
+        Raises NotEnoughResourcesAvailable if not.
+        Should be overwritten by resource models with limits.
+        :param flavor_names: list of flavor names
+        :return: True
+        """
+        return True
+
     def free(self, d):
         """
         This method has to be overwritten by a real resource model.
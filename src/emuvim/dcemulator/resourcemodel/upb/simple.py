@@ -84,6 +84,26 @@ class UpbSimpleCloudDcRM(BaseResourceModel):
             self._allocate_mem(d)
         self._apply_limits()
 
+    def admit(self, flavor_names):
+        """
+        Check if containers with the given flavors fit into the
+        remaining resources of this data center.
+        :param flavor_names: list of flavor names
+        :return: True
+        """
+        for fl_name in flavor_names:
+            if fl_name not in self._flavors:
+                raise Exception("Flavor %r does not exist" % fl_name)
+        if not self.deactivate_cpu_limit and self.raise_no_cpu_resources_left:
+            fl_cu = sum(self._flavors[n].get("compute") for n in flavor_names)
+            if self.dc_alloc_cu + fl_cu > self.dc_max_cu:
+                raise NotEnoughResourcesAvailable("Not enough compute resources left.")
+        if not self.deactivate_mem_limit and self.raise_no_mem_resources_left:
+            fl_mu = sum(self._flavors[n].get("memory") for n in flavor_names)
+            if self.dc_alloc_mu + fl_mu > self.dc_max_mu:
+                raise NotEnoughResourcesAvailable("Not enough memory resources left.")
+        return True
+
     def _allocate_cpu(self, d):
         """
         Actually allocate (bookkeeping)
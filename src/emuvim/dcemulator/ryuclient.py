@@ -0,0 +1,164 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Client for the REST API of the Ryu controller of the DCNetwork.
+
+All threads of a client share one bounded pool of keep-alive connections,
+each thread uses its own requests.Session on top of it. Calls have a timeout
+and are retried with exponential backoff when the controller can not be
+reached. POSTs are not retried after a read timeout, as the controller may
+already have applied them. Responses are decoded once, callers get dicts/lists instead of text.
+"""
+import logging
+import threading
+import time
+import json
+from collections import namedtuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+LOG = logging.getLogger("dcemulator.ryuclient")
+LOG.setLevel(logging.DEBUG)
+
+DEFAULT_TIMEOUT = 5.0
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.2
+
+# status_code: HTTP status (None if the controller was not reachable)
+# data: decoded JSON body (None if the body is no JSON)
+# text: raw body
+RyuResponse = namedtuple('RyuResponse', ['status_code', 'data', 'text'])
+
+
+class RyuClient(object):
+    """
+    Thread-safe client for the Ryu REST API (ofctl_rest and the son-emu endpoints).
+    Use separate clients for independent callers (e.g. flow programming and monitoring),
+    so they do not wait for each other's connections.
+    """
+
+    def __init__(self, base_url, pool_size=8, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 backoff=DEFAULT_BACKOFF, name='ryu'):
+        """
+        :param base_url: url of the Ryu REST API, e.g. 'http://localhost:8080'
+        :param pool_size: max. number of connections, further calls wait for a free connection
+        :param timeout: default timeout per call in seconds
+        :param retries: default number of retries if the controller can not be reached
+        :param backoff: first retry delay in seconds, doubled on each retry
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.name = name
+        self.pool_size = pool_size
+        # the adapter (and its connection pool) is shared by the sessions of all threads
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+            self._local.session = session
+        return session
+
+    def url(self, prefix, dpid=None):
+        url = '{0}/{1}'.format(self.base_url, str(prefix).strip('/'))
+        if dpid is not None:
+            url += '/{0}'.format(dpid)
+        return url
+
+    def request(self, prefix, dpid=None, data=None, timeout=None, retries=None):
+        """
+        Call the REST API: POST if data is given, GET otherwise.
+        :param prefix: API path, e.g. 'stats/flowentry/add'
+        :param dpid: optional datapath id appended to the path
+        :param data: JSON serializable request body
+        :param timeout: timeout in seconds (default of the client if None)
+        :param retries: number of retries if the controller can not be reached (default of the client if None),
+                        POSTs are not retried if the reply timed out
+        :return: RyuResponse
+        """
+        url = self.url(prefix, dpid)
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+
+        attempt = 0
+        while True:
+            try:
+                if data is not None:
+                    resp = self._session().post(url, json=data, timeout=timeout)
+                else:
+                    resp = self._session().get(url, timeout=timeout)
+                break
+            except (requests.ConnectionError, requests.Timeout) as ex:
+                if data is not None and not isinstance(ex, (requests.ConnectionError, requests.ConnectTimeout)):
+                    # the request was sent, the controller may already have applied it: do not send it twice
+                    LOG.error('{0}: {1} timed out waiting for the reply, not retried: {2}'.format(self.name, url, ex))
+                    return RyuResponse(None, None, str(ex))
+                if attempt >= retries:
+                    LOG.error('{0}: {1} failed after {2} attempts: {3}'.format(self.name, url, attempt + 1, ex))
+                    return RyuResponse(None, None, str(ex))
+                delay = self.backoff * (2 ** attempt)
+                LOG.warning('{0}: {1} failed ({2}), retry in {3:.2f}s'.format(self.name, url, ex, delay))
+                time.sleep(delay)
+                attempt += 1
+
+        text = resp.text
+        try:
+            # ofctl_rest does not always set a json content type
+            body = json.loads(text) if text.strip() else None
+        except ValueError:
+            body = None
+
+        if resp.status_code != requests.codes.ok:
+            LOG.info('{0}: url: {1} status: {2} reason: {3} text: {4}'.format(
+                self.name, url, resp.status_code, resp.reason, text))
+            if data is not None:
+                LOG.info('POST: {0}'.format(str(data)))
+
+        return RyuResponse(resp.status_code, body, text)
+
+    def get(self, prefix, dpid=None, **kwargs):
+        """
+        :return: the decoded JSON body, None if the call failed
+        """
+        return self.request(prefix, dpid=dpid, **kwargs).data
+
+    def post(self, prefix, data, dpid=None, **kwargs):
+        """
+        :return: the decoded JSON body, None if the call failed or returned no JSON
+        """
+        return self.request(prefix, dpid=dpid, data=data, **kwargs).data
+
+    def close(self):
+        self._adapter.close()
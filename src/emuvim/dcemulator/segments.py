@@ -0,0 +1,137 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Allocation of the segment ids (VLAN tags or MPLS labels) that isolate
+the chains, E-LANs and load balancers of the DCNetwork.
+
+Ids are handed back to the allocator when the chain, E-LAN or load balancer
+using them is torn down, so a long running emulator does not run out of tags.
+"""
+import heapq
+import logging
+import threading
+
+LOG = logging.getLogger("dcemulator.segments")
+LOG.setLevel(logging.DEBUG)
+
+# usable id ranges per encapsulation mode
+# vlan: 0 and 4095 are reserved by 802.1Q
+# mpls: 0-15 are reserved labels, the highest label bit marks ARP traffic (see DCNetwork)
+SEGMENT_RANGES = {
+    'vlan': (1, 4094),
+    'mpls': (16, 0x7FFFF),
+    # openflow group ids of the multipath chains, up to OFPG_MAX
+    'group': (1, 0xFFFFFF00),
+}
+
+# label bit set on the mpls label of the ARP frames of a chain
+MPLS_ARP_FLAG = 0x80000
+
+
+class SegmentsExhausted(Exception):
+    pass
+
+
+class SegmentAllocator(object):
+    """
+    Hands out the lowest free segment id of a mode.
+    Freed ids are kept in a heap and reused before new ids are taken.
+    """
+
+    def __init__(self, mode='vlan'):
+        if mode not in SEGMENT_RANGES:
+            raise ValueError("unknown segment mode: {0}".format(mode))
+        self.mode = mode
+        self.min_id, self.max_id = SEGMENT_RANGES[mode]
+        # ids below _next that have been freed again
+        self._freed = []
+        self._next = self.min_id
+        self.allocated = set()
+        self._lock = threading.Lock()
+
+    def allocate(self):
+        """
+        :return: the lowest free segment id
+        """
+        with self._lock:
+            while self._freed:
+                segment = heapq.heappop(self._freed)
+                # may have been reserved after it was freed
+                if segment not in self.allocated:
+                    self.allocated.add(segment)
+                    return segment
+            while self._next <= self.max_id:
+                segment = self._next
+                self._next += 1
+                if segment not in self.allocated:
+                    self.allocated.add(segment)
+                    return segment
+        raise SegmentsExhausted("no free {0} segment left ({1} in use)".format(self.mode, len(self.allocated)))
+
+    def reserve(self, segment):
+        """
+        Mark a given segment id as used, e.g. a tag that was passed in by the user.
+        :return: False if the id was already allocated
+        """
+        segment = int(segment)
+        if not self.min_id <= segment <= self.max_id:
+            raise ValueError("{0} segment {1} out of range [{2}, {3}]".format(
+                self.mode, segment, self.min_id, self.max_id))
+        with self._lock:
+            if segment in self.allocated:
+                return False
+            self.allocated.add(segment)
+            return True
+
+    def free(self, segment):
+        """
+        Return a segment id to the pool.
+        :return: False if the id was not allocated
+        """
+        with self._lock:
+            if segment not in self.allocated:
+                return False
+            self.allocated.remove(segment)
+            if segment < self._next:
+                heapq.heappush(self._freed, segment)
+            LOG.debug("freed {0} segment {1}".format(self.mode, segment))
+            return True
+
+    def __contains__(self, segment):
+        return segment in self.allocated
+
+    def usage(self):
+        """
+        :return: dict with the number of allocated and free ids of this allocator
+        """
+        capacity = self.max_id - self.min_id + 1
+        allocated = len(self.allocated)
+        return {'mode': self.mode,
+                'allocated': allocated,
+                'free': capacity - allocated,
+                'capacity': capacity}
@@ -0,0 +1,299 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Snapshots of the state of a DCNetwork: data centers, switches and the
+links between them, containers, chains, E-LANs and their segment ids.
+
+A snapshot is a JSON serializable dict. Restoring it into a network only
+changes what differs: missing switches and links are added, containers
+with another image, flavor or network configuration are replaced, and
+only the chains and E-LANs of changed containers are set up again.
+Flow entries are not copied one by one, chains and E-LANs are installed
+again, as the switch ports of replaced containers change.
+"""
+import json
+import logging
+from collections import defaultdict
+
+LOG = logging.getLogger("dcemulator.snapshot")
+LOG.setLevel(logging.DEBUG)
+
+SNAPSHOT_VERSION = 1
+
+# chain arguments that are not part of a chain's configuration
+CHAIN_ENDPOINTS = ('vnf_src_name', 'vnf_src_interface', 'vnf_dst_name', 'vnf_dst_interface')
+
+
+def _infrastructure_links(net):
+    """
+    Links between switches and data centers as (node1, node2, params), data centers by label.
+    """
+    dc_switches = dict((dc.switch.name, dc.label) for dc in net.dcs.itervalues())
+    switches = set(net.topology.nodes(type='switch'))
+    links = []
+    for link in net.topology.export()['links']:
+        if link['src'] not in switches or link['dst'] not in switches:
+            continue
+        params = {}
+        for m in ('bw', 'loss'):
+            if m in link:
+                params[m] = link[m]
+        for m in ('delay', 'jitter'):
+            if m in link:
+                params[m] = "{0}ms".format(link[m])
+        node1, node2 = sorted([dc_switches.get(link['src'], link['src']),
+                               dc_switches.get(link['dst'], link['dst'])])
+        links.append({'node1': node1, 'node2': node2, 'params': params})
+    return sorted(links, key=lambda l: (l['node1'], l['node2']))
+
+
+def container_spec(net, d):
+    """
+    Arguments of startCompute that create a container like d.
+    """
+    network = []
+    for port_id, port_name in net.node_intfs.get(d.name, []):
+        nw = {}
+        if isinstance(port_id, basestring):
+            nw['id'] = port_id
+        intf = d.intf(port_name)
+        if intf.IP() is not None:
+            nw['ip'] = "{0}/{1}".format(intf.IP(), intf.prefixLen)
+        network.append(nw)
+    return {'name': d.name,
+            'datacenter': d.datacenter.label,
+            'image': d.dimage,
+            'command': d.command,
+            'flavor_name': d.flavor_name,
+            'network': network}
+
+
+def _elans(net):
+    """
+    E-LANs (vlan, members, proactive) of the network, found by the vlan tags of their interfaces.
+    """
+    members = defaultdict(list)
+    for id, tag in net.vlan_dict.items():
+        if tag in net.elan_vlans:
+            name, intf = id.split(':', 1)
+            members[tag].append({'name': name, 'interface': intf})
+    return [{'vlan': tag,
+             'members': sorted(m, key=lambda v: (v['name'], v['interface'])),
+             'proactive': tag in net.proactive_elans}
+            for tag, m in sorted(members.items())]
+
+
+def capture(net):
+    """
+    Take a snapshot of a DCNetwork.
+    Resource models are not part of the snapshot, they are assigned to the data centers
+    before restoring it. The resource allocations follow from the flavors of the containers.
+    :return: JSON serializable dict
+    """
+    dc_switches = set(dc.switch.name for dc in net.dcs.itervalues())
+    switches = []
+    for name in sorted(net.topology.nodes(type='switch')):
+        if name not in dc_switches:
+            switches.append({'name': name, 'dpid': net.getNodeByName(name).dpid})
+    chains = []
+    for chain_id, spec in net.installed_chains.items():
+        chains.append(dict(spec, segment=net.chain_segments.get(chain_id)))
+    return {'version': SNAPSHOT_VERSION,
+            'encapsulation': net.segments.mode,
+            'datacenters': [{'label': dc.label,
+                             'metadata': dc.metadata,
+                             'resource_model': (None if dc._resource_model is None
+                                                else dc._resource_model.__class__.__name__)}
+                            for dc in sorted(net.dcs.itervalues(), key=lambda dc: dc.label)],
+            'switches': switches,
+            'links': _infrastructure_links(net),
+            'containers': sorted([container_spec(net, d) for d in net.getAllContainers()],
+                                 key=lambda c: c['name']),
+            'chains': chains,
+            'elans': _elans(net)}
+
+
+def save(snapshot, path):
+    with open(path, 'w') as f:
+        json.dump(snapshot, f, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path) as f:
+        snapshot = json.load(f)
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        raise ValueError("Unsupported snapshot version: {0}".format(snapshot.get('version')))
+    return snapshot
+
+
+def _chain_key(spec):
+    return tuple(spec.get(k) for k in CHAIN_ENDPOINTS)
+
+
+def _chain_config(spec):
+    return dict((k, v) for k, v in spec.items() if k != 'segment')
+
+
+def diff(current, wanted):
+    """
+    Compare two snapshots.
+    Containers are replaced if their configuration differs, chains and E-LANs are set up
+    again if their configuration differs or one of their containers is replaced.
+    :return: dict with the names of the containers to 'stop', the container specs to 'start',
+             and the chains and E-LANs to remove ('remove_chains', 'remove_elans') and to
+             add ('add_chains', 'add_elans')
+    """
+    have = dict((c['name'], c) for c in current['containers'])
+    want = dict((c['name'], c) for c in wanted['containers'])
+    stop = set(name for name, c in have.items() if want.get(name) != c)
+    start = [c for name, c in sorted(want.items()) if name not in have or name in stop]
+
+    have_chains = dict((_chain_key(c), c) for c in current['chains'])
+    want_chains = dict((_chain_key(c), c) for c in wanted['chains'])
+    remove_chains = []
+    for key, c in have_chains.items():
+        if key in want_chains and _chain_config(want_chains[key]) == _chain_config(c) and \
+                c['vnf_src_name'] not in stop and c['vnf_dst_name'] not in stop:
+            continue
+        remove_chains.append(c)
+    removed = set(_chain_key(c) for c in remove_chains)
+    add_chains = [c for c in wanted['chains']
+                  if _chain_key(c) not in have_chains or _chain_key(c) in removed]
+
+    have_elans = dict((e['vlan'], e) for e in current['elans'])
+    want_elans = dict((e['vlan'], e) for e in wanted['elans'])
+    remove_elans = [e for vlan, e in sorted(have_elans.items())
+                    if want_elans.get(vlan) != e or any(m['name'] in stop for m in e['members'])]
+    removed = set(e['vlan'] for e in remove_elans)
+    add_elans = [e for vlan, e in sorted(want_elans.items()) if vlan not in have_elans or vlan in removed]
+
+    return {'stop': sorted(stop),
+            'start': start,
+            'remove_chains': sorted(remove_chains, key=_chain_key),
+            'add_chains': add_chains,
+            'remove_elans': remove_elans,
+            'add_elans': add_elans}
+
+
+def _restore_infrastructure(net, snapshot, report):
+    """
+    Add the data centers, switches and links of a snapshot that are missing in the network.
+    The network must not be started yet if anything is added.
+    """
+    for dc in snapshot['datacenters']:
+        if dc['label'] not in net.dcs:
+            net.addDatacenter(dc['label'], metadata=dc.get('metadata') or {})
+            report['datacenters'].append(dc['label'])
+    for sw in snapshot['switches']:
+        if sw['name'] not in net.topology:
+            net.addSwitch(sw['name'], dpid=sw['dpid'])
+            report['switches'].append(sw['name'])
+
+    def node(name):
+        if name in net.dcs:
+            return net.dcs[name]
+        return net.getNodeByName(name)
+
+    existing = defaultdict(int)
+    for link in _infrastructure_links(net):
+        existing[(link['node1'], link['node2'])] += 1
+    for link in snapshot['links']:
+        key = (link['node1'], link['node2'])
+        if existing[key] > 0:
+            existing[key] -= 1
+            continue
+        net.addLink(node(link['node1']), node(link['node2']), **link['params'])
+        report['links'].append(key)
+
+
+def restore(net, snapshot, max_workers=8):
+    """
+    Bring a DCNetwork into the state of a snapshot, changing only what differs.
+    :param snapshot: dict returned by capture or load
+    :param max_workers: number of containers (and switches) handled concurrently
+    :return: report dict with the added infrastructure, the stopped and started containers,
+             the numbers of removed and added chains and E-LANs, and a list of 'errors'
+    """
+    report = {'datacenters': [], 'switches': [], 'links': [], 'stopped': [], 'started': [],
+              'chains_removed': 0, 'chains_added': 0, 'elans_removed': 0, 'elans_added': 0,
+              'errors': []}
+    _restore_infrastructure(net, snapshot, report)
+    changes = diff(capture(net), snapshot)
+
+    # tear down what changed while the containers are still connected
+    if changes['remove_chains']:
+        chains = [dict(_chain_config(c), cmd='del-flows') for c in changes['remove_chains']]
+        for res in net.setChains(chains, max_workers=max_workers):
+            if res['error'] is not None:
+                report['errors'].append("removing chain {0}: {1}".format(_chain_key(res), res['error']))
+        report['chains_removed'] = len(chains)
+    for elan in changes['remove_elans']:
+        net.setLAN(elan['members'], vlan=elan['vlan'], action='delete')
+        report['elans_removed'] += 1
+
+    for res in net.stopComputes(changes['stop'], max_workers=max_workers):
+        if res['error'] is not None:
+            report['errors'].append("stopping {0}: {1}".format(res['name'], res['error']))
+        else:
+            report['stopped'].append(res['name'])
+
+    # start the missing containers, one batch per data center
+    per_dc = defaultdict(list)
+    for c in changes['start']:
+        spec = dict(c)
+        per_dc[spec.pop('datacenter')].append(spec)
+    for label, specs in sorted(per_dc.items()):
+        if label not in net.dcs:
+            report['errors'].append("data center {0} not found".format(label))
+            continue
+        for res in net.dcs[label].startComputeBatch(specs, max_parallel=max_workers):
+            if res['error'] is not None:
+                report['errors'].append("starting {0}: {1}".format(res['name'], res['error']))
+            else:
+                report['started'].append(res['name'])
+
+    for elan in changes['add_elans']:
+        net.setLAN(elan['members'], vlan=elan['vlan'], proactive=elan['proactive'])
+        report['elans_added'] += 1
+    if changes['add_chains']:
+        chains = [dict(_chain_config(c), cmd='add-flow') for c in changes['add_chains']]
+        # keep the segment ids of the snapshot if they are free, chains reuse the segment assigned to them
+        for c in changes['add_chains']:
+            if c.get('segment') is not None and _chain_key(c) not in net.chain_segments and \
+                    net.segments.reserve(c['segment']):
+                net._assign_chain_segment(_chain_key(c), c['segment'])
+        for res in net.setChains(chains, max_workers=max_workers):
+            if res['error'] is not None:
+                report['errors'].append("adding chain {0}: {1}".format(_chain_key(res), res['error']))
+                if _chain_key(res) not in net.installed_chains and _chain_key(res) in net.chain_segments:
+                    net._release_segment(net._pop_chain_segment(_chain_key(res)))
+        report['chains_added'] = len(chains)
+
+    LOG.info("Restored snapshot: stopped {0}, started {1} containers, {2} chains, {3} errors".format(
+        len(report['stopped']), len(report['started']), report['chains_added'], len(report['errors'])))
+    return report
@@ -13,25 +13,338 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
+import os
+import time
+from collections import OrderedDict
+
+from ryu.app.wsgi import ControllerBase, WSGIApplication, route
 from ryu.base import app_manager
+from ryu.controller import dpset
 from ryu.controller import ofp_event
 from ryu.controller.handler import CONFIG_DISPATCHER, MAIN_DISPATCHER
 from ryu.controller.handler import set_ev_cls
+from ryu.lib import hub
+from ryu.lib import ofctl_v1_3
 from ryu.ofproto import ofproto_v1_3
 from ryu.lib.packet import packet
 from ryu.lib.packet import ethernet
 from ryu.lib.packet import ether_types
 from ryu.topology.event import EventSwitchEnter, EventSwitchLeave, EventSwitchReconnected
+from webob import Response
+
+# the learning switch behavior can be turned off, only the son-emu REST api of this app is used then
+LEARNING_SWITCH = os.environ.get('SON_EMU_LEARNING_SWITCH', '1') not in ['0', 'false', 'False']
+
+# high-rate mode of the learning switch: table-miss packets are forwarded by the NORMAL action and a copy
+# is sent to the controller through a meter, learned flows expire when idle and the MAC tables are bounded
+# and aging
+HIGH_RATE = os.environ.get('SON_EMU_HIGH_RATE', '0') not in ['0', 'false', 'False']
+# max. packet-ins per second and switch in high-rate mode (0: no meter)
+PACKET_IN_RATE = int(os.environ.get('SON_EMU_PACKET_IN_RATE', 1000))
+# idle timeout of the learned flows in high-rate mode (seconds)
+LEARNED_IDLE_TIMEOUT = int(os.environ.get('SON_EMU_LEARNED_IDLE_TIMEOUT', 60))
+# max. number of MACs per switch and time after which a MAC is forgotten (seconds) in high-rate mode
+MAC_TABLE_SIZE = int(os.environ.get('SON_EMU_MAC_TABLE_SIZE', 4096))
+MAC_AGING_TIME = int(os.environ.get('SON_EMU_MAC_AGING_TIME', 300))
+
+# meter of the packet-in copies in high-rate mode
+PACKET_IN_METER_ID = 1
+# table in which the table-miss packets are copied to the controller in high-rate mode
+# (table 1 holds the E-LAN entries, see elan.py)
+PACKET_IN_TABLE = 200
+# interval of the packet-in and flow-mod rate calculation (seconds)
+STATS_INTERVAL = 1.0
+
+# max. time to wait for the barrier replies of a bulk request (seconds)
+BARRIER_TIMEOUT = 10
+
+son_emu_instance_name = 'son_emu_api_app'
+
+
+def _to_int(value):
+    if isinstance(value, basestring):
+        return int(value, 0)
+    return int(value)
+
+
+class MacTable(object):
+    """
+    MAC -> port table of a switch with a max. size and aging.
+    The least recently seen MAC is dropped when the table is full.
+    """
+
+    def __init__(self, size=MAC_TABLE_SIZE, aging_time=MAC_AGING_TIME):
+        self.size = size
+        self.aging_time = aging_time
+        # mac -> (port, last seen), ordered by last seen
+        self._macs = OrderedDict()
+        self.evicted = 0
+
+    def learn(self, mac, port, now=None):
+        now = time.time() if now is None else now
+        self._macs.pop(mac, None)
+        self._macs[mac] = (port, now)
+        while len(self._macs) > self.size:
+            self._macs.popitem(last=False)
+            self.evicted += 1
+        self.expire(now)
+
+    def lookup(self, mac, now=None):
+        entry = self._macs.get(mac)
+        if entry is None:
+            return None
+        now = time.time() if now is None else now
+        if now - entry[1] > self.aging_time:
+            del self._macs[mac]
+            return None
+        return entry[0]
+
+    def expire(self, now=None):
+        now = time.time() if now is None else now
+        while self._macs:
+            mac, (port, seen) = next(iter(self._macs.items()))
+            if now - seen <= self.aging_time:
+                break
+            del self._macs[mac]
+
+    def __len__(self):
+        return len(self._macs)
+
+
+class SonEmuController(ControllerBase):
+    """
+    REST api of the son-emu Ryu app.
+
+    POST /son-emu/flowentry/bulk
+    takes a list of flow (and group) entries in the format of Ryu's ofctl_rest,
+    extended by a 'cmd' field:
+        add, modify, modify_strict, delete, delete_strict (flow entries)
+        group_add, group_modify, group_delete (group entries)
+    The entries may belong to different datapaths, the order per datapath is kept.
+
+    GET /son-emu/stats
+    returns the controller counters: packet-ins and flow-mods (totals and per second)
+    and the sizes of the MAC tables.
+    """
+
+    def __init__(self, req, link, data, **config):
+        super(SonEmuController, self).__init__(req, link, data, **config)
+        self.son_emu_app = data[son_emu_instance_name]
+
+    @route('son-emu', '/son-emu/flowentry/bulk', methods=['POST'])
+    def bulk_mod(self, req, **kwargs):
+        try:
+            entries = json.loads(req.body) if req.body else []
+        except ValueError:
+            return Response(status=400, body='invalid json')
+        if not isinstance(entries, list):
+            return Response(status=400, body='expected a list of flow entries')
+
+        result = self.son_emu_app.bulk_mod(entries)
+        status = 200
+        if result['errors'] or result['timeouts']:
+            status = 500
+        return Response(status=status, content_type='application/json', body=json.dumps(result))
+
+    @route('son-emu', '/son-emu/stats', methods=['GET'])
+    def stats(self, req, **kwargs):
+        return Response(status=200, content_type='application/json', body=json.dumps(self.son_emu_app.stats()))
+
 
 class SimpleSwitch13(app_manager.RyuApp):
     OFP_VERSIONS = [ofproto_v1_3.OFP_VERSION]
+    _CONTEXTS = {
+        'dpset': dpset.DPSet,
+        'wsgi': WSGIApplication
+    }
 
     def __init__(self, *args, **kwargs):
         super(SimpleSwitch13, self).__init__(*args, **kwargs)
+        # dpid -> mac -> port (dpid -> MacTable in high-rate mode)
         self.mac_to_port = {}
+        self.dpset = kwargs['dpset']
+        wsgi = kwargs['wsgi']
+        wsgi.register(SonEmuController, {son_emu_instance_name: self})
+        # (dpid, xid) -> (index of the entry, error list of its bulk request)
+        self.pending_mods = {}
+        # (dpid, xid) -> event set when the barrier reply arrives
+        self.barrier_waiters = {}
+        # (dpid, xid) of the meter mods of the packet-in meters
+        self.meter_mods = set()
+        # controller counters, the rates are updated every STATS_INTERVAL
+        self.counters = {'packet_in': 0, 'flow_mod': 0}
+        self.rates = {'packet_in': 0.0, 'flow_mod': 0.0}
+        self._stats_thread = hub.spawn(self._stats_loop)
+
+    def _stats_loop(self):
+        last = dict(self.counters)
+        while True:
+            hub.sleep(STATS_INTERVAL)
+            for name, value in self.counters.items():
+                self.rates[name] = (value - last[name]) / STATS_INTERVAL
+                last[name] = value
+
+    def stats(self):
+        """
+        :return: dict with the controller counters and rates
+        """
+        return {'packet_in': self.counters['packet_in'],
+                'flow_mod': self.counters['flow_mod'],
+                'packet_in_per_s': self.rates['packet_in'],
+                'flow_mod_per_s': self.rates['flow_mod'],
+                'high_rate': HIGH_RATE,
+                'mac_tables': dict((str(dpid), len(macs)) for dpid, macs in self.mac_to_port.items())}
+
+    def bulk_mod(self, entries):
+        """
+        Apply a list of flow/group entries as one batch.
+        All entries are sent to their datapaths first, followed by one barrier per datapath.
+        :return: aggregated result dict
+        """
+        result = {'flows': 0, 'groups': 0, 'datapaths': 0, 'errors': [], 'timeouts': []}
+        errors = result['errors']
+
+        # keep the order of the entries per datapath
+        dp_entries = OrderedDict()
+        for index, entry in enumerate(entries):
+            dp_entries.setdefault(_to_int(entry.get('dpid', 0)), []).append((index, entry))
+
+        barriers = []
+        for dpid, indexed_entries in dp_entries.items():
+            dp = self.dpset.get(dpid)
+            if dp is None:
+                for index, entry in indexed_entries:
+                    errors.append({'index': index, 'dpid': dpid, 'error': 'datapath not found'})
+                continue
+
+            xids = []
+            for index, entry in indexed_entries:
+                cmd = entry.get('cmd', 'add')
+                try:
+                    if cmd.startswith('group_'):
+                        mod = self._to_group_mod(dp, entry, cmd)
+                        result['groups'] += 1
+                    else:
+                        mod = self._to_flow_mod(dp, entry, cmd)
+                        result['flows'] += 1
+                except Exception as ex:
+                    errors.append({'index': index, 'dpid': dpid, 'error': str(ex)})
+                    continue
+                dp.set_xid(mod)
+                self.pending_mods[(dpid, mod.xid)] = (index, errors)
+                xids.append(mod.xid)
+                dp.send_msg(mod)
+                self.counters['flow_mod'] += 1
+
+            # all errors of the previous messages are received before the barrier reply
+            barrier = dp.ofproto_parser.OFPBarrierRequest(dp)
+            dp.set_xid(barrier)
+            waiter = hub.Event()
+            self.barrier_waiters[(dpid, barrier.xid)] = waiter
+            dp.send_msg(barrier)
+            barriers.append((dpid, barrier.xid, waiter, xids))
+            result['datapaths'] += 1
+
+        for dpid, barrier_xid, waiter, xids in barriers:
+            if not waiter.wait(timeout=BARRIER_TIMEOUT):
+                result['timeouts'].append(dpid)
+            self.barrier_waiters.pop((dpid, barrier_xid), None)
+            for xid in xids:
+                self.pending_mods.pop((dpid, xid), None)
+
+        self.logger.debug('bulk request: %s flows, %s groups on %s datapaths, %s errors',
+                          result['flows'], result['groups'], result['datapaths'], len(errors))
+        return result
+
+    def _to_flow_mod(self, dp, flow, cmd):
+        ofproto = dp.ofproto
+        parser = dp.ofproto_parser
+        commands = {
+            'add': ofproto.OFPFC_ADD,
+            'modify': ofproto.OFPFC_MODIFY,
+            'modify_strict': ofproto.OFPFC_MODIFY_STRICT,
+            'delete': ofproto.OFPFC_DELETE,
+            'delete_strict': ofproto.OFPFC_DELETE_STRICT
+        }
+        if cmd not in commands:
+            raise ValueError('unknown flow command: {0}'.format(cmd))
+        match = ofctl_v1_3.to_match(dp, flow.get('match', {}))
+        inst = ofctl_v1_3.to_actions(dp, flow.get('actions', []))
+        return parser.OFPFlowMod(
+            dp,
+            cookie=_to_int(flow.get('cookie', 0)),
+            cookie_mask=_to_int(flow.get('cookie_mask', 0)),
+            table_id=_to_int(flow.get('table_id', 0)),
+            command=commands[cmd],
+            idle_timeout=_to_int(flow.get('idle_timeout', 0)),
+            hard_timeout=_to_int(flow.get('hard_timeout', 0)),
+            priority=_to_int(flow.get('priority', 0)),
+            buffer_id=ofproto.OFP_NO_BUFFER,
+            out_port=_to_int(flow.get('out_port', ofproto.OFPP_ANY)),
+            out_group=_to_int(flow.get('out_group', ofproto.OFPG_ANY)),
+            flags=_to_int(flow.get('flags', 0)),
+            match=match,
+            instructions=inst)
+
+    def _to_group_mod(self, dp, group, cmd):
+        ofproto = dp.ofproto
+        parser = dp.ofproto_parser
+        commands = {
+            'group_add': ofproto.OFPGC_ADD,
+            'group_modify': ofproto.OFPGC_MODIFY,
+            'group_delete': ofproto.OFPGC_DELETE
+        }
+        group_types = {
+            'ALL': ofproto.OFPGT_ALL,
+            'SELECT': ofproto.OFPGT_SELECT,
+            'INDIRECT': ofproto.OFPGT_INDIRECT,
+            'FF': ofproto.OFPGT_FF
+        }
+        if cmd not in commands:
+            raise ValueError('unknown group command: {0}'.format(cmd))
+        buckets = []
+        for bucket in group.get('buckets', []):
+            actions = []
+            for action_dict in bucket.get('actions', []):
+                action = ofctl_v1_3.to_action(dp, action_dict)
+                if action is not None:
+                    actions.append(action)
+            buckets.append(parser.OFPBucket(
+                _to_int(bucket.get('weight', 0)),
+                _to_int(bucket.get('watch_port', ofproto.OFPP_ANY)),
+                _to_int(bucket.get('watch_group', ofproto.OFPG_ANY)),
+                actions))
+        return parser.OFPGroupMod(dp, commands[cmd], group_types[str(group.get('type', 'ALL')).upper()],
+                                  _to_int(group.get('group_id', 0)), buckets)
+
+    @set_ev_cls(ofp_event.EventOFPErrorMsg, MAIN_DISPATCHER)
+    def _error_msg_handler(self, ev):
+        msg = ev.msg
+        if (msg.datapath.id, msg.xid) in self.meter_mods:
+            self.meter_mods.discard((msg.datapath.id, msg.xid))
+            # e.g. no meter support in the datapath, packet-ins are not rate limited then
+            self.logger.warning('packet-in meter rejected by switch %s (code %s), not rate limiting packet-ins',
+                                msg.datapath.id, msg.code)
+            self._add_packet_in_copy(msg.datapath, meter=False)
+            return
+        pending = self.pending_mods.pop((msg.datapath.id, msg.xid), None)
+        if pending is None:
+            return
+        index, errors = pending
+        errors.append({'index': index, 'dpid': msg.datapath.id, 'type': msg.type, 'code': msg.code})
+
+    @set_ev_cls(ofp_event.EventOFPBarrierReply, MAIN_DISPATCHER)
+    def _barrier_reply_handler(self, ev):
+        msg = ev.msg
+        waiter = self.barrier_waiters.pop((msg.datapath.id, msg.xid), None)
+        if waiter is not None:
+            waiter.set()
 
     @set_ev_cls(ofp_event.EventOFPSwitchFeatures, CONFIG_DISPATCHER)
     def switch_features_handler(self, ev):
+        if not LEARNING_SWITCH:
+            return
         datapath = ev.msg.datapath
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
@@ -43,13 +356,55 @@ class SimpleSwitch13(app_manager.RyuApp):
         # 128, OVS will send Packet-In with invalid buffer_id and
         # truncated packet data. In that case, we cannot output packets
         # correctly.  The bug has been fixed in OVS v2.1.0.
+        if HIGH_RATE:
+            self.mac_to_port[datapath.id] = MacTable()
+            self._add_table_miss(datapath)
+            self._add_packet_in_copy(datapath, meter=PACKET_IN_RATE > 0)
+            return
         match = parser.OFPMatch()
         #actions = [parser.OFPActionOutput(ofproto.OFPP_CONTROLLER,
         #                                  ofproto.OFPCML_NO_BUFFER)]
         actions = [parser.OFPActionOutput(ofproto.OFPCML_NO_BUFFER)]
         self.add_flow(datapath, 0, match, actions)
 
-    def add_flow(self, datapath, priority, match, actions, buffer_id=None, table_id=0):
+    def _add_table_miss(self, datapath):
+        """
+        Forward table-miss packets with the NORMAL action and pass them on to PACKET_IN_TABLE,
+        which sends a copy to the controller.
+        """
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        actions = [parser.OFPActionOutput(ofproto.OFPP_NORMAL)]
+        inst = [parser.OFPInstructionActions(ofproto.OFPIT_APPLY_ACTIONS, actions),
+                parser.OFPInstructionGotoTable(PACKET_IN_TABLE)]
+        datapath.send_msg(parser.OFPFlowMod(datapath=datapath, priority=0, match=parser.OFPMatch(),
+                                            instructions=inst))
+        self.counters['flow_mod'] += 1
+
+    def _add_packet_in_copy(self, datapath, meter=True):
+        """
+        Send the table-miss packets to the controller, limited to PACKET_IN_RATE packets/s by a meter.
+        The meter only drops the copies, the packets were already forwarded by the table-miss entry.
+        """
+        ofproto = datapath.ofproto
+        parser = datapath.ofproto_parser
+        inst = []
+        if meter:
+            bands = [parser.OFPMeterBandDrop(rate=PACKET_IN_RATE, burst_size=PACKET_IN_RATE)]
+            meter_mod = parser.OFPMeterMod(datapath, command=ofproto.OFPMC_ADD,
+                                           flags=ofproto.OFPMF_PKTPS | ofproto.OFPMF_BURST,
+                                           meter_id=PACKET_IN_METER_ID, bands=bands)
+            datapath.set_xid(meter_mod)
+            self.meter_mods.add((datapath.id, meter_mod.xid))
+            datapath.send_msg(meter_mod)
+            inst.append(parser.OFPInstructionMeter(PACKET_IN_METER_ID, ofproto.OFPIT_METER))
+        actions = [parser.OFPActionOutput(ofproto.OFPP_CONTROLLER, ofproto.OFPCML_NO_BUFFER)]
+        inst.append(parser.OFPInstructionActions(ofproto.OFPIT_APPLY_ACTIONS, actions))
+        datapath.send_msg(parser.OFPFlowMod(datapath=datapath, table_id=PACKET_IN_TABLE, priority=0,
+                                            match=parser.OFPMatch(), instructions=inst))
+        self.counters['flow_mod'] += 1
+
+    def add_flow(self, datapath, priority, match, actions, buffer_id=None, table_id=0, idle_timeout=0):
         ofproto = datapath.ofproto
         parser = datapath.ofproto_parser
 
@@ -58,16 +413,20 @@ class SimpleSwitch13(app_manager.RyuApp):
         if buffer_id:
             mod = parser.OFPFlowMod(datapath=datapath, buffer_id=buffer_id,
                                     priority=priority, match=match,
-                                    instructions=inst, table_id=table_id)
+                                    instructions=inst, table_id=table_id, idle_timeout=idle_timeout)
         else:
             mod = parser.OFPFlowMod(datapath=datapath, priority=priority,
-                                    match=match, instructions=inst, table_id=table_id)
+                                    match=match, instructions=inst, table_id=table_id, idle_timeout=idle_timeout)
         datapath.send_msg(mod)
+        self.counters['flow_mod'] += 1
 
         # new switch detected
 
     @set_ev_cls([EventSwitchEnter, EventSwitchReconnected])
     def _ev_switch_enter_handler(self, ev):
+        if not LEARNING_SWITCH or HIGH_RATE:
+            # the table-miss entry of the high-rate mode is kept
+            return
         datapath = ev.switch.dp
         self.logger.info('registered OF switch id: %s' % datapath.id)
         ofproto = datapath.ofproto
@@ -80,6 +439,11 @@ class SimpleSwitch13(app_manager.RyuApp):
 
     @set_ev_cls(ofp_event.EventOFPPacketIn, MAIN_DISPATCHER)
     def _packet_in_handler(self, ev):
+        if not LEARNING_SWITCH:
+            return
+        self.counters['packet_in'] += 1
+        if HIGH_RATE:
+            return self._high_rate_packet_in(ev.msg)
         # If you hit this you might want to increase
         # the "miss_send_length" of your switch
         if ev.msg.msg_len < ev.msg.total_len:
@@ -103,7 +467,7 @@ class SimpleSwitch13(app_manager.RyuApp):
         dpid = datapath.id
         self.mac_to_port.setdefault(dpid, {})
 
-        self.logger.info("packet in %s %s %s %s", dpid, src, dst, in_port)
+        self.logger.debug("packet in %s %s %s %s", dpid, src, dst, in_port)
 
         # learn a mac address to avoid FLOOD next time.
         self.mac_to_port[dpid][src] = in_port
@@ -132,3 +496,27 @@ class SimpleSwitch13(app_manager.RyuApp):
         out = parser.OFPPacketOut(datapath=datapath, buffer_id=msg.buffer_id,
                                   in_port=in_port, actions=actions, data=data)
         datapath.send_msg(out)
+
+    def _high_rate_packet_in(self, msg):
+        """
+        Learning switch of the high-rate mode: bounded, aging MAC tables and learned flows with idle timeout.
+        The packet is a copy, it was already forwarded by the NORMAL action of the table-miss entry.
+        """
+        datapath = msg.datapath
+        parser = datapath.ofproto_parser
+        in_port = msg.match['in_port']
+
+        eth = packet.Packet(msg.data).get_protocol(ethernet.ethernet)
+        if eth is None or eth.ethertype == ether_types.ETH_TYPE_LLDP:
+            return
+        macs = self.mac_to_port.get(datapath.id)
+        if macs is None:
+            macs = self.mac_to_port[datapath.id] = MacTable()
+        now = time.time()
+        macs.learn(eth.src, in_port, now)
+        out_port = macs.lookup(eth.dst, now)
+        self.logger.debug("packet in %s %s %s %s", datapath.id, eth.src, eth.dst, in_port)
+        if out_port is not None and out_port != in_port:
+            match = parser.OFPMatch(in_port=in_port, eth_dst=eth.dst)
+            actions = [parser.OFPActionOutput(out_port)]
+            self.add_flow(datapath, 1, match, actions, idle_timeout=LEARNED_IDLE_TIMEOUT)
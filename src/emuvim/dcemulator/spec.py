@@ -0,0 +1,171 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Parsing and validation of the physical (PN) and virtual (VN) network
+specs in scenarios/topologies (see the README there).
+
+PN spec: "Servers" (or "clouds") with [cores, ram in GB, bandwidth in Gbps]
+per server, and "PN" links [node1, node2, bandwidth in Gbps] between
+servers and switches. Every node of a PN link that is no server is a
+switch. The gateway switch "gsw" may also be listed as server.
+
+VN spec: "VMs" with [cpu, memory, traffic] per VNF, "VN" links
+[vnf1, vnf2, bandwidth in Gbps] and an optional "server_antiaffinity"
+list of [vnf, server] pairs.
+"""
+import json
+import numbers
+from collections import OrderedDict
+
+# listed as server by some PN specs, but always a switch
+GATEWAY_SWITCH = 'gsw'
+
+
+class SpecError(Exception):
+    pass
+
+
+def load(spec):
+    """
+    :param spec: dict, JSON string or path of a JSON file
+    :return: dict (objects keep the order of the file)
+    """
+    if isinstance(spec, dict):
+        return spec
+    if spec.lstrip().startswith('{'):
+        return json.loads(spec, object_pairs_hook=OrderedDict)
+    with open(spec) as f:
+        return json.load(f, object_pairs_hook=OrderedDict)
+
+
+def _numbers(value, count):
+    return isinstance(value, list) and len(value) == count and \
+        all(isinstance(v, numbers.Number) and not isinstance(v, bool) for v in value)
+
+
+def _named_entries(spec, key, errors):
+    """
+    Read a {name: [values]} dict, or a list of such dicts, of a spec.
+    """
+    value = spec.get(key)
+    entries = OrderedDict()
+    if isinstance(value, dict):
+        value = [value]
+    if not isinstance(value, list) or not value:
+        errors.append("'{0}' missing or empty".format(key))
+        return entries
+    for item in value:
+        if not isinstance(item, dict):
+            errors.append("'{0}': {1} is no object".format(key, item))
+            continue
+        for name, values in item.items():
+            if not _numbers(values, 3):
+                errors.append("'{0}': {1} needs three numbers, got {2}".format(key, name, values))
+            elif name in entries:
+                errors.append("'{0}': {1} listed twice".format(key, name))
+            else:
+                entries[str(name)] = tuple(values)
+    return entries
+
+
+def _links(spec, key, nodes, errors):
+    """
+    Read the [node1, node2, bandwidth] links of a spec, nodes=None accepts all node names.
+    """
+    links = []
+    value = spec.get(key)
+    if not isinstance(value, list):
+        errors.append("'{0}' missing".format(key))
+        return links
+    for item in value:
+        if not isinstance(item, list) or len(item) != 3 or not _numbers(item[2:], 1):
+            errors.append("'{0}': {1} is no [node1, node2, bandwidth] entry".format(key, item))
+            continue
+        node1, node2, bw = str(item[0]), str(item[1]), item[2]
+        if node1 == node2:
+            errors.append("'{0}': {1} connects {2} to itself".format(key, item, node1))
+        elif bw < 0:
+            errors.append("'{0}': {1} has a negative bandwidth".format(key, item))
+        elif nodes is not None and (node1 not in nodes or node2 not in nodes):
+            errors.append("'{0}': {1} refers to an unknown node".format(key, item))
+        else:
+            links.append((node1, node2, bw))
+    return links
+
+
+def parse_pn(spec):
+    """
+    Validate a PN spec.
+    :return: dict with 'servers' (name -> (cores, ram, bandwidth)), 'switches' (names in order of
+             appearance) and 'links' ((node1, node2, bandwidth) tuples)
+    :raises SpecError: with all problems found
+    """
+    spec = load(spec)
+    errors = []
+    key = 'Servers' if 'Servers' in spec else 'clouds'
+    servers = _named_entries(spec, key, errors)
+    servers.pop(GATEWAY_SWITCH, None)
+    links = _links(spec, 'PN', None, errors)
+    switches = []
+    for node1, node2, bw in links:
+        for node in (node1, node2):
+            if node not in servers and node not in switches:
+                switches.append(node)
+    connected = set(n for link in links for n in link[:2])
+    for name in servers:
+        if name not in connected:
+            errors.append("server {0} has no link".format(name))
+    if errors:
+        raise SpecError("Invalid PN spec:\n" + "\n".join(errors))
+    return {'servers': servers, 'switches': switches, 'links': links}
+
+
+def parse_vn(spec, pn=None):
+    """
+    Validate a VN spec, and its anti-affinity rules against a parsed PN spec if given.
+    :return: dict with 'vnfs' (name -> (cpu, memory, traffic)), 'links' and 'antiaffinity'
+             ((vnf, server) tuples)
+    :raises SpecError: with all problems found
+    """
+    spec = load(spec)
+    errors = []
+    vnfs = _named_entries(spec, 'VMs', errors)
+    links = _links(spec, 'VN', vnfs, errors)
+    antiaffinity = []
+    for item in spec.get('server_antiaffinity', []):
+        if not isinstance(item, list) or len(item) != 2:
+            errors.append("'server_antiaffinity': {0} is no [vnf, server] entry".format(item))
+        elif item[0] not in vnfs:
+            errors.append("'server_antiaffinity': unknown VNF {0}".format(item[0]))
+        elif pn is not None and item[1] not in pn['servers']:
+            errors.append("'server_antiaffinity': unknown server {0}".format(item[1]))
+        else:
+            antiaffinity.append(tuple(item))
+    if errors:
+        raise SpecError("Invalid VN spec:\n" + "\n".join(errors))
+    return {'vnfs': vnfs, 'links': links, 'antiaffinity': antiaffinity}
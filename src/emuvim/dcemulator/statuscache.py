@@ -0,0 +1,236 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Cache for the runtime status of the containers, used by the status APIs.
+
+Container states are read for all containers at once with a single
+'docker ps -a' style query and kept for a short time. The fields that
+only 'docker inspect' returns (Pid, ExitCode, StartedAt, ...) come from
+an inspect of the container that is reused as long as its status does
+not change. Link states of a container are read from its sysfs instead
+of running commands in it. An optional Docker events listener drops
+cached states as soon as a container changes its state.
+"""
+import logging
+import os
+import threading
+import time
+
+LOG = logging.getLogger("dcemulator.statuscache")
+LOG.setLevel(logging.DEBUG)
+
+# label set on all containers created by Containernet
+CONTAINERNET_LABEL = "com.containernet"
+
+# interface flag of links that are administratively up
+IFF_UP = 0x1
+
+# docker events that change the state of a container
+STATE_EVENTS = set(["create", "start", "restart", "pause", "unpause",
+                    "die", "kill", "oom", "stop", "destroy"])
+
+
+def state_from_listing(c):
+    """
+    Build the State fields that the container list API returns from one of its entries.
+    """
+    s = c.get("State")
+    if isinstance(s, dict):
+        # very old docker API versions
+        return s
+    return {"Status": s,
+            "Running": s in ("running", "paused"),
+            "Paused": s == "paused",
+            "Restarting": s == "restarting",
+            "Dead": s == "dead",
+            "StatusText": c.get("Status")}
+
+
+def parse_ip_link(output):
+    """
+    Parse the output of 'ip -o link show'.
+    :return: dict interface name -> is up
+    """
+    links = dict()
+    for l in output.splitlines():
+        parts = l.split(":", 2)
+        if len(parts) < 3:
+            continue
+        name = parts[1].strip().split("@")[0]
+        flags = parts[2].split("<", 1)[-1].split(">", 1)[0].split(",")
+        links[name] = "UP" in flags
+    return links
+
+
+class ContainerStatusCache(object):
+    """
+    Time based cache of container and link states.
+    """
+
+    def __init__(self, ttl=2.0, use_events=True):
+        """
+        :param ttl: seconds a cached state is used
+        :param use_events: listen to docker events once the first state is requested
+        """
+        self.ttl = ttl
+        self.use_events = use_events
+        self._lock = threading.Lock()
+        # docker id -> (State dict of the container list, time)
+        self._states = dict()
+        self._states_time = 0
+        # docker id -> (State dict of docker inspect, time)
+        self._inspected = dict()
+        # container name -> ({intf name: is up}, time)
+        self._links = dict()
+        self._dcli = None
+        self._events_thread = None
+        self.stats = {"refresh": 0, "hit": 0}
+
+    def state(self, d):
+        """
+        Return the State of a container (like inspect_container(d)["State"], with the
+        additional StatusText of 'docker ps', e.g. "Up 5 seconds").
+        All container states are refreshed with one query once they are older than ttl.
+        """
+        self._dcli = self._dcli or d.dcli
+        if self.use_events and self._events_thread is None:
+            # (re)start the listener, the stream ends at the client's read timeout
+            self.listen(d.dcli)
+        with self._lock:
+            now = time.time()
+            s = self._states.get(d.did)
+            if s is not None and now - s[1] < self.ttl:
+                self.stats["hit"] += 1
+            else:
+                if now - self._states_time >= self.ttl:
+                    self._refresh(now)
+                s = self._states.get(d.did)
+        if s is None:
+            # not listed (e.g. other label), ask docker directly
+            return d.dcli.inspect_container(d.dc)["State"]
+        return self._inspected_state(d, s[0])
+
+    def _inspected_state(self, d, listed):
+        """
+        Complete a listed state with the fields of docker inspect.
+        The inspected state is reused while the container keeps its status; without
+        the events listener (restarts do not change the status) only for ttl seconds.
+        """
+        if "StatusText" not in listed:
+            # very old docker API versions list the complete state
+            return listed
+        now = time.time()
+        with self._lock:
+            i = self._inspected.get(d.did)
+        if (i is None or i[0].get("Status") != listed["Status"] or
+                (self._events_thread is None and now - i[1] >= self.ttl)):
+            i = (d.dcli.inspect_container(d.dc)["State"], now)
+            with self._lock:
+                self._inspected[d.did] = i
+        return dict(i[0], StatusText=listed["StatusText"])
+
+    def _refresh(self, now):
+        containers = self._dcli.containers(all=True, filters={"label": CONTAINERNET_LABEL})
+        self._states = dict((c["Id"], (state_from_listing(c), now)) for c in containers)
+        self._states_time = now
+        self.stats["refresh"] += 1
+
+    def links(self, d):
+        """
+        Return {intf name: is up} of the interfaces of a container.
+        """
+        with self._lock:
+            l = self._links.get(d.name)
+            if l is not None and time.time() - l[1] < self.ttl:
+                self.stats["hit"] += 1
+                return l[0]
+        links = self._read_sysfs_links(d)
+        if links is None:
+            links = parse_ip_link(d.cmd("ip -o link show"))
+        with self._lock:
+            self._links[d.name] = (links, time.time())
+        return links
+
+    @staticmethod
+    def _read_sysfs_links(d):
+        """
+        Read the links of a container from the host through its /proc entry.
+        :return: dict or None if not readable
+        """
+        if not d.pid or d.pid < 0:
+            return None
+        base = "/proc/%d/root/sys/class/net" % d.pid
+        try:
+            links = dict()
+            for name in os.listdir(base):
+                with open(os.path.join(base, name, "flags")) as f:
+                    links[name] = bool(int(f.read().strip(), 16) & IFF_UP)
+            return links
+        except (OSError, IOError, ValueError):
+            return None
+
+    def invalidate(self, d=None):
+        """
+        Drop the cached states of a container (or of all containers).
+        """
+        with self._lock:
+            if d is None:
+                self._states = dict()
+                self._states_time = 0
+                self._inspected = dict()
+                self._links = dict()
+            else:
+                self._states.pop(d.did, None)
+                self._inspected.pop(d.did, None)
+                self._links.pop(d.name, None)
+
+    def listen(self, dcli):
+        """
+        Drop cached states when docker reports a state change of a container.
+        Runs in a daemon thread until the docker daemon closes the stream.
+        """
+        if self._events_thread is not None:
+            return
+        self._dcli = self._dcli or dcli
+
+        def run():
+            try:
+                for ev in dcli.events(decode=True,
+                                      filters={"type": "container", "label": CONTAINERNET_LABEL}):
+                    if ev.get("status") in STATE_EVENTS:
+                        with self._lock:
+                            self._states.pop(ev.get("id"), None)
+                            self._inspected.pop(ev.get("id"), None)
+            except Exception as ex:
+                LOG.debug("Docker event listener stopped: %s" % ex)
+            finally:
+                self._events_thread = None
+
+        self._events_thread = threading.Thread(target=run, name="statuscache-events")
+        self._events_thread.daemon = True
+        self._events_thread.start()
@@ -0,0 +1,560 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Compact topology of the DCNetwork.
+
+Node names are interned to integer ids and links are stored column-wise in
+arrays (port numbers, numeric weights), with one array of link ids per node
+as adjacency. TopologyView offers the read-only part of the networkx
+MultiDiGraph API that was used on DCNetwork_graph, so existing callers keep
+working, without the memory of a dict per node, neighbor and edge.
+"""
+import heapq
+import logging
+import math
+import threading
+from array import array
+
+LOG = logging.getLogger("dcemulator.topology")
+LOG.setLevel(logging.DEBUG)
+
+# numeric link attributes, as allowed by the TCLink class
+LINK_METRICS = ['bw', 'delay', 'jitter', 'loss']
+
+NAN = float('nan')
+
+
+class Topology(object):
+    """
+    Nodes (containers, SAPs, switches) and the links between them.
+    Each link is stored once and can be traversed in both directions.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # node name <-> node id, ids of removed nodes are reused
+        self._ids = {}
+        self._names = []
+        self._free_nodes = []
+        # node id -> index in _type_names
+        self._types = array('i')
+        self._type_names = []
+        # node id -> array of ids of the links of this node
+        self._adj = []
+
+        # link columns, indexed by link id, ids of removed links are reused
+        self._a = array('i')
+        self._b = array('i')
+        self._port_nr = (array('i'), array('i'))
+        self._port_id = ([], [])
+        self._port_name = ([], [])
+        self._metrics = dict((m, array('d')) for m in LINK_METRICS)
+        # bandwidth reserved by chains per link direction (0: a -> b, 1: b -> a)
+        self._reserved = (array('d'), array('d'))
+        self._free_links = []
+        self.num_links = 0
+
+    # nodes
+
+    def _type_id(self, node_type):
+        try:
+            return self._type_names.index(node_type)
+        except ValueError:
+            self._type_names.append(node_type)
+            return len(self._type_names) - 1
+
+    def add_node(self, name, type=None):
+        """
+        Add a node, or update the type of an existing node.
+        :return: node id
+        """
+        with self._lock:
+            nid = self._ids.get(name)
+            if nid is not None:
+                if type is not None:
+                    self._types[nid] = self._type_id(type)
+                return nid
+            type_id = self._type_id(type)
+            if self._free_nodes:
+                nid = self._free_nodes.pop()
+                self._names[nid] = name
+                self._types[nid] = type_id
+                self._adj[nid] = array('i')
+            else:
+                nid = len(self._names)
+                self._names.append(name)
+                self._types.append(type_id)
+                self._adj.append(array('i'))
+            self._ids[name] = nid
+            return nid
+
+    def remove_node(self, name):
+        """
+        Remove a node and all its links.
+        """
+        with self._lock:
+            nid = self._ids.pop(name)
+            for lid in list(self._adj[nid]):
+                self._remove_link_id(lid)
+            self._names[nid] = None
+            self._adj[nid] = None
+            self._free_nodes.append(nid)
+
+    def node_id(self, name):
+        return self._ids[name]
+
+    def node_name(self, nid):
+        return self._names[nid]
+
+    def node_type(self, name):
+        return self._type_names[self._types[self._ids[name]]]
+
+    def nodes(self, type=None):
+        """
+        :return: list of node names (of a type)
+        """
+        if type is None:
+            return list(self._ids)
+        if type not in self._type_names:
+            return []
+        type_id = self._type_names.index(type)
+        return [n for n, nid in self._ids.items() if self._types[nid] == type_id]
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    # links
+
+    def add_link(self, node1, node2, port_nr1, port_nr2, port_id1=None, port_id2=None,
+                 port_name1=None, port_name2=None, **metrics):
+        """
+        Add a link between two nodes (both are added if they do not exist).
+        :param metrics: numeric link attributes (bw, delay, jitter, loss), None or missing if not set
+        :return: link id
+        """
+        with self._lock:
+            a = self.add_node(node1)
+            b = self.add_node(node2)
+            values = dict((m, float(metrics[m]) if metrics.get(m) is not None else NAN) for m in LINK_METRICS)
+            if self._free_links:
+                lid = self._free_links.pop()
+                self._a[lid] = a
+                self._b[lid] = b
+                for side, nr, pid, pname in [(0, port_nr1, port_id1, port_name1), (1, port_nr2, port_id2, port_name2)]:
+                    self._port_nr[side][lid] = nr
+                    self._port_id[side][lid] = pid
+                    self._port_name[side][lid] = pname
+                for m in LINK_METRICS:
+                    self._metrics[m][lid] = values[m]
+                for side in (0, 1):
+                    self._reserved[side][lid] = 0.0
+            else:
+                lid = len(self._a)
+                self._a.append(a)
+                self._b.append(b)
+                for side, nr, pid, pname in [(0, port_nr1, port_id1, port_name1), (1, port_nr2, port_id2, port_name2)]:
+                    self._port_nr[side].append(nr)
+                    self._port_id[side].append(pid)
+                    self._port_name[side].append(pname)
+                for m in LINK_METRICS:
+                    self._metrics[m].append(values[m])
+                for side in (0, 1):
+                    self._reserved[side].append(0.0)
+            self._adj[a].append(lid)
+            if b != a:
+                self._adj[b].append(lid)
+            self.num_links += 1
+            return lid
+
+    def remove_link(self, node1, node2, port_name=None):
+        """
+        Remove a link between two nodes.
+        :param port_name: name of the port of node1 or node2 to select one of multiple links
+        :return: False if no such link exists
+        """
+        with self._lock:
+            for lid in self._links_between(node1, node2):
+                if port_name is None or port_name in (self._port_name[0][lid], self._port_name[1][lid]):
+                    self._remove_link_id(lid)
+                    return True
+            return False
+
+    def _remove_link_id(self, lid):
+        a = self._a[lid]
+        b = self._b[lid]
+        self._adj[a].remove(lid)
+        if b != a:
+            self._adj[b].remove(lid)
+        self._a[lid] = -1
+        self._b[lid] = -1
+        for side in (0, 1):
+            self._port_id[side][lid] = None
+            self._port_name[side][lid] = None
+        self._free_links.append(lid)
+        self.num_links -= 1
+
+    def _links_between(self, node1, node2):
+        a = self._ids.get(node1)
+        b = self._ids.get(node2)
+        if a is None or b is None:
+            return []
+        # scan the links of the node with less links (e.g. the container, not its dc switch)
+        scan = self._adj[a] if len(self._adj[a]) <= len(self._adj[b]) else self._adj[b]
+        return [lid for lid in scan if (self._a[lid], self._b[lid]) in ((a, b), (b, a))]
+
+    def _link_attrs(self, lid, src):
+        """
+        Attributes of a link in the direction starting at node id src, as stored in the former networkx graph.
+        """
+        s, d = (0, 1) if self._a[lid] == src else (1, 0)
+        attrs = {'src_port_id': self._port_id[s][lid], 'src_port_nr': self._port_nr[s][lid],
+                 'src_port_name': self._port_name[s][lid],
+                 'dst_port_id': self._port_id[d][lid], 'dst_port_nr': self._port_nr[d][lid],
+                 'dst_port_name': self._port_name[d][lid]}
+        for m in LINK_METRICS:
+            value = self._metrics[m][lid]
+            if not math.isnan(value):
+                attrs[m] = value
+        return attrs
+
+    def _peer(self, lid, nid):
+        return self._b[lid] if self._a[lid] == nid else self._a[lid]
+
+    def neighbors(self, name):
+        """
+        :return: list of the neighbors of a node, in the order their first link was added
+        """
+        nid = self._ids[name]
+        seen = set()
+        neighbors = []
+        for lid in self._adj[nid]:
+            peer = self._peer(lid, nid)
+            if peer not in seen:
+                seen.add(peer)
+                neighbors.append(self._names[peer])
+        return neighbors
+
+    def links(self, node1, node2):
+        """
+        :return: list of the attribute dicts of the links from node1 to node2
+        """
+        return [self._link_attrs(lid, self._ids[node1]) for lid in self._links_between(node1, node2)]
+
+    def link_ids(self, node1, node2):
+        """
+        :return: list of the ids of the links between node1 and node2
+        """
+        return self._links_between(node1, node2)
+
+    def link(self, lid, src):
+        """
+        :return: attribute dict of a link in the direction starting at node src
+        """
+        return self._link_attrs(lid, self._ids[src])
+
+    # bandwidth reservations
+
+    def residual(self, lid, src):
+        """
+        Bandwidth of a link direction that is not reserved, infinite for links without bw.
+        """
+        return self._residual(lid, self._ids[src])
+
+    def _residual(self, lid, src_nid):
+        bw = self._metrics['bw'][lid]
+        if math.isnan(bw):
+            return float('inf')
+        side = 0 if self._a[lid] == src_nid else 1
+        return bw - self._reserved[side][lid]
+
+    def reserve(self, hops, demand):
+        """
+        Reserve bandwidth on link directions.
+        :param hops: list of (link id, name of the node the direction starts at)
+        :param demand: bandwidth in the unit of the bw metric (Mbit/s)
+        """
+        with self._lock:
+            for lid, src in hops:
+                side = 0 if self._a[lid] == self._ids[src] else 1
+                self._reserved[side][lid] += demand
+
+    def release(self, hops, demand):
+        """
+        Give back bandwidth reserved with reserve(). Hops of removed links are skipped.
+        """
+        with self._lock:
+            for lid, src in hops:
+                nid = self._ids.get(src)
+                if nid is None or self._a[lid] < 0 or nid not in (self._a[lid], self._b[lid]):
+                    continue
+                side = 0 if self._a[lid] == nid else 1
+                self._reserved[side][lid] = max(0.0, self._reserved[side][lid] - demand)
+
+    def link_usage(self):
+        """
+        :return: list of dicts (src, dst, bw, reserved) per direction of links with reservations or bw
+        """
+        with self._lock:
+            usage = []
+            for lid in range(len(self._a)):
+                if self._a[lid] < 0:
+                    continue
+                bw = self._metrics['bw'][lid]
+                for side, (s, d) in enumerate([(self._a[lid], self._b[lid]), (self._b[lid], self._a[lid])]):
+                    reserved = self._reserved[side][lid]
+                    if math.isnan(bw) and not reserved:
+                        continue
+                    usage.append({'src': self._names[s], 'dst': self._names[d],
+                                  'src_port_name': self._port_name[side][lid],
+                                  'bw': None if math.isnan(bw) else bw, 'reserved': reserved})
+            return usage
+
+    # queries
+
+    def shortest_path(self, src, dst, weight=None, node_types=None):
+        """
+        Dijkstra on the node ids, links without the weight attribute count as 1.
+        :param weight: link metric to use as weight, None to count hops
+        :param node_types: only traverse nodes of these types (src and dst are always allowed)
+        :return: list of node names, None if there is no path
+        """
+        found = self._dijkstra(src, dst, weight, node_types)
+        return found[0] if found is not None else None
+
+    def constrained_path(self, src, dst, demand, weight=None, node_types=None):
+        """
+        Shortest path that only uses link directions with at least demand unreserved bandwidth (CSPF).
+        :return: (list of node names, list of (link id, node name) hops), None if there is no such path
+        :raises ValueError: if src or dst is unknown or weight is no link metric
+        """
+        for n in (src, dst):
+            if n not in self._ids:
+                raise ValueError("Node %s is not in the topology" % n)
+        if weight is not None and weight not in self._metrics:
+            raise ValueError("Unknown link metric %s, use one of %s" % (weight, ", ".join(LINK_METRICS)))
+        return self._dijkstra(src, dst, weight, node_types, demand)
+
+    def _dijkstra(self, src, dst, weight=None, node_types=None, demand=None):
+        with self._lock:
+            s = self._ids[src]
+            t = self._ids[dst]
+            allowed = None
+            if node_types is not None:
+                allowed = set(i for i, tn in enumerate(self._type_names) if tn in node_types)
+            weights = self._metrics[weight] if weight is not None else None
+            dist = {s: 0.0}
+            prev = {}
+            heap = [(0.0, s)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if u == t:
+                    break
+                if d > dist[u]:
+                    continue
+                for lid in self._adj[u]:
+                    v = self._peer(lid, u)
+                    if allowed is not None and v != t and self._types[v] not in allowed:
+                        continue
+                    if demand is not None and self._residual(lid, u) < demand:
+                        continue
+                    w = 1.0
+                    if weights is not None and not math.isnan(weights[lid]):
+                        w = weights[lid]
+                    nd = d + w
+                    if nd < dist.get(v, float('inf')):
+                        dist[v] = nd
+                        prev[v] = (u, lid)
+                        heapq.heappush(heap, (nd, v))
+            if t not in dist:
+                return None
+            path = [t]
+            hops = []
+            while path[-1] != s:
+                u, lid = prev[path[-1]]
+                hops.append((lid, self._names[u]))
+                path.append(u)
+            return [self._names[n] for n in reversed(path)], list(reversed(hops))
+
+    # export
+
+    def export(self):
+        """
+        :return: JSON serializable dict with the nodes and (undirected) links of the topology
+        """
+        with self._lock:
+            nodes = [{'name': n, 'type': self._type_names[self._types[nid]]} for n, nid in self._ids.items()]
+            links = []
+            for lid in range(len(self._a)):
+                if self._a[lid] < 0:
+                    continue
+                link = self._link_attrs(lid, self._a[lid])
+                link['src'] = self._names[self._a[lid]]
+                link['dst'] = self._names[self._b[lid]]
+                links.append(link)
+            return {'nodes': nodes, 'links': links}
+
+    def to_networkx(self):
+        """
+        :return: a networkx MultiDiGraph copy of the topology, with both directions of each link
+        """
+        import networkx as nx
+        g = nx.MultiDiGraph()
+        view = TopologyView(self)
+        for n, data in view.nodes(data=True):
+            g.add_node(n, **data)
+        for u, v, data in view.edges(data=True):
+            g.add_edge(u, v, **data)
+        return g
+
+    def view(self):
+        return TopologyView(self)
+
+
+class TopologyView(object):
+    """
+    Read-only view of a Topology with the networkx 1.x MultiDiGraph API (nodes, edges, neighbors, G[u][v][key]).
+    Each link is seen as two directed edges, parallel edges between two nodes get the keys 0, 1, ...
+    Attribute dicts are built on access, changing them does not change the topology.
+    """
+
+    def __init__(self, topology):
+        self.topology = topology
+
+    def is_directed(self):
+        return True
+
+    def is_multigraph(self):
+        return True
+
+    def __contains__(self, n):
+        return n in self.topology
+
+    def __iter__(self):
+        return iter(self.topology.nodes())
+
+    def __len__(self):
+        return len(self.topology)
+
+    def has_node(self, n):
+        return n in self.topology
+
+    def number_of_nodes(self):
+        return len(self.topology)
+
+    def number_of_edges(self):
+        return 2 * self.topology.num_links
+
+    def nodes(self, data=False):
+        if data:
+            return [(n, {'type': self.topology.node_type(n)}) for n in self.topology.nodes()]
+        return self.topology.nodes()
+
+    @property
+    def node(self):
+        return dict(self.nodes(data=True))
+
+    def neighbors(self, n):
+        return self.topology.neighbors(n)
+
+    successors = neighbors
+    predecessors = neighbors
+
+    def __getitem__(self, n):
+        """
+        :return: mapping neighbor -> {key: edge attributes}
+        """
+        if n not in self.topology:
+            raise KeyError(n)
+        return _AdjacencyView(self.topology, n)
+
+    def adjacency_iter(self):
+        for n in self.topology.nodes():
+            yield n, self[n]
+
+    def has_edge(self, u, v):
+        return u in self.topology and v in self.topology and len(self.topology.links(u, v)) > 0
+
+    def edges(self, data=False, keys=False):
+        edges = []
+        for u in self.topology.nodes():
+            for v in self.topology.neighbors(u):
+                for k, attrs in enumerate(self.topology.links(u, v)):
+                    e = (u, v, k) if keys else (u, v)
+                    edges.append(e + (attrs,) if data else e)
+        return edges
+
+    def get_edge_data(self, u, v, key=None, default=None):
+        if not self.has_edge(u, v):
+            return default
+        links = dict(enumerate(self.topology.links(u, v)))
+        if key is None:
+            return links
+        return links.get(key, default)
+
+
+class _AdjacencyView(object):
+    """
+    Neighbors of a node, the edge attributes are only looked up for the accessed neighbor.
+    """
+
+    def __init__(self, topology, n):
+        self.topology = topology
+        self.n = n
+
+    def __getitem__(self, v):
+        links = self.topology.links(self.n, v) if v in self.topology else []
+        if not links:
+            raise KeyError(v)
+        return dict(enumerate(links))
+
+    def __contains__(self, v):
+        return v in self.topology and len(self.topology.links(self.n, v)) > 0
+
+    def __iter__(self):
+        return iter(self.topology.neighbors(self.n))
+
+    def __len__(self):
+        return len(self.topology.neighbors(self.n))
+
+    def keys(self):
+        return self.topology.neighbors(self.n)
+
+    def items(self):
+        return [(v, self[v]) for v in self.topology.neighbors(self.n)]
+
+    def values(self):
+        return [self[v] for v in self.topology.neighbors(self.n)]
+
+    def get(self, v, default=None):
+        try:
+            return self[v]
+        except KeyError:
+            return default
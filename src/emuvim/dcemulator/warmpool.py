@@ -0,0 +1,237 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Warm pools of idle containers that are claimed by Datacenter.startCompute
+instead of creating a new container.
+
+A pooled container is already created, started and has its Mininet shell
+attached. Claiming it renames it to the requested name and applies the
+requested resource limits; the data center then connects its interfaces
+as usual. VNF_NAME is set to the requested name in the Mininet shell of the
+container, so commands run through d.cmd() see it; the hostname, the
+environment of the image's entrypoint and of 'docker exec' sessions keep the
+pool name.
+"""
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from emuvim.dcemulator.workers import run_parallel
+
+LOG = logging.getLogger("dcemulator.warmpool")
+LOG.setLevel(logging.DEBUG)
+
+# container parameters that can still be applied to a running container
+CLAIMABLE_PARAMS = set(['cpu_percent', 'cpu_period', 'cpu_quota', 'cpu_shares',
+                        'cpuset_cpus', 'mem_limit', 'memswap_limit'])
+
+# names of pooled containers are unique in the whole network
+_POOL_IDS = itertools.count(1)
+
+
+class WarmPool(object):
+    """
+    Idle containers of a single image in a single data center.
+    """
+
+    def __init__(self, dc, image, size=2, idle_timeout=None, pause=False, max_workers=2):
+        """
+        :param dc: Datacenter the containers are created in
+        :param image: docker image of the pooled containers
+        :param size: number of idle containers kept in the pool
+        :param idle_timeout: seconds after which an idle container is evicted (None = never)
+        :param pause: pause idle containers (docker pause) until they are claimed
+        :param max_workers: number of containers created in parallel while refilling
+        """
+        self.dc = dc
+        self.image = image
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.pause = pause
+        self.max_workers = max_workers
+        # (container, time it became idle), oldest first
+        self._idle = deque()
+        self._creating = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "claimed": 0, "missed": 0, "evicted": 0}
+
+    def __len__(self):
+        return len(self._idle)
+
+    def fill(self, wait=False):
+        """
+        Create containers until the pool has its configured size.
+        :param wait: block until the containers are created
+        :return: number of containers that are created
+        """
+        self.evict(expired_only=True)
+        with self._lock:
+            if self._closed:
+                return 0
+            missing = self.size - len(self._idle) - self._creating
+            if missing <= 0:
+                return 0
+            self._creating += missing
+
+        def refill():
+            try:
+                run_parallel(self._create, range(missing), max_workers=self.max_workers)
+            finally:
+                with self._lock:
+                    self._creating -= missing
+
+        if wait:
+            refill()
+        else:
+            t = threading.Thread(target=refill, name="warmpool-%s" % self.image)
+            t.daemon = True
+            t.start()
+        return missing
+
+    def _create(self, _):
+        registry = self.dc.net.container_registry
+        name = "wp%d" % next(_POOL_IDS)
+        while not registry.reserve(name):
+            name = "wp%d" % next(_POOL_IDS)
+        try:
+            d = self.dc.net.addDocker(
+                name,
+                dimage=self.image,
+                datacenter=self.dc,
+                flavor_name=None,
+                environment={'VNF_NAME': name})
+            if self.pause:
+                d.dcli.pause(d.dc)
+        except Exception:
+            registry.release(name)
+            raise
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._idle.append((d, time.time()))
+                self.stats["created"] += 1
+        if closed:
+            self._remove(d)
+        return d
+
+    def claim(self, name, flavor_name, params):
+        """
+        Take an idle container out of the pool and turn it into the
+        compute instance 'name'. Triggers a refill of the pool.
+        :param params: startCompute params (only resource limits can be applied)
+        :return: container or None if the pool is empty or params need a new container
+        """
+        if not set(params.iterkeys()) <= CLAIMABLE_PARAMS:
+            return None
+        self.evict(expired_only=True)
+        with self._lock:
+            if not self._idle:
+                self.stats["missed"] += 1
+                d = None
+            else:
+                d, _ = self._idle.popleft()
+                self.stats["claimed"] += 1
+        self.fill()
+        if d is None:
+            return None
+        pool_name = d.name
+        try:
+            if self.pause:
+                d.dcli.unpause(d.dc)
+            self.dc.net.renameDocker(pool_name, name)
+            # the container was created with the pool name as VNF_NAME
+            d.cmd("export VNF_NAME=%s" % name)
+            d.flavor_name = flavor_name
+            limits = dict((k, v) for k, v in params.iteritems() if k != 'cpu_percent')
+            if limits:
+                d.update_resources(**limits)
+        except Exception:
+            LOG.exception("Claiming pooled container %r as %r failed." % (pool_name, name))
+            self._remove(d)
+            return None
+        finally:
+            self.dc.net.container_registry.release(pool_name)
+        LOG.debug("Claimed pooled container %r as %r in data center %r" % (pool_name, name, str(self.dc)))
+        return d
+
+    def evict(self, expired_only=False):
+        """
+        Remove idle containers from the pool.
+        :param expired_only: only remove containers idle longer than idle_timeout
+        :return: number of removed containers
+        """
+        if expired_only and self.idle_timeout is None:
+            return 0
+        now = time.time()
+        evicted = []
+        with self._lock:
+            while self._idle:
+                d, since = self._idle[0]
+                if expired_only and now - since < self.idle_timeout:
+                    break
+                self._idle.popleft()
+                evicted.append(d)
+            self.stats["evicted"] += len(evicted)
+        for d in evicted:
+            self._remove(d)
+        return len(evicted)
+
+    def close(self, remove=True):
+        """
+        Stop refilling the pool.
+        :param remove: also remove the idle containers
+        """
+        with self._lock:
+            self._closed = True
+        if remove:
+            self.evict()
+
+    def _remove(self, d):
+        if self.pause:
+            try:
+                # paused containers are not removed by Docker.terminate
+                d.dcli.unpause(d.dc)
+            except Exception:
+                pass  # not paused
+        try:
+            self.dc.net.removeDocker(d.name)
+        except Exception:
+            LOG.exception("Removing pooled container %r failed." % d.name)
+        self.dc.net.container_registry.release(d.name)
+
+    def getStatus(self):
+        with self._lock:
+            return {"image": self.image,
+                    "size": self.size,
+                    "idle": len(self._idle),
+                    "creating": self._creating,
+                    "idle_timeout": self.idle_timeout,
+                    "paused": self.pause,
+                    "stats": dict(self.stats)}
@@ -0,0 +1,77 @@
+"""
+Copyright (c) 2015 SONATA-NFV and Paderborn University
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV, Paderborn University
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+"""
+Bounded pool of worker threads for the bulk operations of the emulator.
+"""
+import logging
+import threading
+from Queue import Queue
+
+LOG = logging.getLogger("dcemulator.workers")
+LOG.setLevel(logging.DEBUG)
+
+
+def run_parallel(func, items, max_workers=8):
+    """
+    Call func(item) for all items using at most max_workers threads.
+    Exceptions are caught and returned instead of the result of that item.
+    :param func: function with a single argument
+    :param items: list of arguments
+    :param max_workers: maximum number of concurrent calls
+    :return: list of (result, exception) tuples in the order of items
+    """
+    items = list(items)
+    results = [(None, None)] * len(items)
+    if not items:
+        return results
+
+    queue = Queue()
+    for i, item in enumerate(items):
+        queue.put((i, item))
+
+    def worker():
+        while True:
+            try:
+                i, item = queue.get_nowait()
+            except Exception:
+                # queue is empty
+                return
+            try:
+                results[i] = (func(item), None)
+            except Exception as ex:
+                LOG.exception("worker failed on {0}".format(item))
+                results[i] = (None, ex)
+
+    workers = [threading.Thread(target=worker, name="dcemulator-worker-{0}".format(n))
+               for n in range(max(1, min(max_workers, len(items))))]
+    for t in workers:
+        t.daemon = True
+        t.start()
+    for t in workers:
+        t.join()
+    return results
@@ -0,0 +1,168 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import threading
+import time
+import unittest
+from emuvim.dcemulator.node import Datacenter
+from emuvim.dcemulator.registry import ContainerRegistry
+from emuvim.dcemulator.resourcemodel import NotEnoughResourcesAvailable
+
+
+class FakeContainer(object):
+
+    def __init__(self, name, flavor_name):
+        self.name = name
+        self.flavor_name = flavor_name
+        self.dcinfo = {"Id": "id-%s" % name}
+
+
+class FakeNet(object):
+    """
+    Records container creation/removal and links instead of talking to Docker and Mininet.
+    """
+
+    def __init__(self, fail=None):
+        self.container_registry = ContainerRegistry()
+        self.fail = fail
+        self.nodes = {}
+        self.links = []
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def addDocker(self, label, **params):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.01)
+        with self.lock:
+            self.running -= 1
+        if label == self.fail:
+            raise Exception("creating %s failed" % label)
+        d = FakeContainer(label, params.get("flavor_name"))
+        self.nodes[label] = d
+        return d
+
+    def removeDocker(self, label):
+        del self.nodes[label]
+
+    def addLink(self, node1, node2, **params):
+        self.links.append((node1, node2))
+
+    def linksBetween(self, node1, node2):
+        return [l for l in self.links if l == (node1, node2)]
+
+    def removeLink(self, link):
+        self.links.remove(link)
+
+
+class FakeResourceModel(object):
+
+    def __init__(self, max_containers):
+        self.max_containers = max_containers
+        self.allocated = []
+
+    def admit(self, flavors):
+        if len(self.allocated) + len(flavors) > self.max_containers:
+            raise NotEnoughResourcesAvailable("no room for %d containers" % len(flavors))
+
+    def allocate(self, d):
+        self.allocated.append(d.name)
+
+    def free(self, d):
+        self.allocated.remove(d.name)
+
+    def write_allocation_log(self, d, path):
+        pass
+
+
+class testComputeBatch(unittest.TestCase):
+    """
+    Test starting batches of containers in a data center.
+    """
+
+    def _dc(self, fail=None, max_containers=10):
+        dc = Datacenter("dc")
+        dc.net = FakeNet(fail=fail)
+        dc.switch = "switch"
+        dc._resource_model = FakeResourceModel(max_containers)
+        return dc
+
+    def _specs(self, n):
+        return [{"name": "vnf%d" % i, "image": "ubuntu:trusty", "flavor_name": "small"} for i in range(n)]
+
+    def testStartBatch(self):
+        dc = self._dc()
+        results = dc.startComputeBatch(self._specs(4), max_parallel=4)
+        self.assertEqual([r["error"] for r in results], [None] * 4)
+        self.assertEqual(sorted(dc.containers), ["vnf0", "vnf1", "vnf2", "vnf3"])
+        self.assertEqual(len(dc.net.container_registry), 4)
+        self.assertEqual(len(dc._resource_model.allocated), 4)
+        self.assertEqual(len(dc.net.links), 4)
+        self.assertTrue(dc.net.peak > 1)
+        self.assertEqual(dc._reserved_flavors, [])
+
+    def testRollback(self):
+        dc = self._dc(fail="vnf2")
+        results = dc.startComputeBatch(self._specs(4), max_parallel=4)
+        self.assertEqual(results[2]["error"], "creating vnf2 failed")
+        self.assertEqual([r["error"] for r in results if r["name"] != "vnf2"], ["Rolled back."] * 3)
+        self.assertTrue(all(r["container"] is None for r in results))
+        # the started containers are removed again and their resources are freed
+        self.assertEqual(dc.containers, {})
+        self.assertEqual(dc.net.nodes, {})
+        self.assertEqual(dc.net.links, [])
+        self.assertEqual(dc._resource_model.allocated, [])
+        self.assertEqual(dc._reserved_flavors, [])
+        # the names can be used again
+        self.assertEqual(len(dc.net.container_registry), 0)
+        self.assertTrue(dc.net.container_registry.reserve("vnf0"))
+
+    def testAdmissionRejected(self):
+        dc = self._dc(max_containers=3)
+        results = dc.startComputeBatch(self._specs(4))
+        self.assertTrue(all(r["error"].startswith("Not enough resources") for r in results))
+        # nothing is created if the batch is not admitted as a whole
+        self.assertEqual(dc.net.peak, 0)
+        self.assertEqual(dc.containers, {})
+        self.assertEqual(dc._reserved_flavors, [])
+        self.assertTrue(dc.net.container_registry.reserve("vnf0"))
+
+    def testDuplicateName(self):
+        dc = self._dc()
+        dc.startComputeBatch(self._specs(1))
+        results = dc.startComputeBatch(self._specs(2))
+        self.assertEqual(results[0]["error"], "Container with name vnf0 already exists.")
+        self.assertEqual(results[1]["error"], "Batch rejected.")
+        self.assertEqual(sorted(dc.containers), ["vnf0"])
+        self.assertEqual(dc.net.peak, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import unittest
+from emuvim.dcemulator.elan import ElanMember, member_tree, elan_flows, to_ofctl, to_ryu, ELAN_TABLE
+
+
+class testElan(unittest.TestCase):
+    """
+    Test the flow computation of the proactive E-LANs.
+    """
+
+    def _flows(self):
+        # a -- s1 -- s2 -- s3 -- b, c without MAC on s1
+        paths = {"s1": ["s1"], "s2": ["s1", "s2"], "s3": ["s1", "s2", "s3"]}
+        members = [ElanMember("a", "eth0", "s1", 1, "s1-eth1", "00:00:00:00:00:0a"),
+                   ElanMember("b", "eth0", "s3", 5, "s3-eth5", "00:00:00:00:00:0b"),
+                   ElanMember("c", "eth0", "s1", 7, "s1-eth7", None)]
+        tree = member_tree(paths, ["s1", "s3"])
+        self.assertTrue(tree == {"s1": ["s2"], "s2": ["s1", "s3"], "s3": ["s2"]})
+        ports = {("s1", "s2"): 2, ("s2", "s1"): 1, ("s2", "s3"): 2, ("s3", "s2"): 1}
+        return elan_flows(10, members, tree, lambda sw, nb: ports[(sw, nb)])
+
+    def testFlows(self):
+        flows = self._flows()
+        self.assertTrue(list(flows) == ["s1", "s2", "s3"])
+        s1 = dict(((t, m), a) for t, p, m, a in flows["s1"])
+        self.assertTrue(s1[(0, "in_port=1")] == [("push_vlan", 10), ("goto_table", ELAN_TABLE)])
+        self.assertTrue(s1[(0, "in_port=2,dl_vlan=10")] == [("goto_table", ELAN_TABLE)])
+        self.assertTrue(s1[(ELAN_TABLE, "dl_vlan=10,dl_dst=00:00:00:00:00:0b")] == [("output", 2)])
+        self.assertTrue(s1[(ELAN_TABLE, "dl_vlan=10")] == [("output", 2), ("strip_vlan",), ("output", 1), ("output", 7)])
+        # transit switch forwards towards the member switch and floods along the tree
+        s2 = dict(((t, m), a) for t, p, m, a in flows["s2"])
+        self.assertTrue(s2[(ELAN_TABLE, "dl_vlan=10,dl_dst=00:00:00:00:00:0a")] == [("output", 1)])
+        self.assertTrue(s2[(ELAN_TABLE, "dl_vlan=10")] == [("output", 1), ("output", 2)])
+        self.assertTrue(len(flows["s3"]) == 5)
+
+    def testUnreachable(self):
+        self.assertRaises(ValueError, member_tree, {"s1": ["s1"]}, ["s1", "s2"])
+
+    def testFormats(self):
+        flow = (0, 500, "in_port=1", [("push_vlan", 10), ("goto_table", ELAN_TABLE)])
+        self.assertTrue(to_ofctl(7, flow) == "cookie=7,table=0,priority=500,in_port=1,"
+                                             "actions=mod_vlan_vid:10,goto_table:1")
+        ryu = to_ryu(1, 7, flow, lambda m: {"in_port": 1})
+        self.assertTrue(ryu["match"] == {"in_port": 1} and ryu["cookie"] == 7)
+        self.assertTrue([a["type"] for a in ryu["actions"]] == ["PUSH_VLAN", "SET_FIELD", "GOTO_TABLE"])
+        self.assertTrue(ryu["actions"][1]["value"] == 10 | 0x1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
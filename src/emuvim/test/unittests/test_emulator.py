@@ -455,5 +455,66 @@ class testEmulatorCompute( SimpleTestTopology ):
         # stop Mininet network
         self.stopNet()
 
+    def testInterfaceIndex(self):
+        """
+        Check that the interface index follows added and removed
+        compute instances.
+        """
+        # create network
+        self.createNet(nswitches=0, ndatacenter=1, nhosts=0, ndockers=0)
+        # start Mininet network
+        self.startNet()
+        # add compute resources
+        self.dc[0].startCompute("vnf1", network=[{'id': 'intf1', 'ip': '10.0.10.1/24'},
+                                                 {'id': 'intf2', 'ip': '10.0.20.1/24'}])
+        sw1, port1, port_name1 = self.net.find_connected_switch("vnf1", "intf1")
+        sw2, port2, port_name2 = self.net.find_connected_switch("vnf1", "intf2")
+        self.assertTrue(sw1 == self.dc[0].switch.name)
+        self.assertTrue(sw2 == self.dc[0].switch.name)
+        self.assertTrue(port1 != port2)
+        # first interface is the default one
+        self.assertTrue(self.net.find_connected_switch("vnf1") == (sw1, port1, port_name1))
+        self.assertTrue(self.net.find_connected_dc_interface("vnf1", "intf2") == port_name2)
+        # remove compute resources
+        self.dc[0].stopCompute("vnf1")
+        self.assertTrue(self.net.find_connected_switch("vnf1", "intf1") == (None, None, None))
+        self.assertTrue(self.net.default_interface("vnf1") is None)
+        # stop Mininet network
+        self.stopNet()
+
+    def testStopComputesMultiDC(self):
+        """
+        Remove compute instances of several data centers with a single
+        bulk call and check that unknown names are reported per container.
+        """
+        # create network
+        self.createNet(
+            nswitches=3, ndatacenter=2, nhosts=0, ndockers=0,
+            autolinkswitches=True)
+        # setup links
+        self.net.addLink(self.dc[0], self.s[0])
+        self.net.addLink(self.dc[1], self.s[2])
+        # start Mininet network
+        self.startNet()
+        # add compute resources
+        self.dc[0].startCompute("vnf1")
+        self.dc[0].startCompute("vnf2")
+        self.dc[1].startCompute("vnf3")
+        self.dc[1].startCompute("vnf4")
+        self.assertTrue(len(self.getContainernetContainers()) == 4)
+        # remove compute resources
+        results = self.net.stopComputes(["vnf1", "vnf2", "vnf3", "unknown"])
+        self.assertTrue([r["name"] for r in results] == ["vnf1", "vnf2", "vnf3", "unknown"])
+        self.assertTrue([r["error"] is None for r in results] == [True, True, True, False])
+        # check number of running nodes
+        self.assertTrue(len(self.getContainernetContainers()) == 1)
+        self.assertTrue(len(self.net.hosts) == 1)
+        self.assertTrue(len(self.dc[0].listCompute()) == 0)
+        self.assertTrue(len(self.dc[1].listCompute()) == 1)
+        self.assertTrue(self.net.find_connected_switch("vnf3") == (None, None, None))
+        self.assertTrue(self.net.find_connected_switch("vnf4")[0] == self.dc[1].switch.name)
+        # stop Mininet network
+        self.stopNet()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,94 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+from emuvim.dcemulator.flowregistry import FlowRegistry, parse_ofctl_dump, parse_ryu_dump, ofctl_strict_match
+
+
+class testFlowRegistry(unittest.TestCase):
+    """
+    Test the desired-state flow registry and its diff against flow dumps.
+    """
+
+    def _registry(self):
+        reg = FlowRegistry()
+        chain = ("vnf1", "intf1", "vnf2", "intf1")
+        reg.add_chain(chain, ["s1", "s2"])
+        reg.add_ryu("s1", {"dpid": 1, "cookie": 10, "priority": 1000, "match": {"in_port": 1},
+                           "actions": [{"type": "OUTPUT", "port": 2}]}, chain=chain)
+        reg.add_ryu("s2", {"dpid": 2, "cookie": 10, "priority": 1000, "match": {"in_port": 3},
+                           "actions": [{"type": "OUTPUT", "port": 1}], "cmd": "add"}, chain=chain)
+        reg.add_ofctl("s3", "add-flow -OOpenFlow13", '"priority=1,in_port=1,cookie=20,table=20,actions=output:2"',
+                      cookie=20)
+        return reg, chain
+
+    def testIndexes(self):
+        reg, chain = self._registry()
+        self.assertTrue(len(reg) == 3)
+        self.assertTrue(reg.switches(cookie=10) == set(["s1", "s2"]))
+        self.assertTrue(reg.switches(chain=chain) == set(["s1", "s2"]))
+        self.assertTrue(reg.chains("vnf2", "intf1") == set([chain]))
+        self.assertTrue(reg.chain_path(chain) == ["s1", "s2"])
+        # the command of a batch is not part of the desired state
+        self.assertTrue("cmd" not in reg.entries(switch="s2")[0].flow)
+        entry = reg.entries(cookie=20)[0]
+        self.assertTrue(entry.table_id == 20 and entry.priority == 1)
+        # re-adding a flow with the same match replaces it
+        reg.add_ryu("s1", {"dpid": 1, "cookie": 10, "priority": 1000, "match": {"in_port": 1},
+                           "actions": [{"type": "OUTPUT", "port": 3}]}, chain=chain)
+        self.assertTrue(len(reg) == 3)
+
+        self.assertTrue(reg.remove_chain(chain) == set(["s1", "s2"]))
+        self.assertTrue(reg.chains() == set())
+        self.assertTrue(reg.remove_cookie(20) == set(["s3"]))
+        self.assertTrue(len(reg) == 0 and reg.cookies() == set())
+
+    def testMissing(self):
+        reg, chain = self._registry()
+        self.assertTrue(reg.missing("s1", [(10, 0, 1000)]) == [])
+        # flow lost after a restart
+        self.assertTrue(len(reg.missing("s1", [(0, 0, 0)])) == 1)
+        self.assertTrue(reg.stale([(0, 0, 0), (10, 0, 1000), (99, 0, 1)]) == set([99]))
+
+    def testParse(self):
+        dump = ("OFPST_FLOW reply (OF1.3) (xid=0x2):\n"
+                " cookie=0x14, duration=3.1s, table=20, n_packets=0, n_bytes=0, priority=1,in_port=1 actions=output:2\n"
+                " cookie=0x0, duration=9.2s, table=0, n_packets=5, n_bytes=300, actions=NORMAL\n")
+        self.assertTrue(parse_ofctl_dump(dump) == [(20, 20, 1), (0, 0, 32768)])
+        ryu = {"1": [{"cookie": 10, "table_id": 0, "priority": 1000}]}
+        self.assertTrue(parse_ryu_dump(ryu) == [(10, 0, 1000)])
+
+    def testStrictMatch(self):
+        flow = "-O OpenFlow13 cookie=11,in_port=1,action=mod_vlan_vid:5,output=2"
+        self.assertTrue(ofctl_strict_match(flow, 11) == ("OpenFlow13", "cookie=11/-1,in_port=1"))
+        flow = "in_port=3,dl_vlan=5,action=strip_vlan,output=4"
+        self.assertTrue(ofctl_strict_match(flow) == (None, "cookie=0/-1,in_port=3,dl_vlan=5"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import unittest
+from emuvim.dcemulator.multipath import equal_cost_hops, parse_ofctl_group_stats, parse_ryu_group_stats
+
+
+class testMultipath(unittest.TestCase):
+    """
+    Test the helpers of the multipath chains.
+    """
+
+    def testEqualCostHops(self):
+        hops = equal_cost_hops([["s1", "s2", "s4"], ["s1", "s3", "s4"]])
+        self.assertTrue(list(hops) == ["s1", "s2", "s4", "s3"])
+        self.assertTrue(hops["s1"] == ([], ["s2", "s3"]))
+        self.assertTrue(hops["s4"] == (["s2", "s3"], []))
+        self.assertTrue(hops["s3"] == (["s1"], ["s4"]))
+
+    def testGroupStats(self):
+        dump = ("OFPST_GROUP reply (OF1.3) (xid=0x2):\n"
+                " group_id=7,duration=3.2s,ref_count=1,packet_count=30,byte_count=2940,"
+                "bucket0:packet_count=10,byte_count=980,bucket1:packet_count=20,byte_count=1960\n")
+        self.assertTrue(parse_ofctl_group_stats(dump) == {7: [(10, 980), (20, 1960)]})
+        dump = {"1": [{"group_id": 7, "bucket_stats": [{"packet_count": 10, "byte_count": 980},
+                                                       {"packet_count": 20, "byte_count": 1960}]}]}
+        self.assertTrue(parse_ryu_group_stats(dump) == {7: [(10, 980), (20, 1960)]})
+        self.assertTrue(parse_ryu_group_stats(None) == {})
+
+
+if __name__ == '__main__':
+    unittest.main()
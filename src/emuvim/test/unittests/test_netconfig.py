@@ -0,0 +1,76 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+from emuvim.dcemulator.netconfig import NetConfigBatch, parse_batch_errors
+
+
+class DummyNode(object):
+
+    def __init__(self):
+        self.name = "vnf1"
+        self.pid = 1
+        self.nameToIntf = {}
+
+
+class testNetConfigBatch(unittest.TestCase):
+    """
+    Test the rendering of the ip batch and the mapping of its errors.
+    """
+
+    def testLines(self):
+        b = NetConfigBatch(DummyNode())
+        b.set_ip("eth0", "10.0.0.1/24").rename("eth0", "input").add_route("10.0.0.2", "input")
+        b.add_arp("input", "10.0.0.2", "aa:bb:cc:dd:ee:ff")
+        lines, line_ops = b.lines()
+        self.assertEqual(lines, [
+            "addr flush dev eth0",
+            "addr add 10.0.0.1/24 dev eth0",
+            "link set dev eth0 up",
+            "link set dev eth0 down",
+            "link set dev eth0 name input",
+            "link set dev input up",
+            "route replace 10.0.0.2 dev input",
+            "neigh replace 10.0.0.2 lladdr aa:bb:cc:dd:ee:ff dev input nud permanent"])
+        self.assertEqual(line_ops, [0, 0, 0, 1, 1, 1, 2, 3])
+
+    def testParseErrors(self):
+        stderr = ("RTNETLINK answers: File exists\n"
+                  "Command failed -:6\n"
+                  "Cannot find device \"input\"\n"
+                  "Command failed -:7\n")
+        errors = parse_batch_errors(stderr, [0, 0, 1, 1, 1, 2, 3])
+        self.assertEqual(errors, {2: "RTNETLINK answers: File exists",
+                                  3: "Cannot find device \"input\""})
+        # errors that are not attributed to a line fail the whole batch
+        self.assertEqual(parse_batch_errors("setting the network namespace failed", [0]),
+                         {None: "setting the network namespace failed"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -298,6 +298,23 @@ class testRestApi(ApiBaseOpenStack):
         self.assertEqual(json.loads(lblistresponse.content)["loadbalancers"][0]["src_intf"],"fire-out-0")
         print(" ")
 
+        print('->>>>>>> test Loadbalancing Backends ->>>>>>>>>>>>>>>')
+        print('->>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>')
+        cookie = json.loads(lblistresponse.content)["loadbalancers"][0]["cookie"]
+        url = "http://0.0.0.0:4000/v1/lb/%s/dc0_s1_iperf1/iper-in-0" % cookie
+        lbbackendresponse = requests.put(url, data=json.dumps({"weight": 3}), headers=headers)
+        print (lbbackendresponse.content)
+        self.assertEqual(lbbackendresponse.status_code, 200)
+        self.assertEqual(json.loads(lbbackendresponse.content)["weight"], 3)
+        lbbackendresponse = requests.put(url, data=json.dumps({"weight": 0}), headers=headers)
+        self.assertEqual(lbbackendresponse.status_code, 500)
+        lbbackendresponse = requests.delete(url, headers=headers)
+        self.assertEqual(lbbackendresponse.status_code, 200)
+        url = "http://0.0.0.0:4000/v1/lb/list"
+        lblistresponse = requests.get(url, headers=headers)
+        self.assertEqual(json.loads(lblistresponse.content)["loadbalancers"][0]["paths"], [])
+        print(" ")
+
         print('->>>>>>> test delete Loadbalancing ->>>>>>>>>>>>>>>')
         print('->>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>')
         url = "http://0.0.0.0:4000/v1/lb/dc0/s1/firewall1/firewall1:cp03:output"
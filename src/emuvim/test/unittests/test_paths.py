@@ -0,0 +1,96 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+from emuvim.dcemulator.paths import PathService
+
+
+class testPathService(unittest.TestCase):
+    """
+    Test the cached path computation on the switch graph.
+    """
+
+    def _ring(self):
+        # s1 -- s2 -- s3 -- s4 -- s1
+        ps = PathService()
+        for i in range(1, 5):
+            ps.add_switch("s%d" % i)
+        ps.add_link("s1", "s2", delay="5")
+        ps.add_link("s2", "s3", delay="5")
+        ps.add_link("s3", "s4", delay="1")
+        ps.add_link("s4", "s1", delay="1")
+        return ps
+
+    def testPathCache(self):
+        ps = self._ring()
+        self.assertTrue(ps.shortest_path("s1", "s1") == ["s1"])
+        p = ps.shortest_path("s1", "s3", weight="delay")
+        self.assertTrue(p == ["s1", "s4", "s3"])
+        self.assertTrue(ps.misses == 1)
+        # reverse direction is served from the cache
+        self.assertTrue(ps.shortest_path("s3", "s1", weight="delay") == ["s3", "s4", "s1"])
+        self.assertTrue(ps.shortest_path("s1", "s3", weight="delay") == p)
+        self.assertTrue(ps.hits == 2)
+        # other weight metrics are cached separately
+        self.assertTrue(len(ps.shortest_path("s1", "s3")) == 3)
+        self.assertTrue(ps.misses == 2)
+
+    def testInvalidation(self):
+        ps = self._ring()
+        ps.shortest_path("s1", "s3", weight="delay")
+        ps.shortest_path("s1", "s2", weight="delay")
+        # removing s3 -- s4 only affects paths using it
+        ps.remove_link("s3", "s4")
+        self.assertTrue(ps.shortest_path("s1", "s2", weight="delay") == ["s1", "s2"])
+        self.assertTrue(ps.hits == 1)
+        self.assertTrue(ps.shortest_path("s1", "s3", weight="delay") == ["s1", "s2", "s3"])
+        # a new shortcut invalidates the longer path
+        ps.add_link("s1", "s3", delay="2")
+        self.assertTrue(ps.shortest_path("s1", "s3", weight="delay") == ["s1", "s3"])
+        # but not the ones that stay shortest
+        hits = ps.hits
+        self.assertTrue(ps.shortest_path("s1", "s2", weight="delay") == ["s1", "s2"])
+        self.assertTrue(ps.hits == hits + 1)
+
+    def testEqualCostPaths(self):
+        ps = self._ring()
+        paths = ps.equal_cost_paths("s1", "s3")
+        self.assertTrue(sorted(paths) == [["s1", "s2", "s3"], ["s1", "s4", "s3"]])
+        self.assertTrue(ps.equal_cost_paths("s1", "s3", weight="delay") == [["s1", "s4", "s3"]])
+        self.assertTrue(len(ps.equal_cost_paths("s1", "s3", max_paths=1)) == 1)
+        self.assertTrue(ps.equal_cost_paths("s2", "s2") == [["s2"]])
+
+    def testNoPath(self):
+        ps = self._ring()
+        ps.add_switch("s5")
+        self.assertRaises(Exception, ps.shortest_path, "s1", "s5")
+        self.assertRaises(Exception, ps.shortest_path, "s1", "unknown")
+
+
+if __name__ == '__main__':
+    unittest.main()
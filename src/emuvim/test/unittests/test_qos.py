@@ -0,0 +1,94 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+from emuvim.dcemulator.ovsbatch import OvsCommandBatch
+from emuvim.dcemulator.qos import QosManager, _uuids, _tagged
+
+
+class testQosManager(unittest.TestCase):
+    """
+    Test the ovs-vsctl transaction built for QoS changes.
+    """
+
+    def testCommands(self):
+        q = QosManager()
+        q.set_port("dc1.s1-eth1", 2000000, min_rate=1000000).clear_port("dc1.s1-eth2")
+        self.assertEqual(q.commands(), [
+            ["set", "port", "dc1.s1-eth1", "qos=@qos0"],
+            ["--id=@qos0", "create", "qos", "type=linux-htb",
+             "other-config:max-rate=2000000", "queues:0=@queue0", "external-ids:son-emu=1"],
+            ["--id=@queue0", "create", "queue",
+             "other-config:max-rate=2000000", "other-config:min-rate=1000000", "external-ids:son-emu=1"],
+            ["clear", "port", "dc1.s1-eth2", "qos"]])
+
+    def testGarbageCollection(self):
+        state = {"ports": {"dc1.s1-eth1": "qos-a", "dc1.s1-eth2": "qos-b", "dc1.s1-eth3": None},
+                 "qos": {"qos-a": set(["queue-a"]), "qos-b": set(["queue-b"]), "qos-c": set(),
+                         "qos-x": set(["queue-x"])},
+                 "queues": set(["queue-a", "queue-b", "queue-c", "queue-x", "queue-y"]),
+                 "own": set(["qos-a", "qos-b", "qos-c", "queue-a", "queue-b", "queue-c"])}
+        q = QosManager()
+        q.set_port("dc1.s1-eth1", 1000000)
+        destroyed = [c for c in q.commands(state) if c[0] == "destroy"]
+        # the replaced row of eth1 and the unreferenced rows go, eth2 keeps its row,
+        # rows that were not created by son-emu are kept
+        self.assertEqual(destroyed, [["destroy", "qos", "qos-a"], ["destroy", "qos", "qos-c"],
+                                     ["destroy", "queue", "queue-a"], ["destroy", "queue", "queue-c"]])
+        self.assertTrue(q._has_garbage(state))
+        state["own"] = set(["qos-b", "queue-b"])
+        self.assertFalse(q._has_garbage(state))
+
+    def testApplyFailureKeepsStaged(self):
+        q = QosManager()
+        q.read_state = lambda: {"ports": {}, "qos": {}, "queues": set(), "own": set()}
+        run = OvsCommandBatch._run
+        try:
+            OvsCommandBatch._run = staticmethod(lambda args, stdin=None: ["no port dc1.s1-eth9"])
+            q.set_port("dc1.s1-eth9", 1000000)
+            self.assertEqual(q.apply(), ["no port dc1.s1-eth9"])
+            # nothing was applied, the change can be retried
+            self.assertEqual(q.staged(), ["dc1.s1-eth9"])
+            self.assertEqual(q.settings(), {})
+            OvsCommandBatch._run = staticmethod(lambda args, stdin=None: [])
+            self.assertEqual(q.apply(), [])
+            self.assertEqual(q.staged(), [])
+            self.assertEqual(q.settings(), {"dc1.s1-eth9": {"max_rate": 1000000, "min_rate": None}})
+        finally:
+            OvsCommandBatch._run = run
+
+    def testUuids(self):
+        self.assertEqual(_uuids(["set", []]), set())
+        self.assertEqual(_uuids(["uuid", "u1"]), set(["u1"]))
+        self.assertEqual(_uuids(["map", [[0, ["uuid", "u1"]], [1, ["uuid", "u2"]]]]), set(["u1", "u2"]))
+        self.assertTrue(_tagged(["map", [["son-emu", "1"]]]))
+        self.assertFalse(_tagged(["map", []]))
+
+
+if __name__ == '__main__':
+    unittest.main()
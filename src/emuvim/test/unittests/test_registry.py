@@ -0,0 +1,98 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+from emuvim.dcemulator.registry import ContainerRegistry
+
+
+class DummyDc(object):
+
+    def __init__(self, label):
+        self.label = label
+
+
+class DummyContainer(object):
+
+    def __init__(self, name, docker_id, dc):
+        self.name = name
+        self.dcinfo = {"Id": docker_id}
+        self.datacenter = dc
+
+
+class testContainerRegistry(unittest.TestCase):
+    """
+    Test the network wide container index.
+    """
+
+    def setUp(self):
+        self.r = ContainerRegistry()
+        self.dc1 = DummyDc("dc1")
+        self.dc2 = DummyDc("dc2")
+
+    def _add(self, name, docker_id, dc):
+        self.assertTrue(self.r.reserve(name))
+        c = DummyContainer(name, docker_id, dc)
+        self.r.commit(c)
+        return c
+
+    def testLookup(self):
+        c1 = self._add("vnf1", "a" * 64, self.dc1)
+        c2 = self._add("vnf2", "b" * 64, self.dc2)
+        self.assertTrue(self.r.get("vnf1") is c1)
+        self.assertTrue(self.r.get_by_id("b" * 64) is c2)
+        self.assertTrue(self.r.lookup("a" * 12) is c1)
+        self.assertTrue(self.r.lookup("vnf3") is None)
+        self.assertEqual(self.r.list("dc2"), [c2])
+        self.assertEqual(sorted(self.r.names()), ["vnf1", "vnf2"])
+        self.assertEqual(len(self.r), 2)
+
+    def testReservation(self):
+        self.assertTrue(self.r.reserve("vnf1"))
+        # a reserved name is taken but not listed
+        self.assertFalse(self.r.reserve("vnf1"))
+        self.assertFalse("vnf1" in self.r)
+        self.assertEqual(len(self.r), 0)
+        self.r.release("vnf1")
+        self.assertTrue(self.r.reserve("vnf1"))
+        self.r.commit(DummyContainer("vnf1", "c" * 64, self.dc1))
+        # releasing a committed name is a no-op
+        self.r.release("vnf1")
+        self.assertTrue("vnf1" in self.r)
+        self.assertFalse(self.r.reserve("vnf1"))
+
+    def testRemove(self):
+        c1 = self._add("vnf1", "a" * 64, self.dc1)
+        self.assertTrue(self.r.remove("vnf1") is c1)
+        self.assertTrue(self.r.remove("vnf1") is None)
+        self.assertTrue(self.r.lookup("a" * 12) is None)
+        self.assertEqual(self.r.list("dc1"), [])
+        self.assertTrue(self.r.reserve("vnf1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
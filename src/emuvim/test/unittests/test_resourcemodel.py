@@ -247,6 +247,24 @@ class testUpbSimpleCloudDcRM(SimpleTestTopology):
         rm.free(c1)
         self.assertTrue(rm.dc_alloc_cu == 0)
 
+    def testAdmitBatch(self):
+        """
+        Test the admission of a batch of flavors without allocation.
+        :return:
+        """
+        reg = ResourceModelRegistrar(dc_emulation_max_cpu=1.0, dc_emulation_max_mem=512)
+        rm = UpbSimpleCloudDcRM(max_cu=40, max_mu=4096)
+        reg.register("test_dc", rm)
+        self.assertTrue(rm.admit(["xlarge", "xlarge"]))
+        # admission does not allocate anything
+        self.assertEqual(rm.dc_alloc_cu, 0)
+        # the batch as a whole does not fit
+        self.assertRaises(NotEnoughResourcesAvailable, rm.admit, ["xlarge", "xlarge", "xlarge"])
+        # already allocated resources are taken into account
+        rm.allocate(createDummyContainerObject("c1", flavor="xlarge"))
+        self.assertRaises(NotEnoughResourcesAvailable, rm.admit, ["xlarge", "xlarge"])
+        self.assertTrue(rm.admit(["large"]))
+
     @unittest.skipIf(os.environ.get("SON_EMU_IN_DOCKER") is not None,
                      "skipping test when running inside Docker container")
     def testInRealTopo(self):
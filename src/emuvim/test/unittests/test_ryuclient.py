@@ -0,0 +1,133 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import json
+import socket
+import threading
+import time
+import unittest
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+from emuvim.dcemulator.ryuclient import RyuClient
+
+
+class _ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _RyuHandler(BaseHTTPRequestHandler):
+    """
+    Replies like ofctl_rest: JSON bodies with a text content type.
+    """
+
+    def _reply(self, body):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply(json.dumps({"1": [{"port_no": 1, "rx_packets": 10}]}))
+
+    posts = []
+
+    def do_POST(self):
+        data = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        _RyuHandler.posts.append(self.path)
+        if self.path == '/slow':
+            time.sleep(1)
+        self._reply(json.dumps({"path": self.path, "data": data}))
+
+    def log_message(self, *args):
+        pass
+
+
+class testRyuClient(unittest.TestCase):
+    """
+    Test the Ryu REST client against a local HTTP server.
+    """
+
+    def setUp(self):
+        self.server = _ThreadedHTTPServer(('127.0.0.1', 0), _RyuHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.client = RyuClient('http://127.0.0.1:%d' % self.server.server_address[1], pool_size=2)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def testDecode(self):
+        # JSON is decoded regardless of the content type
+        stats = self.client.get('stats/port', dpid=1)
+        self.assertTrue(stats["1"][0]["rx_packets"] == 10)
+        ret = self.client.request('stats/flowentry/add', data={"dpid": 1})
+        self.assertTrue(ret.status_code == 200)
+        self.assertTrue(ret.data == {"path": "/stats/flowentry/add", "data": {"dpid": 1}})
+
+    def testThreads(self):
+        results = []
+
+        def poll():
+            for i in range(5):
+                results.append(self.client.get('stats/port', dpid=1) is not None)
+
+        threads = [threading.Thread(target=poll) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertTrue(len(results) == 20 and all(results))
+
+    def testUnreachable(self):
+        # find a closed port
+        s = socket.socket()
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+        s.close()
+        client = RyuClient('http://127.0.0.1:%d' % port, timeout=0.5, retries=2, backoff=0.01)
+        ret = client.request('stats/switches')
+        self.assertTrue(ret.status_code is None and ret.data is None)
+        self.assertTrue(client.get('stats/switches') is None)
+
+
+    def testPostReadTimeout(self):
+        # a POST whose reply timed out may have been applied, it is not sent again
+        del _RyuHandler.posts[:]
+        client = RyuClient(self.client.base_url, timeout=0.2, retries=2, backoff=0.01)
+        ret = client.request('slow', data={"dpid": 1})
+        self.assertTrue(ret.status_code is None)
+        self.assertTrue(_RyuHandler.posts == ['/slow'])
+        client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
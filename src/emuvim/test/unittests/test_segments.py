@@ -0,0 +1,73 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+from emuvim.dcemulator.segments import SegmentAllocator, SegmentsExhausted
+
+
+class testSegmentAllocator(unittest.TestCase):
+    """
+    Test the allocation and recycling of segment ids.
+    """
+
+    def testRecycle(self):
+        a = SegmentAllocator('vlan')
+        self.assertTrue([a.allocate() for i in range(3)] == [1, 2, 3])
+        self.assertTrue(a.free(2))
+        # a freed id is not freed twice
+        self.assertFalse(a.free(2))
+        # lowest free id first
+        self.assertTrue(a.allocate() == 2)
+        self.assertTrue(a.allocate() == 4)
+        self.assertTrue(a.usage()['allocated'] == 4)
+
+    def testReserve(self):
+        a = SegmentAllocator('vlan')
+        self.assertTrue(a.reserve(2))
+        self.assertFalse(a.reserve(2))
+        self.assertTrue(a.allocate() == 1)
+        # reserved ids are skipped
+        self.assertTrue(a.allocate() == 3)
+        self.assertRaises(ValueError, a.reserve, 4095)
+
+    def testExhausted(self):
+        a = SegmentAllocator('vlan')
+        for i in range(4094):
+            a.allocate()
+        self.assertRaises(SegmentsExhausted, a.allocate)
+        a.free(100)
+        self.assertTrue(a.allocate() == 100)
+
+    def testMpls(self):
+        a = SegmentAllocator('mpls')
+        self.assertTrue(a.allocate() == 16)
+        self.assertTrue(a.usage()['capacity'] > 4094)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from emuvim.dcemulator.snapshot import diff, save, load
+
+
+def _snapshot(containers, chains=(), elans=()):
+    return {"version": 1, "datacenters": [], "switches": [], "links": [],
+            "containers": list(containers), "chains": list(chains), "elans": list(elans)}
+
+
+def _vnf(name, image="ubuntu:trusty", dc="dc1"):
+    return {"name": name, "datacenter": dc, "image": image, "command": None,
+            "flavor_name": "tiny", "network": [{"id": "intf1", "ip": "10.0.0.1/24"}]}
+
+
+def _chain(src, dst, segment, **kwargs):
+    chain = {"vnf_src_name": src, "vnf_src_interface": "intf1",
+             "vnf_dst_name": dst, "vnf_dst_interface": "intf1", "segment": segment}
+    chain.update(kwargs)
+    return chain
+
+
+class testSnapshotDiff(unittest.TestCase):
+    """
+    Test the comparison of snapshots used to restore only what changed.
+    """
+
+    def testUnchanged(self):
+        snap = _snapshot([_vnf("a"), _vnf("b")], [_chain("a", "b", 1)],
+                         [{"vlan": 2, "members": [{"name": "a", "interface": "intf1"}], "proactive": False}])
+        changes = diff(snap, snap)
+        self.assertTrue(all(len(v) == 0 for v in changes.values()))
+
+    def testChangedContainer(self):
+        current = _snapshot([_vnf("a"), _vnf("b"), _vnf("c"), _vnf("old")],
+                            [_chain("a", "b", 1), _chain("b", "c", 2)],
+                            [{"vlan": 5, "members": [{"name": "c", "interface": "intf1"}], "proactive": True}])
+        wanted = _snapshot([_vnf("a"), _vnf("b"), _vnf("c", image="nginx"), _vnf("new")],
+                           [_chain("a", "b", 1), _chain("b", "c", 7), _chain("a", "new", 3, bidirectional=True)],
+                           [{"vlan": 5, "members": [{"name": "c", "interface": "intf1"}], "proactive": True}])
+        changes = diff(current, wanted)
+        # c has another image, old is gone
+        self.assertTrue(changes["stop"] == ["c", "old"])
+        self.assertTrue([c["name"] for c in changes["start"]] == ["c", "new"])
+        # a -> b is kept, the chain to c and its E-LAN are set up again
+        self.assertTrue([(c["vnf_src_name"], c["vnf_dst_name"]) for c in changes["remove_chains"]] == [("b", "c")])
+        self.assertTrue(sorted((c["vnf_src_name"], c["vnf_dst_name"]) for c in changes["add_chains"]) ==
+                        [("a", "new"), ("b", "c")])
+        self.assertTrue([e["vlan"] for e in changes["remove_elans"]] == [5])
+        self.assertTrue([e["vlan"] for e in changes["add_elans"]] == [5])
+
+    def testChangedChain(self):
+        current = _snapshot([_vnf("a"), _vnf("b")], [_chain("a", "b", 1)])
+        # a different segment alone does not change a chain
+        self.assertTrue(len(diff(current, _snapshot([_vnf("a"), _vnf("b")], [_chain("a", "b", 4)]))["add_chains"]) == 0)
+        changes = diff(current, _snapshot([_vnf("a"), _vnf("b")], [_chain("a", "b", 1, bandwidth=100)]))
+        self.assertTrue(len(changes["remove_chains"]) == 1)
+        self.assertTrue(changes["add_chains"][0]["bandwidth"] == 100)
+        self.assertTrue(changes["stop"] == [])
+
+    def testSaveLoad(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            path = os.path.join(tmp, "snapshot.json")
+            snap = _snapshot([_vnf("a")], [_chain("a", "a", 1)])
+            save(snap, path)
+            self.assertTrue(load(path) == snap)
+        finally:
+            shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    unittest.main()
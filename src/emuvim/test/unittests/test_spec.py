@@ -0,0 +1,80 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+import unittest
+from emuvim.dcemulator.spec import parse_pn, parse_vn, SpecError
+
+
+class testSpec(unittest.TestCase):
+    """
+    Test the validation of PN and VN specs.
+    """
+
+    PN = {"Servers": [{"s0": [32, 128, 100]}, {"s1": [32, 128, 100]}, {"gsw": [1, 1, 1]}],
+          "PN": [["s0", "tor0", 100], ["s1", "tor0", 100], ["tor0", "gsw", 40]]}
+
+    def testParsePN(self):
+        pn = parse_pn(self.PN)
+        self.assertTrue(list(pn["servers"]) == ["s0", "s1"])
+        self.assertTrue(pn["servers"]["s0"] == (32, 128, 100))
+        # the gateway switch is a switch even if it is listed as server
+        self.assertTrue(pn["switches"] == ["tor0", "gsw"])
+        self.assertTrue(pn["links"][2] == ("tor0", "gsw", 40))
+        # the "clouds" form with a single object
+        pn = parse_pn('{"clouds": {"c0": [8, 7, 10]}, "PN": [["c0", "tor0", 10]]}')
+        self.assertTrue(list(pn["servers"]) == ["c0"])
+
+    def testInvalidPN(self):
+        spec = {"Servers": {"s0": [32, 128], "s1": [1, 1, 1]},
+                "PN": [["s0", "s0", 1], ["s1", "tor0"]]}
+        with self.assertRaises(SpecError) as cm:
+            parse_pn(spec)
+        # all problems are reported at once
+        msg = str(cm.exception)
+        self.assertTrue("s0 needs three numbers" in msg)
+        self.assertTrue("connects s0 to itself" in msg)
+        self.assertTrue("['s1', 'tor0'] is no" in msg)
+        self.assertTrue("server s1 has no link" in msg)
+
+    def testParseVN(self):
+        pn = parse_pn(self.PN)
+        vn = {"VMs": {"source": [1, 1, 1], "sink": [1, 1, 1]},
+              "VN": [["source", "sink", 1]],
+              "server_antiaffinity": [["source", "s0"]]}
+        parsed = parse_vn(vn, pn)
+        self.assertTrue(parsed["links"] == [("source", "sink", 1)])
+        self.assertTrue(parsed["antiaffinity"] == [("source", "s0")])
+        vn["VN"].append(["source", "nat", 1])
+        vn["server_antiaffinity"].append(["sink", "s9"])
+        with self.assertRaises(SpecError) as cm:
+            parse_vn(vn, pn)
+        self.assertTrue("unknown node" in str(cm.exception))
+        self.assertTrue("unknown server s9" in str(cm.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+from emuvim.dcemulator.statuscache import ContainerStatusCache, parse_ip_link
+
+
+class FakeDockerClient(object):
+
+    def __init__(self):
+        self.listings = 0
+        self.inspects = 0
+        self.state = "running"
+
+    def containers(self, all=False, filters=None):
+        self.listings += 1
+        return [{"Id": "c1", "State": self.state, "Status": "Up 5 seconds"},
+                {"Id": "c2", "State": "exited", "Status": "Exited (0)"}]
+
+    def inspect_container(self, dc):
+        self.inspects += 1
+        if dc["Id"] == "c1":
+            return {"State": {"Status": self.state, "Running": self.state in ("running", "paused"),
+                              "Paused": self.state == "paused", "Pid": 42, "ExitCode": 0}}
+        if dc["Id"] == "c2":
+            return {"State": {"Status": "exited", "Running": False, "Pid": 0, "ExitCode": 0}}
+        return {"State": {"Status": "created", "Running": False}}
+
+
+class FakeContainer(object):
+
+    def __init__(self, name, did, dcli):
+        self.name = name
+        self.did = did
+        self.dc = {"Id": did}
+        self.dcli = dcli
+        self.pid = -1
+
+    def cmd(self, *args):
+        return ("1: lo: <LOOPBACK,UP,LOWER_UP> mtu 65536 qdisc noqueue\n"
+                "5: input@if6: <BROADCAST,MULTICAST> mtu 1500 qdisc noop\n")
+
+
+class testContainerStatusCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dcli = FakeDockerClient()
+        self.cache = ContainerStatusCache(ttl=60, use_events=False)
+
+    def testOneListingForAllContainers(self):
+        s1 = self.cache.state(FakeContainer("vnf1", "c1", self.dcli))
+        s2 = self.cache.state(FakeContainer("vnf2", "c2", self.dcli))
+        self.assertTrue(s1["Running"])
+        self.assertFalse(s2["Running"])
+        self.assertEqual(self.dcli.listings, 1)
+        # unknown containers are inspected directly
+        s3 = self.cache.state(FakeContainer("vnf3", "c3", self.dcli))
+        self.assertEqual(s3["Status"], "created")
+        self.assertEqual(self.dcli.listings, 1)
+
+    def testInvalidate(self):
+        c1 = FakeContainer("vnf1", "c1", self.dcli)
+        self.cache.state(c1)
+        self.dcli.state = "paused"
+        self.assertEqual(self.cache.state(c1)["Status"], "running")
+        self.cache.invalidate()
+        self.assertTrue(self.cache.state(c1)["Paused"])
+
+    def testInspectedFields(self):
+        c1 = FakeContainer("vnf1", "c1", self.dcli)
+        s = self.cache.state(c1)
+        self.assertEqual(s["Pid"], 42)
+        self.assertEqual(s["StatusText"], "Up 5 seconds")
+        self.assertEqual(self.cache.state(c1)["ExitCode"], 0)
+        self.assertEqual(self.dcli.inspects, 1)
+        # a state change of the container is inspected again
+        self.dcli.state = "paused"
+        self.cache.invalidate(c1)
+        s = self.cache.state(c1)
+        self.assertTrue(s["Paused"])
+        self.assertEqual(s["Pid"], 42)
+        self.assertEqual(self.dcli.inspects, 2)
+
+    def testLinks(self):
+        c1 = FakeContainer("vnf1", "c1", self.dcli)
+        self.assertEqual(self.cache.links(c1), {"lo": True, "input": False})
+        self.assertEqual(parse_ip_link(""), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+import networkx as nx
+from emuvim.dcemulator.topology import Topology
+
+
+class testTopology(unittest.TestCase):
+    """
+    Test the compact topology and its networkx compatible view.
+    """
+
+    def _topo(self):
+        # vnf1 -- s1 == s2 -- vnf2 (two links between s1 and s2)
+        t = Topology()
+        for n in ["s1", "s2"]:
+            t.add_node(n, type="switch")
+        for n in ["vnf1", "vnf2"]:
+            t.add_node(n, type="docker")
+        t.add_link("vnf1", "s1", 1, 1, port_id1="intf1", port_name1="vnf1-eth0", port_name2="s1-eth1")
+        t.add_link("s1", "s2", 2, 1, port_name1="s1-eth2", port_name2="s2-eth1", delay="5")
+        t.add_link("s1", "s2", 3, 2, port_name1="s1-eth3", port_name2="s2-eth2", delay="1")
+        t.add_link("s2", "vnf2", 3, 1, port_name1="s2-eth3", port_name2="vnf2-eth0")
+        return t
+
+    def testView(self):
+        t = self._topo()
+        g = t.view()
+        self.assertTrue(len(g) == 4 and "vnf1" in g)
+        self.assertTrue(g.number_of_edges() == 8)
+        self.assertTrue(g.neighbors("s1") == ["vnf1", "s2"])
+        # both directions of a link, parallel links get their own key
+        self.assertTrue(g["s1"]["s2"][1]["src_port_nr"] == 3)
+        self.assertTrue(g["s2"]["s1"][1]["src_port_nr"] == 2)
+        self.assertTrue(g["s2"]["s1"][0]["delay"] == 5.0)
+        self.assertTrue(g["vnf1"]["s1"][0]["src_port_id"] == "intf1")
+        self.assertTrue("bw" not in g["vnf1"]["s1"][0])
+        self.assertRaises(KeyError, lambda: g["vnf1"]["vnf2"])
+        self.assertTrue(nx.get_node_attributes(g, "type")["vnf2"] == "docker")
+        self.assertTrue(len(g.edges()) == 8)
+
+    def testRemove(self):
+        t = self._topo()
+        self.assertTrue(t.remove_link("s1", "s2", port_name="s2-eth1"))
+        self.assertTrue([l["src_port_nr"] for l in t.links("s1", "s2")] == [3])
+        t.remove_node("vnf2")
+        self.assertTrue("vnf2" not in t and t.num_links == 2)
+        self.assertTrue(t.neighbors("s2") == ["s1"])
+        # ids of removed nodes and links are reused
+        t.add_node("vnf3", type="docker")
+        t.add_link("vnf3", "s2", 1, 4)
+        self.assertTrue(t.neighbors("vnf3") == ["s2"] and t.num_links == 3)
+
+    def testPathAndExport(self):
+        t = self._topo()
+        self.assertTrue(t.shortest_path("vnf1", "vnf2") == ["vnf1", "s1", "s2", "vnf2"])
+        self.assertTrue(t.shortest_path("vnf1", "vnf2", node_types=["switch"]) == ["vnf1", "s1", "s2", "vnf2"])
+        self.assertTrue(t.shortest_path("vnf1", "s2", node_types=["docker"]) is None)
+        export = t.export()
+        self.assertTrue(len(export["nodes"]) == 4 and len(export["links"]) == 4)
+        g = t.to_networkx()
+        self.assertTrue(g.number_of_edges() == 8)
+        self.assertTrue(nx.shortest_path(g, "vnf1", "vnf2") == ["vnf1", "s1", "s2", "vnf2"])
+
+    def testConstrainedPath(self):
+        # s1 -- s2 (10 Mbit/s) and s1 -- s3 -- s2 (100 Mbit/s)
+        t = Topology()
+        for n in ["s1", "s2", "s3"]:
+            t.add_node(n, type="switch")
+        t.add_link("s1", "s2", 1, 1, bw=10)
+        t.add_link("s1", "s3", 2, 1, bw=100)
+        t.add_link("s3", "s2", 2, 2, bw=100)
+        path, hops = t.constrained_path("s1", "s2", 5)
+        self.assertTrue(path == ["s1", "s2"] and t.link(hops[0][0], "s1")["src_port_nr"] == 1)
+        t.reserve(hops, 8)
+        self.assertTrue(t.residual(hops[0][0], "s1") == 2 and t.residual(hops[0][0], "s2") == 10)
+        # the direct link has not enough headroom left
+        path, hops2 = t.constrained_path("s1", "s2", 5)
+        self.assertTrue(path == ["s1", "s3", "s2"])
+        self.assertTrue(t.constrained_path("s1", "s2", 200) is None)
+        t.release(hops, 8)
+        self.assertTrue(t.constrained_path("s1", "s2", 5)[0] == ["s1", "s2"])
+        t.reserve(hops2, 50)
+        self.assertTrue([u["reserved"] for u in t.link_usage() if u["src"] == "s3"] == [0.0, 50.0])
+        # unknown switches and metrics (e.g. from the REST api) are rejected
+        self.assertRaises(ValueError, t.constrained_path, "s1", "s9", 5)
+        self.assertRaises(ValueError, t.constrained_path, "s1", "s2", 5, weight="hops")
+
+
+if __name__ == '__main__':
+    unittest.main()
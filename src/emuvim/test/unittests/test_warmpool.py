@@ -0,0 +1,118 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import unittest
+from emuvim.dcemulator.registry import ContainerRegistry
+from emuvim.dcemulator.warmpool import WarmPool
+
+
+class FakeContainer(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.flavor_name = None
+        self.resources = {}
+        self.cmds = []
+
+    def cmd(self, cmd):
+        self.cmds.append(cmd)
+
+    def update_resources(self, **kwargs):
+        self.resources.update(kwargs)
+
+
+class FakeNet(object):
+    """
+    Records container creation/removal instead of talking to Docker.
+    """
+
+    def __init__(self):
+        self.container_registry = ContainerRegistry()
+        self.nodes = {}
+
+    def addDocker(self, label, **params):
+        self.nodes[label] = FakeContainer(label)
+        return self.nodes[label]
+
+    def removeDocker(self, label):
+        del self.nodes[label]
+
+    def renameDocker(self, label, new_label):
+        d = self.nodes.pop(label)
+        d.name = new_label
+        self.nodes[new_label] = d
+        return d
+
+
+class FakeDc(object):
+
+    def __init__(self):
+        self.net = FakeNet()
+
+    def __str__(self):
+        return "fakedc"
+
+
+class testWarmPool(unittest.TestCase):
+
+    def setUp(self):
+        self.dc = FakeDc()
+        self.pool = WarmPool(self.dc, "ubuntu:trusty", size=2)
+
+    def testFillAndClaim(self):
+        self.assertEqual(self.pool.fill(wait=True), 2)
+        self.assertEqual(len(self.pool), 2)
+        # pool names are reserved in the registry
+        for name in self.dc.net.nodes:
+            self.assertFalse(self.dc.net.container_registry.reserve(name))
+        d = self.pool.claim("vnf1", "small", {"cpu_quota": 5000})
+        self.assertEqual(d.name, "vnf1")
+        self.assertEqual(d.flavor_name, "small")
+        self.assertEqual(d.resources, {"cpu_quota": 5000})
+        self.assertEqual(d.cmds, ["export VNF_NAME=vnf1"])
+        self.assertTrue("vnf1" in self.dc.net.nodes)
+
+    def testClaimNeedsNewContainer(self):
+        self.pool.fill(wait=True)
+        # creation-time parameters cannot be applied to a pooled container
+        self.assertTrue(self.pool.claim("vnf1", "tiny", {"volumes": ["/tmp:/tmp"]}) is None)
+        self.assertEqual(len(self.pool), 2)
+
+    def testEvict(self):
+        self.pool.fill(wait=True)
+        self.pool.idle_timeout = 0
+        self.assertEqual(self.pool.evict(expired_only=True), 2)
+        self.assertEqual(self.dc.net.nodes, {})
+        self.pool.fill(wait=True)
+        self.pool.close()
+        self.assertEqual(self.dc.net.nodes, {})
+        self.assertEqual(self.pool.fill(wait=True), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
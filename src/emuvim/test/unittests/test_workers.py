@@ -0,0 +1,65 @@
+"""
+Copyright (c) 2015 SONATA-NFV
+ALL RIGHTS RESERVED.
+
+Licensed under the Apache License, Version 2.0 (the "License");
+you may not use this file except in compliance with the License.
+You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+Unless required by applicable law or agreed to in writing, software
+distributed under the License is distributed on an "AS IS" BASIS,
+WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+See the License for the specific language governing permissions and
+limitations under the License.
+
+Neither the name of the SONATA-NFV [, ANY ADDITIONAL AFFILIATION]
+nor the names of its contributors may be used to endorse or promote
+products derived from this software without specific prior written
+permission.
+
+This work has been performed in the framework of the SONATA project,
+funded by the European Commission under Grant number 671517 through
+the Horizon 2020 and 5G-PPP programmes. The authors would like to
+acknowledge the contributions of their colleagues of the SONATA
+partner consortium (www.sonata-nfv.eu).
+"""
+
+import threading
+import time
+import unittest
+from emuvim.dcemulator.workers import run_parallel
+
+
+class testWorkers(unittest.TestCase):
+    """
+    Test the bounded worker pool.
+    """
+
+    def testRunParallel(self):
+        running = [0]
+        peak = [0]
+        lock = threading.Lock()
+
+        def work(i):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+            if i == 3:
+                raise ValueError("failed")
+            return i * 2
+
+        results = run_parallel(work, range(10), max_workers=4)
+        # results are returned in the order of the items
+        self.assertTrue([r for r, ex in results if ex is None] == [0, 2, 4, 8, 10, 12, 14, 16, 18])
+        self.assertTrue(isinstance(results[3][1], ValueError))
+        self.assertTrue(1 < peak[0] <= 4)
+        self.assertTrue(run_parallel(work, []) == [])
+
+
+if __name__ == '__main__':
+    unittest.main()